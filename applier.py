@@ -1,78 +1,169 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from lxml import etree
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, Tuple
 import json
-import re
+import os
 import shutil
 
-from data import XmlEntry, CodeEntry, WholeDictionary, SingleDictionary
-from logger import logger
+from data import XmlEntry, CodeEntry, WholeDictionary, SingleDictionary, json_default
+from logger import logger, LogMessages, collect_logs, emit_logs
+import diagnostics
 from urllib.parse import quote
-from util import xml_node_replace_translation, get_element_CDATA
+from util import (
+    xml_node_replace_translation,
+    xml_node_replace_translations,
+    get_element_CDATA,
+)
+from tree_cache import ElementText, TreeCache
+from output_writer import OutputWriter
+from source_patch import SourcePatcher
+from apply_state import ApplyState, bytes_digest
 from const import (
     ROOT_DIR,
     FONT_DIR,
-    SVG_DIR,
     FONT_DIR_NAME,
     FONT_TARGET_DIR,
+    FUZZY_FIELD,
     PARATRANZ_PROJECT_ID,
 )
 
-FONT_SIZE_REGEX = r"font-size\s*:\s*(\d+)\s*(?:px|pt)"
-LINE_HEIGHT_REGEX = r"line-height\s*:\s*(\d+)\s*(?:px|pt)"
-
-
-def ui_value_modify(line: str, regex: str, multiplier: float) -> str:
-    matches = re.search(regex, line)
-    if matches is not None:
-        for group in matches.groups():
-            if group.isdigit():
-                value = int(group)
-                if value <= 16:
-                    value = int(value * min(multiplier + 0.1, 1))
-                else:
-                    value = int(value * multiplier)
-                line = line.replace(group, str(value))
-            else:
-                multiplier = int(multiplier * 10)
-                line = line.replace(group, f"({group})*{str(multiplier)}/10")
-
-    return line
-
-
-def valid_element(element: etree._Element) -> bool:
-    text = get_element_CDATA(element)
+def valid_element_text(
+    element: etree._Element, element_text: ElementText = get_element_CDATA
+) -> Optional[str]:
+    """
+    节点可应用翻译时返回其文本，否则返回None
+    """
+    text = element_text(element)
     if text is None:
-        return False
+        return None
     if text.strip() == "":
-        return False
+        return None
     elif element.getparent().tag == "formattingNames":
-        return False
+        return None
     elif element.getparent().tag == "statusEffects":
-        return False
+        return None
 
-    return True
+    return text
+
+
+def valid_element(element: etree._Element) -> bool:
+    return valid_element_text(element) is not None
+
+
+def valid_element_index(
+    tree: etree._ElementTree,
+    tags: Iterable[str],
+    element_text: ElementText = get_element_CDATA,
+) -> Dict[str, List[Tuple[etree._Element, str]]]:
+    """
+    单次遍历文档，得到各标签下可应用翻译的节点及其文本，组内保持文档顺序
+    """
+    index: Dict[str, List[Tuple[etree._Element, str]]] = {tag: [] for tag in tags}
+    if len(index) == 0:
+        return index
+    for element in tree.iter(*index):
+        text = valid_element_text(element, element_text)
+        if text is not None:
+            index[element.tag].append((element, text))
+    return index
+
+
+def htmlContent_index(tree: etree._ElementTree) -> Dict[str, List[etree._Element]]:
+    """
+    单次遍历文档，按tag属性对htmlContent节点分组，组内保持文档顺序
+    """
+    index: Dict[str, List[etree._Element]] = {}
+    for node in tree.iter("htmlContent"):
+        attr = node.get("tag")
+        if attr is None:
+            continue
+        if index.get(attr) is None:
+            index[attr] = [node]
+        else:
+            index[attr].append(node)
+    return index
 
 
 class Applier:
     def __init__(
-        self, target: str, root: str, dict_dir: str, new_data: WholeDictionary = {}
+        self,
+        target: str,
+        root: str,
+        dict_dir: str,
+        new_data: WholeDictionary = {},
+        tree_cache: Optional[TreeCache] = None,
+        jobs: int = 1,
+        apply_state: Optional[ApplyState] = None,
     ) -> None:
         self.target = target
         self.root = Path(root)
         self.dict_dir = Path(dict_dir)
         self.new_data: WholeDictionary = new_data
+        self.jobs = max(jobs, 1)
+        # 仅写入内容有变化的文件
+        self.writer = OutputWriter()
+        # 复用提取时的解析树
+        self.tree_cache = tree_cache
+        # 增量应用：跳过原始内容、字典切片与规则均未变动的文件
+        self.apply_state = apply_state
 
     def apply(self) -> None:
         self.apply_res()
+        if self.tree_cache is not None:
+            self.tree_cache.report()
         if self.target == "main":
             self.apply_src()
             self.apply_special()  # 对于其他优化游戏的文件进行调整
+        self.writer.report()
+        if self.apply_state is not None:
+            self.apply_state.finish()
+            self.apply_state.report()
+
+    def dictionary_digest(self, original_file: Path) -> str:
+        """
+        源文件对应字典切片的哈希，无字典时为空
+        """
+        dict_file = self.dict_dir.joinpath(
+            original_file.relative_to(self.root)
+        ).with_suffix(".json")
+        entries = self.new_data.get(dict_file.relative_to(self.dict_dir).as_posix())
+        if entries is None or not dict_file.exists():
+            return ""
+        return bytes_digest(
+            json.dumps(
+                list(entries.values()), ensure_ascii=False, default=json_default
+            ).encode("utf-8")
+        )
+
+    def begin_file(self, original_file: Path) -> bool:
+        """
+        增量应用时判断文件是否需要重新应用，需要时先恢复原始内容
+        """
+        if self.apply_state is None:
+            return True
+        return self.apply_state.begin(
+            original_file, self.dictionary_digest(original_file)
+        )
 
     def apply_special(self) -> None:
-        self.modify_css()
-        self.modify_java()
-        self.modify_xml()
+        patcher = SourcePatcher.load()
+        skipped = False
+        # 单次遍历源码目录，每个文件只读取一次并依次执行适用的修改
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not patcher.patches_for(filename):
+                    continue
+                file = Path(dirpath) / filename
+                if not self.begin_file(file):
+                    skipped = True
+                    continue
+                with open(file, mode="r", encoding="utf-8") as f:
+                    text = f.read()
+                self.writer.write_text(file, patcher.patch(filename, text))
+        # 跳过的文件未参与统计，仅在全部文件都应用时报告未生效的规则
+        if not skipped:
+            patcher.report()
         self.add_files()
 
     def add_files(self) -> None:
@@ -81,9 +172,9 @@ class Applier:
             Path(ROOT_DIR) / FONT_DIR / FONT_DIR_NAME,
             self.root / FONT_TARGET_DIR / FONT_DIR_NAME,
             dirs_exist_ok=True,
+            copy_function=self.writer.copy_file,
         )
-        shutil.copy(
-            Path(ROOT_DIR) / "replace_file" / "GenderNames.java",
+        self.writer.write_bytes(
             self.root
             / "src"
             / "com"
@@ -92,230 +183,80 @@ class Applier:
             / "character"
             / "gender"
             / "GenderNames.java",
+            (Path(ROOT_DIR) / "replace_file" / "GenderNames.java").read_bytes(),
         )
 
-    def modify_css(self) -> None:
-        for file in self.root.glob("**/*.css"):
-            with open(file, mode="r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            for idx, line in enumerate(lines):
-                if line.strip().startswith(
-                    "-fx-font-family"
-                ) or line.strip().startswith("font-family"):
-                    item = line.split(":")
-                    fonts = item[1].split(",")
-                    fonts.insert(0, '"Source Han Sans CN"')
-                    item[1] = ",".join(fonts)
-                    line = ":".join(item)
-
-                line = ui_value_modify(line, FONT_SIZE_REGEX, 0.8)
-                line = ui_value_modify(line, LINE_HEIGHT_REGEX, 0.9)
-
-                lines[idx] = line
-
-            with open(file, "w", encoding="utf-8") as f:
-                f.writelines(lines)
-
-    def modify_java(self) -> None:
-        for file in self.root.glob("**/*.java"):
-            with open(file, mode="r", encoding="utf-8") as f:
-                lines = f.readlines()
-
-            for idx, line in enumerate(lines):
-                # 调整字体和行高
-                line = ui_value_modify(line, FONT_SIZE_REGEX, 0.8)
-                line = ui_value_modify(line, LINE_HEIGHT_REGEX, 0.8)
-
-                # 使用中文Locale
-                line = line.replace("Locale.ENGLISH", "Locale.CHINESE")
-
-                if file.name == "Game.java":
-                    # 修改默认字体大小
-                    line = line.replace(
-                        "public static final int FONT_SIZE_NORMAL = 18;",
-                        "public static final int FONT_SIZE_NORMAL = 15;",
-                    )
-                    # 调整日期格式
-                    line = line.replace(
-                        "return date.substring(0, date.length()-5);",
-                        "return date.substring(5, date.length());",
-                    )
-                elif file.name == "Properties.java":
-                    # 修改默认字体
-                    line = line.replace(
-                        "public int fontSize = 18;", "public int fontSize = 15;"
-                    )
-                elif file.name == "UtilText.java":
-                    # 高版本jdk不再自带nashorn
-                    # if "import jdk.nashorn" in line:
-                    #     line = "//" + line
-                    # if "import org.openjdk.nashorn" in line:
-                    #     line = line[2:]
-                    line = line.replace(
-                        ".getGenderName().getFeminine()",
-                        ".getGenderName().getFeminineId()",
-                    )
-                    line = line.replace(
-                        ".getGenderName().getMasculine()",
-                        ".getGenderName().getMasculineId()",
-                    )
-                    line = line.replace(
-                        ".getGenderName().getNeutral()",
-                        ".getGenderName().getNeutralId()",
-                    )
-                    # 调整频率
-                    line = line.replace(
-                        "addMuffle(modifiedSentence, 5);",
-                        "addMuffle(modifiedSentence, 8);",
-                    )
-                    line = line.replace(
-                        "addSexSounds(modifiedSentence, 6);",
-                        "addSexSounds(modifiedSentence, 10);",
-                    )
-                    line = line.replace(
-                        "addBimbo(modifiedSentence, 6);",
-                        "addBimbo(modifiedSentence, 10);",
-                    )
-                    line = line.replace(
-                        "addBimbo(modifiedSentence, 6);",
-                        "addBro(modifiedSentence, 10);",
-                    )
-                    line = line.replace(
-                        "replaceWithMuffle(modifiedSentence, 2);",
-                        "replaceWithMuffle(modifiedSentence, 5);",
-                    )
-
-                elif file.name == "AbstractAttribute.java":
-                    # Attribute的name同时被用于逻辑和显示，故使用类似的nameAbbreviation暂时替代
-                    line = line.replace("return name;", "return nameAbbreviation;")
-                    line = line.replace(
-                        'return "<"+tag+" style=\'color:"+this.getColour().toWebHexString()+";\'>"+name+"</"+tag+">";',
-                        'return "<"+tag+" style=\'color:"+this.getColour().toWebHexString()+";\'>"+nameAbbreviation+"</"+tag+">";',
-                    )
-                elif file.name == "MainController.java":
-                    line = line.replace(
-                        'Main.mainController.getWebEngine().getDocument().getElementById("hiddenFieldName").getTextContent().length() < 2',
-                        'Main.mainController.getWebEngine().getDocument().getElementById("hiddenFieldName").getTextContent().length() < 1',
-                    )
-                elif file.name == "CityHallDemographics.java":
-                    line = line.replace(
-                        'Main.mainController.getWebEngine().getDocument().getElementById("hiddenFieldName").getTextContent().length() < 2',
-                        'Main.mainController.getWebEngine().getDocument().getElementById("hiddenFieldName").getTextContent().length() < 1',
-                    )
-                elif file.name == "CharacterCreation.java":
-                    line = line.replace(
-                        'Main.mainController.getWebEngine().getDocument().getElementById("hiddenFieldName").getTextContent().length() < 2',
-                        'Main.mainController.getWebEngine().getDocument().getElementById("hiddenFieldName").getTextContent().length() < 1',
-                    )
-                elif file.name == "Main.java":
-                    # 内置字体导入
-                    line = line.replace(
-                        "protected void loadFonts() {",
-                        "protected void loadFonts() {\n"
-                        + '\t\tif (Font.loadFont(toUri("res/fonts/Source Han/SourceHanSansCN-Regular.otf"), 12) != null) {\n'
-                        + '\t\t\tFont.loadFont(toUri("res/fonts/Source Han/SourceHanSansCN-Bold.otf"), 12);\n'
-                        + "\t\t} else {\n"
-                        + '\t\t\tSystem.err.println("Source Han Sans font could not be loaded.");\n'
-                        + "\t\t}\n",
-                    )
-                elif file.name == "Util.java":
-                    line = line.replace(
-                        'private static Pattern endOfSentence = Pattern.compile("[,.!?]");',
-                        'private static Pattern endOfSentence = Pattern.compile("[,.!?，。！？、]");',
-                    )
-                    # line = line.replace(
-                    #     "if(sentence.charAt(i)==' '",
-                    #     "if(true")
-                    # line = line.replace(
-                    #     "&& Character.isLetter(sentence.charAt(i+1))",
-                    #     "&& !isEndOfSentence(sentence.charAt(i+1))"
-                    # )
-                elif file.name == "Units.java":
-                    # 调整日期格式
-                    line = line.replace(
-                        'DateTimeFormatter.ofPattern(Main.getProperties().hasValue(PropertyValue.internationalDate) ? "dd.MM.yy" : "MM/dd/yy")',
-                        'DateTimeFormatter.ofPattern(Main.getProperties().hasValue(PropertyValue.internationalDate) ? "yy.MM.dd" : "yy.MM.dd")',
-                    )
-                    line = line.replace(
-                        "DateTimeFormatter.ofPattern(\"d'%o %m' yyyy\")",
-                        'DateTimeFormatter.ofPattern("yyyy年MM月dd日")',
-                    )
-                    # 调整时间格式
-                    line = line.replace(
-                        'DateTimeFormatter.ofPattern(Main.getProperties().hasValue(PropertyValue.twentyFourHourTime) ? "HH:mm" : "hh:mm a")',
-                        'DateTimeFormatter.ofPattern(Main.getProperties().hasValue(PropertyValue.twentyFourHourTime) ? "HH:mm" : "hh:mm a").withLocale(Locale.ENGLISH)',
-                    )
-                elif file.name == "AbstractFluidType.java":
-                    # 调整精液前缀判断方法
-                    line = line.replace(
-                        'if(name.endsWith("-")) {',
-                        "if(!baseFluidType.getNames().contains(name)) {",
-                    )
-                elif (
-                    file.name == "AbstractPenisType.java"
-                    or file.name == "AbstractVaginaType.java"
-                ):
-                    line = line.replace(
-                        'if(name.endsWith("-")) {',
-                        "if(!returnNames.containsKey(name)) {",
-                    )
-                elif file.name == "GameCharacter.java":
-                    # remove useless 'the'
-                    line = line.replace(":determiner)", ':"")')
-                elif file.name == "Wes.java":
-                    line = line.replace(
-                        "return this.getNameIgnoresPlayerKnowledge();", 'return "Wes";'
-                    )
-                elif file.name == "Brax.java":
-                    line = line.replace(
-                        "return this.getNameIgnoresPlayerKnowledge();",
-                        "if (Main.game.getDialogueFlags().hasFlag(DialogueFlagValue.bimbofiedBrax))\n"
-                        + '\t\t\treturn "Brandi";\n'
-                        + "\t\telse if (Main.game.getDialogueFlags().hasFlag(DialogueFlagValue.feminisedBrax))\n"
-                        + '\t\t\treturn "Bree";\n'
-                        + "\t\telse\n"
-                        + '\t\t\treturn "Brax";\n',
-                    )
-                elif file.name == "Sex.java":
-                    line = line.replace(
-                        "positionActionsPlayer.sort((a1, a2) ->",
-                        "positionActionsPlayer.sort((a1, a2) -> true?((a1.getActionType() == a2.getActionType())? (a1.isPositionSwap() == a2.isPositionSwap() ? a1.getActionTitle().compareTo(a2.getActionTitle()) : (a1.isPositionSwap() ? -1 : 1)): (a1.getActionType() == SexActionType.POSITIONING_MENU ? -1 : 1)):",
-                    )
-                elif file.name == "SexActionManager.java":
-                    line = line.replace("Value<>", "Value<String, Field[]>")
-                lines[idx] = line
-
-            with open(file, "w", encoding="utf-8") as f:
-                f.writelines(lines)
-
-    def modify_xml(self) -> None:
-        for file in self.root.glob("**/*.xml"):
-            if file.name == "eisek_mob_hideout.xml":
-                with open(file, mode="r", encoding="utf-8") as f:
-                    line = f.read()
-                with open(
-                    Path(ROOT_DIR) / SVG_DIR / "eisek_mob_hideout.svg",
-                    "r",
-                    encoding="utf-8",
-                ) as f:
-                    svg = f.read()
-                new_line = re.sub(r"(<svg.*</svg>)", svg, line, flags=re.DOTALL)
-                with open(file, mode="w", encoding="utf-8") as f:
-                    f.write(new_line)
-
     def apply_res(self) -> None:
         original_files = [file for file in self.root.glob("**/*.xml")]
-        dict_fils = [
-            self.dict_dir.joinpath(file.relative_to(self.root)).with_suffix(".json")
-            for file in original_files
-        ]
-
-        for original_file, dict_file in zip(original_files, dict_fils):
+        self.apply_files("apply_xml", original_files)
+
+    def apply_files(self, method: str, original_files: List[Path]) -> None:
+        """
+        对每个存在字典文件的源文件调用method，jobs大于1时使用多进程
+        多进程时各文件的日志先暂存，再按路径顺序输出
+        """
+        file_pairs: List[Tuple[Path, Path]] = []
+        for original_file in sorted(original_files, key=lambda file: file.as_posix()):
+            dict_file = self.dict_dir.joinpath(
+                original_file.relative_to(self.root)
+            ).with_suffix(".json")
             if not dict_file.exists():  # 不存在对应字典文件
                 continue
+            if not self.begin_file(original_file):  # 增量应用时输入未变动
+                continue
+            file_pairs.append((original_file, dict_file))
 
-            self.apply_xml(original_file, dict_file)
+        if self.jobs <= 1 or len(file_pairs) <= 1:
+            for original_file, dict_file in file_pairs:
+                getattr(self, method)(original_file, dict_file)
+            return
+
+        # 每个任务只携带对应文件的词条
+        tasks = [
+            (self.for_file(dict_file), method, original_file, dict_file)
+            for original_file, dict_file in file_pairs
+        ]
+        chunksize = max(1, len(tasks) // (self.jobs * 4))
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for messages, error, counts in executor.map(
+                Applier.apply_file, *zip(*tasks), chunksize=chunksize
+            ):
+                emit_logs(messages)
+                self.writer.merge(counts)
+                if error is not None:
+                    raise error
+
+    def for_file(self, dict_file: Path) -> "Applier":
+        key = dict_file.relative_to(self.dict_dir).as_posix()
+        return Applier(self.target, self.root, self.dict_dir, {key: self.new_data[key]})
+
+    @staticmethod
+    def replace_htmlContent(
+        original_file: Path,
+        attribute: str,
+        node: etree._Element,
+        entries: List[XmlEntry],
+    ) -> None:
+        overlapping = xml_node_replace_translations(node, entries)
+        if len(overlapping) > 0:
+            diagnostics.report(
+                "overlapping_blocks",
+                f"{len(overlapping)}个文本块与其他文本块重叠，未能全部替换！",
+                f"{original_file.as_posix()}[{attribute}]",
+                detail=" | ".join(entry.original[:40] for entry in overlapping),
+            )
+
+    @staticmethod
+    def apply_file(
+        applier: "Applier", method: str, original_file: Path, dict_file: Path
+    ) -> Tuple[LogMessages, Optional[Exception], Tuple[int, int]]:
+        error = None
+        with collect_logs() as messages:
+            try:
+                getattr(applier, method)(original_file, dict_file)
+            except Exception as e:
+                error = e
+        return messages, error, applier.writer.counts()
 
     def apply_xml(self, original_file: Path, dict_file: Path) -> None:
         # with open(dict_file, "r", encoding="utf-8") as f:
@@ -327,13 +268,21 @@ class Applier:
             dict_file.relative_to(self.dict_dir).as_posix()
         ]
 
+        # 沿用相似原文的翻译未经校对，不应用
         entry_list = [
-            XmlEntry.from_json(original_file, entry) for _, entry in json_dict.items()
+            XmlEntry.from_json(original_file, entry)
+            for _, entry in json_dict.items()
+            if FUZZY_FIELD not in entry
         ]
 
-        parser = etree.XMLParser(strip_cdata=False)
-
-        tree: etree._Element = etree.parse(str(original_file), parser)
+        if self.tree_cache is not None:
+            tree, element_text = self.tree_cache.parse(original_file)
+            # 解析树即将被修改并写回文件
+            self.tree_cache.discard(original_file)
+        else:
+            parser = etree.XMLParser(strip_cdata=False)
+            tree: etree._Element = etree.parse(str(original_file), parser)
+            element_text = get_element_CDATA
 
         entry_dict: Dict[str, List[XmlEntry]] = {}
         for entry in entry_list:
@@ -342,6 +291,11 @@ class Applier:
             else:
                 entry_dict[entry.node_tag].append(entry)
 
+        # 应用翻译只修改无子节点的节点文本，不影响其他节点是否有效，可预先建立索引
+        valid_nodes = valid_element_index(
+            tree, [tag for tag in entry_dict if tag != "htmlContent"], element_text
+        )
+
         for tag, entry_cluster in entry_dict.items():
             # special process for htmlContent
             if tag == "htmlContent":
@@ -352,25 +306,28 @@ class Applier:
                     else:
                         entry_dict[entry.attribute] = [entry]
 
+                html_nodes = htmlContent_index(tree)
+
                 for entry_attribute, entries in entry_dict.items():
-                    nodes = tree.xpath(f"//htmlContent[@tag='{entry_attribute}']")
+                    nodes = html_nodes.get(entry_attribute, [])
                     if len(nodes) > 1:
                         for idx, node in enumerate(nodes):
-                            for entry in entries:
-                                xml_node_replace_translation(node, entry)
+                            self.replace_htmlContent(
+                                original_file, entry_attribute, node, entries
+                            )
                     else:
                         node = nodes[0]
-                        for entry in entries:
-                            xml_node_replace_translation(node, entry)
+                        self.replace_htmlContent(
+                            original_file, entry_attribute, node, entries
+                        )
             else:
                 # nodes: List[etree._Element] = list()
-                nodes: List[etree._Element] = list(
-                    filter(valid_element, tree.iter(tag))
-                )
+                node_texts = valid_nodes[tag]
                 for entry in entry_cluster:
                     try:
-                        node = nodes[entry.node_idx]
+                        node, text = node_texts[entry.node_idx]
                     except Exception:
+                        nodes = [node for node, _ in node_texts]
                         logger.error(
                             "****%s[%s]:节点索引超出范围！",
                             entry.node_idx,
@@ -380,28 +337,23 @@ class Applier:
                         for node in nodes:
                             logger.error(node.text)
                         raise Exception
-                    xml_node_replace_translation(node, entry)
-
-        tree.write(
-            original_file.as_posix(),
-            encoding="utf-8",
-            xml_declaration=True,
-            pretty_print=True,
-            standalone=False,
+                    xml_node_replace_translation(node, entry, text)
+
+        # 与tree.write输出相同
+        self.writer.write_bytes(
+            original_file,
+            etree.tostring(
+                tree,
+                encoding="UTF-8",
+                xml_declaration=True,
+                pretty_print=True,
+                standalone=False,
+            ),
         )
 
     def apply_src(self) -> None:
         original_files = [file for file in self.root.glob("**/*.java")]
-        dict_fils = [
-            self.dict_dir.joinpath(file.relative_to(self.root)).with_suffix(".json")
-            for file in original_files
-        ]
-
-        for original_file, dict_file in zip(original_files, dict_fils):
-            if not dict_file.exists():  # 不存在对应字典文件
-                continue
-
-            self.apply_java(original_file, dict_file)
+        self.apply_files("apply_java", original_files)
 
     def apply_java(self, original_file: Path, dict_file: Path) -> None:
         with open(original_file, "r", encoding="utf-8") as f:
@@ -411,8 +363,11 @@ class Applier:
             dict_file.relative_to(self.dict_dir).as_posix()
         ]
 
+        # 沿用相似原文的翻译未经校对，不应用
         entry_list = [
-            CodeEntry.from_json(original_file, entry) for _, entry in json_dict.items()
+            CodeEntry.from_json(original_file, entry)
+            for _, entry in json_dict.items()
+            if FUZZY_FIELD not in entry
         ]
 
         for entry in entry_list:
@@ -422,8 +377,7 @@ class Applier:
             )
             text[entry.line] = applied_text
 
-        with open(original_file, "w", encoding="utf-8") as f:
-            f.writelines(text)
+        self.writer.write_text(original_file, "".join(text))
 
     def apply_java_line(
         self, text: str, original: str, translation: str, file: Path, line: int
@@ -432,46 +386,34 @@ class Applier:
             return text
 
         # 常见错误检测
+        issues: List[Tuple[str, str]] = []
         quote_count = translation.count('"') - translation.count('\\"')
         if quote_count % 2 == 1 and "//" not in translation and "/*" not in translation:
-            logger.warning(
-                "\t****%s[%s]:翻译文本有奇数个双引号！|https://paratranz.cn/projects/%s/strings?text=%s",
-                file.as_posix(),
-                line,
-                PARATRANZ_PROJECT_ID[self.target],
-                quote(original),
-            )
-            print(text)
+            issues.append(("odd_quotes", "翻译文本有奇数个双引号！"))
         if "\\n" in translation and "\\n" not in original:
-            logger.warning(
-                "\t****%s[%s]:翻译文本有额外换行符！|https://paratranz.cn/projects/%s/strings?text=%s",
-                file.as_posix(),
-                line,
-                PARATRANZ_PROJECT_ID[self.target],
-                quote(original),
-            )
+            issues.append(("extra_newline", "翻译文本有额外换行符！"))
             translation = translation.replace("\\n", "")
 
         if original.endswith(",") and not translation.strip().endswith(","):
-            logger.warning(
-                "\t****%s[%s]:翻译文本末尾无逗号！|https://paratranz.cn/projects/%s/strings?text=%s",
-                file.as_posix(),
-                line,
-                PARATRANZ_PROJECT_ID[self.target],
-                quote(original),
-            )
+            issues.append(("missing_comma", "翻译文本末尾无逗号！"))
         elif original.endswith(";") and not translation.strip().endswith(";"):
-            logger.warning(
-                "\t****%s[%s]:翻译文本末尾无分号！|https://paratranz.cn/projects/%s/strings?text=%s",
-                file.as_posix(),
-                line,
-                PARATRANZ_PROJECT_ID[self.target],
-                quote(original),
-            )
+            issues.append(("missing_semicolon", "翻译文本末尾无分号！"))
+
+        if len(issues) > 0:
+            link = f"https://paratranz.cn/projects/{PARATRANZ_PROJECT_ID[self.target]}/strings?text={quote(original)}"
+            for kind, message in issues:
+                diagnostics.report(
+                    kind,
+                    message,
+                    file.as_posix(),
+                    line,
+                    link,
+                    text.rstrip("\n") if kind == "odd_quotes" else None,
+                )
 
         index = text.find(original)
         if index == -1:
-            logger.warning("\t****原文本无匹配！")
+            diagnostics.report("no_match", "原文本无匹配！", file.as_posix(), line)
             return text
         else:
             text = text[:index] + translation + text[index + len(original) :]
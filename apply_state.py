@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from cache import files_digest
+from const import ROOT_DIR, SOURCE_PATCH_FILE, SVG_DIR
+from logger import logger
+
+
+def apply_rules_version() -> str:
+    """
+    应用规则版本：应用逻辑或源码修改规则变动时，所有文件需重新应用
+    """
+    return files_digest(
+        [
+            Path(__file__).parent / name
+            for name in ("applier.py", "source_patch.py", "util.py", "data.py")
+        ]
+        + [
+            Path(ROOT_DIR) / SOURCE_PATCH_FILE,
+            Path(ROOT_DIR) / SVG_DIR / "eisek_mob_hideout.svg",
+            Path(ROOT_DIR) / "replace_file" / "GenderNames.java",
+        ]
+    )
+
+
+def bytes_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class FileState:
+    source: str  # 原始文件内容的哈希
+    dictionary: str  # 所应用字典切片的哈希，无字典时为空
+    rules: str  # 应用规则版本
+    output: str  # 应用后文件内容的哈希
+
+
+class ApplyState:
+    """
+    记录每个目标文件的应用状态(原始内容、所用字典切片、规则版本、应用结果)
+    文件内容等于记录的应用结果时视为已应用，可从保存的原始内容恢复；
+    内容不同时(如源码更新或被重置)视为新的原始文件
+    """
+
+    def __init__(
+        self, state_dir: Path, root: Path, version: Optional[str] = None
+    ) -> None:
+        self.state_dir = Path(state_dir)
+        self.root = Path(root)
+        self.version = version if version is not None else apply_rules_version()
+        self.manifest_path = self.state_dir / "manifest.json"
+        self.files: Dict[str, FileState] = {}
+        # 本次运行中需要重新应用的文件：(原始内容哈希, 字典切片哈希)
+        self.pending: Dict[str, Tuple[str, str]] = {}
+        self.restored = 0
+        self.skipped: Set[str] = set()
+        self.applied = 0
+        # 本次运行中不再应用(如对应字典已删除)而恢复为原始内容的文件数
+        self.dropped = 0
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        for path, state in manifest.get("files", {}).items():
+            self.files[path] = FileState(**state)
+
+    def key(self, file: Path) -> str:
+        return Path(file).relative_to(self.root).as_posix()
+
+    def pristine_path(self, digest: str) -> Path:
+        return self.state_dir / "pristine" / digest[:2] / digest
+
+    def applied_state(self, file: Path) -> Optional[FileState]:
+        """
+        文件当前为上次的应用结果时返回其记录
+        """
+        state = self.files.get(self.key(file))
+        if state is None:
+            return None
+        try:
+            data = Path(file).read_bytes()
+        except FileNotFoundError:
+            return None
+        if bytes_digest(data) != state.output:
+            return None
+        return state
+
+    def pristine_bytes(self, file: Path) -> bytes:
+        """
+        文件的原始内容，未应用过的文件即为当前内容
+        """
+        data = Path(file).read_bytes()
+        state = self.files.get(self.key(file))
+        if state is None or bytes_digest(data) != state.output:
+            return data
+        return self.pristine_path(state.source).read_bytes()
+
+    def restore(self, file: Path) -> bool:
+        """
+        将已应用的文件恢复为原始内容
+        """
+        state = self.applied_state(file)
+        if state is None:
+            return False
+        Path(file).write_bytes(self.pristine_path(state.source).read_bytes())
+        self.restored += 1
+        return True
+
+    def is_current(self, file: Path, dictionary: str) -> bool:
+        """
+        文件已按相同的原始内容、字典切片与规则版本应用过，无需重新应用
+        """
+        state = self.applied_state(file)
+        return (
+            state is not None
+            and state.dictionary == dictionary
+            and state.rules == self.version
+        )
+
+    def begin(self, file: Path, dictionary: str) -> bool:
+        """
+        准备应用文件：输入未变动时返回False；否则恢复原始内容并保存，返回True
+        同一文件在本次运行中只需准备一次
+        """
+        key = self.key(file)
+        if key in self.pending:
+            return True
+        if self.is_current(file, dictionary):
+            self.skipped.add(key)
+            return False
+
+        self.restore(file)
+        data = Path(file).read_bytes()
+        digest = bytes_digest(data)
+        pristine = self.pristine_path(digest)
+        if not pristine.exists():
+            pristine.parent.mkdir(parents=True, exist_ok=True)
+            pristine.write_bytes(data)
+        self.files.pop(key, None)
+        self.pending[key] = (digest, dictionary)
+        return True
+
+    def finish(self) -> None:
+        """
+        记录本次应用的结果，并保存清单
+        上次应用过而本次未访问的文件恢复为原始内容，并移出清单
+        """
+        for key in [
+            key
+            for key in self.files
+            if key not in self.skipped and key not in self.pending
+        ]:
+            self.dropped += self.restore(self.root / key)
+            del self.files[key]
+        for key, (source, dictionary) in self.pending.items():
+            output = bytes_digest(self.root.joinpath(key).read_bytes())
+            self.files[key] = FileState(source, dictionary, self.version, output)
+        self.applied = len(self.pending)
+        self.pending.clear()
+        self.save()
+
+    def save(self) -> None:
+        # 移除已不存在的文件及不再引用的原始内容
+        self.files = {
+            key: state
+            for key, state in sorted(self.files.items())
+            if self.root.joinpath(key).exists()
+        }
+        sources = {state.source for state in self.files.values()}
+        for pristine in self.state_dir.glob("pristine/*/*"):
+            if pristine.name not in sources:
+                pristine.unlink(missing_ok=True)
+
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"files": {key: asdict(state) for key, state in self.files.items()}},
+                f,
+                indent=2,
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+    def report(self) -> None:
+        logger.info(
+            "增量应用：%s个文件输入未变动已跳过，应用%s个文件(其中%s个从原始内容恢复)，"
+            "%s个不再应用的文件已恢复",
+            len(self.skipped),
+            self.applied,
+            self.restored - self.dropped,
+            self.dropped,
+        )
@@ -0,0 +1,532 @@
+import argparse
+import copy
+import json
+import multiprocessing
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from lxml import etree
+
+from applier import Applier
+from data import SingleDictionary
+from extractor import Extractor, JavaExtractor
+from java_lexer import JavaLine, lex_lines
+from synthetic_corpus import generate_corpus
+from update import Updater
+from util import split_htmlContent
+from const import SOURCE_DIR
+from logger import logger
+from tests.legacy import (
+    legacy_apply_xml,
+    legacy_extract_java,
+    legacy_split_htmlContent,
+    legacy_update_data,
+)
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_java_lexer(root: Path, repeat: int) -> None:
+    """
+    对比java词法分析与旧的逐行正则处理在整个src目录上的耗时(两者相当)，并列出提取结果不同的文件
+    """
+    files: List[Path] = sorted(root.joinpath("src").glob("**/*.java"))
+    if len(files) == 0:
+        raise FileNotFoundError(f"No java file found in {root / 'src'}")
+
+    def run_legacy():
+        return [legacy_extract_java(file) for file in files]
+
+    def run_lexer():
+        return [Extractor.extract_java(file) for file in files]
+
+    legacy_time = best_time(run_legacy, repeat)
+    lexer_time = best_time(run_lexer, repeat)
+
+    changed = [
+        file.as_posix()
+        for file, legacy, lexed in zip(files, run_legacy(), run_lexer())
+        if legacy != lexed
+    ]
+
+    logger.info("java文件数：%s", len(files))
+    logger.info("逐行正则：%.3fs", legacy_time)
+    logger.info("词法分析：%.3fs (%.2fx)", lexer_time, legacy_time / lexer_time)
+    logger.info("提取结果不同的文件数：%s", len(changed))
+    for file in changed:
+        logger.info("\t%s", file)
+
+
+def collect_htmlContent(root: Path) -> List[str]:
+    parser = etree.XMLParser(strip_cdata=False)
+    texts: List[str] = []
+    for file in sorted(root.joinpath("res", "txt").glob("**/*.xml")):
+        tree = etree.parse(file.as_posix(), parser)
+        for element in tree.iter("htmlContent"):
+            if element.text is not None and element.text.strip() != "":
+                texts.append(element.text)
+    if len(texts) == 0:
+        raise FileNotFoundError(f"No htmlContent found in {root / 'res' / 'txt'}")
+    return texts
+
+
+def bench_html_split(root: Path, repeat: int) -> None:
+    """
+    对res/txt下所有htmlContent文本进行拆分的耗时，并与旧的拆分对比
+    """
+    texts = collect_htmlContent(root)
+
+    legacy_time = best_time(
+        lambda: [legacy_split_htmlContent(text) for text in texts], repeat
+    )
+    split_time = best_time(lambda: [split_htmlContent(text) for text in texts], repeat)
+
+    blocks = 0
+    changed = 0
+    for text in texts:
+        result = split_htmlContent(text)
+        blocks += len(result)
+        changed += result != legacy_split_htmlContent(text)
+
+    logger.info("htmlContent数：%s，拆分得到文本块：%s", len(texts), blocks)
+    logger.info("旧的拆分耗时：%.3fs", legacy_time)
+    logger.info("拆分耗时：%.3fs (%.2fx)", split_time, legacy_time / split_time)
+    logger.info("拆分结果不同的htmlContent数：%s", changed)
+
+
+def peak_memory_delta(file: Path, streaming: bool) -> int:
+    """
+    在独立进程中提取单个xml文件，返回提取过程中内存峰值(RSS)的增量，单位KB
+    """
+    import resource
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if streaming:
+        Extractor.extract_xml_streaming(file)
+    else:
+        Extractor.extract_xml(file)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return after - before
+
+
+def bench_xml_memory(root: Path, top: int) -> None:
+    """
+    对res下最大的若干个xml文件，分别统计整体解析与流式解析时的内存峰值
+    """
+    files: List[Path] = sorted(
+        root.joinpath("res").glob("**/*.xml"),
+        key=lambda file: file.stat().st_size,
+        reverse=True,
+    )[:top]
+    if len(files) == 0:
+        raise FileNotFoundError(f"No xml file found in {root / 'res'}")
+
+    tasks: List[Tuple[Path, bool]] = [
+        (file, streaming) for file in files for streaming in (False, True)
+    ]
+    # 每个任务使用新进程，避免峰值被之前的文件抬高
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        deltas = pool.starmap(peak_memory_delta, tasks, chunksize=1)
+
+    logger.info("文件大小(KB)\t整体解析(KB)\t流式解析(KB)\t文件")
+    for idx, file in enumerate(files):
+        logger.info(
+            "%s\t%s\t%s\t%s",
+            file.stat().st_size // 1024,
+            deltas[2 * idx],
+            deltas[2 * idx + 1],
+            file.relative_to(root).as_posix(),
+        )
+
+
+def bench_apply_xml(root: Path, repeat: int, top: int) -> None:
+    """
+    在res/txt下最大的若干个文件上，对比应用字典时使用索引与逐个查找节点的耗时
+    所有条目均视为已翻译，文件复制到临时目录后应用
+    """
+    files: List[Path] = sorted(
+        root.joinpath("res", "txt").glob("**/*.xml"),
+        key=lambda file: file.stat().st_size,
+        reverse=True,
+    )[:top]
+    if len(files) == 0:
+        raise FileNotFoundError(f"No xml file found in {root / 'res' / 'txt'}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_root = Path(tmp_dir)
+        dict_dir = tmp_root / "dict"
+        new_data = {}
+        for file in files:
+            entry_dict = Extractor.extract_xml(file)
+            for entry in entry_dict.values():
+                entry["translation"] = "译" + entry["original"]
+                entry["stage"] = 1
+            new_data[file.relative_to(root).with_suffix(".json").as_posix()] = (
+                entry_dict
+            )
+        applier = Applier("main", tmp_root, dict_dir, new_data)
+
+        logger.info("条目数\t逐个查找(s)\t索引(s)\t文件")
+        for file in files:
+            relative = file.relative_to(root)
+            target = tmp_root / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            dict_file = dict_dir / relative.with_suffix(".json")
+
+            def run_legacy():
+                shutil.copyfile(file, target)
+                legacy_apply_xml(applier, target, dict_file)
+
+            def run_index():
+                shutil.copyfile(file, target)
+                applier.apply_xml(target, dict_file)
+
+            legacy_time = best_time(run_legacy, repeat)
+            run_legacy()
+            legacy_result = target.read_bytes()
+            index_time = best_time(run_index, repeat)
+            if target.read_bytes() != legacy_result:
+                logger.warning("应用结果不同：%s", relative.as_posix())
+
+            logger.info(
+                "%s\t%.4f\t%.4f\t%s",
+                len(new_data[relative.with_suffix(".json").as_posix()]),
+                legacy_time,
+                index_time,
+                relative.as_posix(),
+            )
+
+
+def peak_allocation(func: Callable[[], object]) -> int:
+    """
+    执行期间新分配内存的峰值，单位KB
+    """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak // 1024
+
+
+def dictionary_items(data: SingleDictionary) -> List[Tuple[str, Dict]]:
+    return [(key, dict(entry)) for key, entry in data.items()]
+
+
+def bench_merge(root: Path, repeat: int) -> None:
+    """
+    对整个源码目录的提取结果进行字典合并：旧字典由提取结果随机翻译、修改原文、删除部分词条得到
+    对比旧的就地合并(合并前深拷贝旧字典)、纯函数合并及交出新字典(in_place)合并的耗时与内存分配，并校验结果相同
+    """
+    files: List[Path] = sorted(root.joinpath("res").glob("**/*.xml")) + sorted(
+        root.joinpath("src").glob("**/*.java")
+    )
+    if len(files) == 0:
+        raise FileNotFoundError(f"No xml or java file found in {root}")
+
+    rnd = random.Random(0)
+    pairs = []
+    for file in files:
+        if file.suffix == ".xml":
+            new_dict_data = Extractor.extract_xml(file)
+        else:
+            new_dict_data = Extractor.extract_java(file)
+        old_dict_data = {}
+        for key, entry in copy.deepcopy(new_dict_data).items():
+            r = rnd.random()
+            if r < 0.1:
+                continue
+            if r < 0.2:
+                entry["original"] += " changed"
+            entry["translation"] = "译" + entry["original"]
+            entry["stage"] = rnd.choice([0, 1, 2, 5])
+            old_dict_data[key] = entry
+        pairs.append((old_dict_data, new_dict_data))
+    entries = sum(len(old_dict_data) for old_dict_data, _ in pairs)
+
+    # 旧的就地合并会修改新词条，每次运行前复制一份新提取结果(不计时)
+    def fresh_pairs():
+        return [
+            (old_dict_data, copy.deepcopy(new_dict_data))
+            for old_dict_data, new_dict_data in pairs
+        ]
+
+    def run_legacy(inputs):
+        return [
+            legacy_update_data(copy.deepcopy(old_dict_data), new_dict_data)
+            for old_dict_data, new_dict_data in inputs
+        ]
+
+    def run_pure(inputs):
+        return [
+            Updater.update_data(old_dict_data, new_dict_data)
+            for old_dict_data, new_dict_data in inputs
+        ]
+
+    def run_owned(inputs):
+        return [
+            Updater.update_data(old_dict_data, new_dict_data, in_place=True)
+            for old_dict_data, new_dict_data in inputs
+        ]
+
+    def timed(run) -> float:
+        best = float("inf")
+        for _ in range(repeat):
+            inputs = fresh_pairs()
+            start = time.perf_counter()
+            run(inputs)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    legacy_results = run_legacy(fresh_pairs())
+    for run in (run_pure, run_owned):
+        for file, legacy, result in zip(files, legacy_results, run(fresh_pairs())):
+            for legacy_data, data in zip(legacy, result):
+                if dictionary_items(legacy_data) != dictionary_items(data):
+                    raise AssertionError(f"Merged dictionaries differ: {file}")
+
+    legacy_time = timed(run_legacy)
+    pure_time = timed(run_pure)
+    inputs = fresh_pairs()
+    legacy_peak = peak_allocation(lambda: run_legacy(inputs))
+    inputs = fresh_pairs()
+    pure_peak = peak_allocation(lambda: run_pure(inputs))
+    owned_time = timed(run_owned)
+    inputs = fresh_pairs()
+    owned_peak = peak_allocation(lambda: run_owned(inputs))
+
+    logger.info("文件数：%s，旧词条数：%s，三种合并结果相同", len(pairs), entries)
+    logger.info("就地合并(深拷贝旧字典)：%.3fs，分配峰值%sKB", legacy_time, legacy_peak)
+    logger.info(
+        "纯函数合并：%.3fs (%.2fx)，分配峰值%sKB",
+        pure_time,
+        legacy_time / pure_time,
+        pure_peak,
+    )
+    logger.info(
+        "交出新字典合并：%.3fs (%.2fx)，分配峰值%sKB",
+        owned_time,
+        legacy_time / owned_time,
+        owned_peak,
+    )
+
+
+def bench_extract(root: Path, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    分别统计xml提取、java提取、htmlContent拆分与java逐行处理的耗时
+    """
+    xml_files: List[Path] = sorted(root.joinpath("res").glob("**/*.xml"))
+    java_files: List[Path] = sorted(root.joinpath("src").glob("**/*.java"))
+    if len(xml_files) == 0 or len(java_files) == 0:
+        raise FileNotFoundError(f"No xml or java file found in {root}")
+    texts = collect_htmlContent(root)
+
+    # 逐行处理只计入规则匹配，不含读文件与词法分析
+    java_lines: List[Tuple[Path, List[Tuple[str, JavaLine]]]] = []
+    for file in java_files:
+        with open(file, "r", encoding="utf-8") as f:
+            lines = [(line.code.strip(), line) for line in lex_lines(f.read())]
+        java_lines.append((file, [item for item in lines if len(item[0]) > 0]))
+    line_count = sum(len(lines) for _, lines in java_lines)
+
+    def run_java_lines():
+        for file, lines in java_lines:
+            java_extractor = JavaExtractor.for_file(file)
+            for line, java_line in lines:
+                java_extractor.parse_triggers(line)
+                java_extractor.general_string_parse(
+                    line, java_line.has_string, java_line.ends_statement
+                )
+
+    suites: Dict[str, Tuple[Callable[[], object], int]] = {
+        "extract_xml": (
+            lambda: [Extractor.extract_xml(file) for file in xml_files],
+            len(xml_files),
+        ),
+        "extract_java": (
+            lambda: [Extractor.extract_java(file) for file in java_files],
+            len(java_files),
+        ),
+        "split_htmlContent": (
+            lambda: [split_htmlContent(text) for text in texts],
+            len(texts),
+        ),
+        "java_extractor_line": (run_java_lines, line_count),
+    }
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (func, items) in suites.items():
+        seconds = best_time(func, repeat)
+        results[name] = {
+            "seconds": seconds,
+            "items": items,
+            "us_per_item": seconds / items * 1e6,
+        }
+        logger.info(
+            "%s：%.3fs，%s项，每项%.2fus",
+            name,
+            seconds,
+            items,
+            results[name]["us_per_item"],
+        )
+    return results
+
+
+def save_results(
+    results: Dict[str, Dict[str, float]], output: Path, corpus: Dict[str, object]
+) -> None:
+    data = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "corpus": corpus,
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    logger.info("基准测试结果已保存：%s", output.as_posix())
+
+
+def compare_results(baseline: Path, current: Path, threshold: float) -> List[str]:
+    """
+    按每项耗时对比两次结果，慢于基准超过threshold比例的记为性能退化
+    """
+    with open(baseline, "r", encoding="utf-8") as f:
+        base_data = json.load(f)
+    with open(current, "r", encoding="utf-8") as f:
+        current_data = json.load(f)
+
+    if base_data.get("corpus") != current_data.get("corpus"):
+        logger.warning("两次测试使用的语料不同，对比结果仅供参考")
+
+    regressions: List[str] = []
+    for name, base in base_data["results"].items():
+        result = current_data["results"].get(name)
+        if result is None:
+            logger.warning("%s：当前结果中不存在", name)
+            continue
+        ratio = result["us_per_item"] / base["us_per_item"]
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            logger.warning(
+                "%s：%.2fus -> %.2fus (%.2fx)，性能退化",
+                name,
+                base["us_per_item"],
+                result["us_per_item"],
+                ratio,
+            )
+        else:
+            logger.info(
+                "%s：%.2fus -> %.2fus (%.2fx)",
+                name,
+                base["us_per_item"],
+                result["us_per_item"],
+                ratio,
+            )
+    return regressions
+
+
+argparser = argparse.ArgumentParser()
+argparser.add_argument(
+    "suite",
+    type=str,
+    choices=[
+        "java-lexer",
+        "html-split",
+        "xml-memory",
+        "apply-xml",
+        "merge",
+        "extract",
+        "compare",
+    ],
+    help="which benchmark to run",
+)
+argparser.add_argument(
+    "--root",
+    type=str,
+    default=SOURCE_DIR["main"],
+    help="game source directory to run the benchmark on",
+)
+argparser.add_argument(
+    "--repeat", type=int, default=3, help="number of runs, the best one is reported"
+)
+argparser.add_argument(
+    "--top", type=int, default=20, help="number of largest xml files to measure"
+)
+argparser.add_argument(
+    "--synthetic",
+    action="store_true",
+    default=False,
+    help="whether to run on a generated corpus instead of the game source",
+)
+argparser.add_argument(
+    "--scale", type=int, default=1, help="size multiplier of the synthetic corpus"
+)
+argparser.add_argument(
+    "--seed", type=int, default=0, help="random seed of the synthetic corpus"
+)
+argparser.add_argument(
+    "--results",
+    type=str,
+    default="benchmark_results.json",
+    help="file the extract suite writes to and the compare suite reads from",
+)
+argparser.add_argument(
+    "--baseline", type=str, default=None, help="stored results to compare against"
+)
+argparser.add_argument(
+    "--threshold",
+    type=float,
+    default=0.1,
+    help="relative slowdown reported as a regression",
+)
+
+
+if __name__ == "__main__":
+    args = argparser.parse_args()
+
+    if args.suite == "compare":
+        if args.baseline is None:
+            argparser.error("--baseline is required for the compare suite")
+        regressions = compare_results(
+            Path(args.baseline), Path(args.results), args.threshold
+        )
+        sys.exit(1 if len(regressions) > 0 else 0)
+
+    tmp_dir = None
+    if args.synthetic:
+        tmp_dir = tempfile.TemporaryDirectory()
+        args.root = generate_corpus(Path(tmp_dir.name), args.scale, args.seed)
+        corpus = {"synthetic": True, "scale": args.scale, "seed": args.seed}
+    else:
+        corpus = {"synthetic": False, "root": Path(args.root).as_posix()}
+
+    if args.suite == "extract":
+        results = bench_extract(Path(args.root), args.repeat)
+        save_results(results, Path(args.results), corpus)
+    elif args.suite == "java-lexer":
+        bench_java_lexer(Path(args.root), args.repeat)
+    elif args.suite == "html-split":
+        bench_html_split(Path(args.root), args.repeat)
+    elif args.suite == "xml-memory":
+        bench_xml_memory(Path(args.root), args.top)
+    elif args.suite == "apply-xml":
+        bench_apply_xml(Path(args.root), args.repeat, args.top)
+    elif args.suite == "merge":
+        bench_merge(Path(args.root), args.repeat)
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
@@ -0,0 +1,145 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from data import JsonEntry, SingleDictionary, json_default
+from logger import logger
+
+
+def files_digest(files: Iterable[Path]) -> str:
+    """
+    根据若干源文件内容计算版本号，任一文件变动即得到新版本
+    """
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(Path(file).name.encode("utf-8"))
+        digest.update(Path(file).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def sources_digest(*items: object) -> str:
+    """
+    根据若干函数、类的源码及规则表等数据的repr计算版本号，任一项变动即得到新版本
+    """
+    digest = hashlib.sha256()
+    for item in items:
+        if inspect.isfunction(item) or inspect.isclass(item) or inspect.ismodule(item):
+            text = inspect.getsource(item)
+        elif isinstance(item, (set, frozenset)):
+            text = repr(sorted(item))
+        else:
+            text = repr(item)
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ExtractionCache:
+    """
+    以文件内容哈希+提取规则版本为键，缓存单个文件的提取结果(SingleDictionary)
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        version: str,
+        max_size: int = 512 * 1024 * 1024,
+        max_age: float = 30 * 24 * 3600,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.version = version
+        self.max_size = max_size  # 缓存总大小上限(字节)
+        self.max_age = max_age  # 缓存条目最长保留时间(秒)
+        self.hits = 0
+        self.misses = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, file: Path, data: Optional[bytes] = None) -> str:
+        """
+        data为文件内容，默认从file读取
+        """
+        # 路径也参与计算：部分提取规则依赖文件名与所在目录
+        digest = hashlib.sha256()
+        digest.update(self.version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(file.as_posix().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(file.read_bytes() if data is None else data)
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[SingleDictionary]:
+        path = self.entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw_dict = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        entry_dict: SingleDictionary = {
+            sys.intern(key): JsonEntry.from_json(entry_json)
+            for key, entry_json in raw_dict.items()
+        }
+
+        # 更新修改时间，淘汰时按最近使用排序
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry_dict
+
+    def put(self, key: str, entry_dict: SingleDictionary) -> None:
+        path = self.entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry_dict, f, ensure_ascii=False, default=json_default)
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """
+        移除过期条目，并在超出大小上限时从最久未使用的条目开始移除
+        """
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        total_size = 0
+        kept = []
+        for mtime, size, path in entries:
+            if now - mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                total_size += size
+                kept.append((mtime, size, path))
+
+        kept.sort(key=lambda x: x[0])
+        for mtime, size, path in kept:
+            if total_size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+            removed += 1
+
+        return removed
+
+    def report(self) -> None:
+        logger.info(
+            "提取缓存：命中%s个文件，重新提取%s个文件", self.hits, self.misses
+        )
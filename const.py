@@ -27,8 +27,16 @@ NEW_DICT_DIR: Dict = {"main": "./new_dict", "mod": "./new_mod_dict"}
 OLD_DICT_DIR: Dict = {"main": "./old_dict", "mod": "./old_mod_dict"}
 ENTRY_DIFF_DIR: Dict = {"main": "./entry_diff", "mod": "./entry_mod_diff"}
 TRANS_DIFF_DIR: Dict = {"main": "./translation_diff", "mod": "./translation_mod_diff"}
+EXTRACT_CACHE_DIR: Dict = {"main": "./extract_cache", "mod": "./extract_mod_cache"}
+APPLY_STATE_DIR: Dict = {"main": "./apply_state", "mod": "./apply_mod_state"}
+DIAGNOSTICS_FILE: Dict = {"main": "./diagnostics.jsonl", "mod": "./diagnostics_mod.jsonl"}
+OUTDATED_STORE_FILE: Dict = {
+    "main": "./outdated_entries.sqlite3",
+    "mod": "./outdated_entries_mod.sqlite3",
+}
 FONT_DIR = "./resources/font"
 SVG_DIR = "./resources/svg"
+SOURCE_PATCH_FILE = "./resources/patch/source_patch.json"
 FONT_TARGET_DIR = "./res/fonts"
 
 EXE_PLUGIN_PATH = "./exe-plugin.xml"
@@ -36,6 +44,9 @@ EXE_PLUGIN_PATH = "./exe-plugin.xml"
 OUTDATE_DIR_NAME = "过时词条"
 FONT_DIR_NAME = "Source Han"
 
+# 由相似原文沿用翻译的词条带有该字段(值为原文相似度)，需校对，应用字典时跳过
+FUZZY_FIELD = "fuzzy"
+
 
 BLACKLIST_FILE = ["SexActionManager.java"]
 
@@ -72,12 +83,18 @@ __all__ = [
     "SOURCE_DIR",
     "NEW_DICT_DIR",
     "OLD_DICT_DIR",
+    "EXTRACT_CACHE_DIR",
+    "APPLY_STATE_DIR",
+    "DIAGNOSTICS_FILE",
+    "OUTDATED_STORE_FILE",
     "FONT_DIR",
     "SVG_DIR",
+    "SOURCE_PATCH_FILE",
     "FONT_TARGET_DIR",
     "EXE_PLUGIN_PATH",
     "OUTDATE_DIR_NAME",
     "FONT_DIR_NAME",
+    "FUZZY_FIELD",
     "BLACKLIST_FILE",
     "BLACKLIST_HTMLCONTENT",
 ]
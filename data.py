@@ -1,8 +1,140 @@
+import sys
+from collections.abc import MutableMapping
 from dataclasses import dataclass
-from typing import Optional, Dict, List
+from typing import Any, Iterator, Optional, Dict, List
 from pathlib import Path
 
-JsonEntry = Dict
+ENTRY_FIELDS = ("key", "original", "translation", "stage")
+
+
+class JsonEntry(MutableMapping):
+    """
+    单个词条，按字典方式访问，固定字段存放在__slots__中以节省内存
+    键会被驻留(intern)，新旧字典中相同的键共用同一字符串
+    字典文件中的其他字段存放在extra中，写回时原样保留
+    字段顺序与普通字典相同，仅在顺序不同于ENTRY_FIELDS+extra时才记录在order中
+    """
+
+    __slots__ = ENTRY_FIELDS + ("extra", "order")
+
+    def __init__(
+        self,
+        key: Optional[str] = None,
+        original: Optional[str] = None,
+        translation: Optional[str] = None,
+        stage: Optional[int] = None,
+    ) -> None:
+        # 值为None的字段视为不存在，与缺少该字段的json对象一致
+        if key is not None:
+            self.key = sys.intern(key)
+        if original is not None:
+            self.original = original
+        if translation is not None:
+            self.translation = translation
+        if stage is not None:
+            self.stage = stage
+        self.extra: Optional[Dict[str, Any]] = None
+        self.order: Optional[List[str]] = None
+
+    @staticmethod
+    def from_json(entry_json: Dict[str, Any]) -> "JsonEntry":
+        entry = JsonEntry()
+        for name, value in entry_json.items():
+            entry[name] = value
+        return entry
+
+    def __getitem__(self, name: str) -> Any:
+        if name in ENTRY_FIELDS:
+            try:
+                return getattr(self, name)
+            except AttributeError:
+                raise KeyError(name) from None
+        if self.extra is None:
+            raise KeyError(name)
+        return self.extra[name]
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name in ENTRY_FIELDS:
+            is_new = not hasattr(self, name)
+            # 新字段之后的字段已存在时，新字段应排在末尾
+            if is_new and self.order is None:
+                later = ENTRY_FIELDS[ENTRY_FIELDS.index(name) + 1 :]
+                if self.extra or any(hasattr(self, n) for n in later):
+                    self.order = list(self)
+        else:
+            is_new = self.extra is None or name not in self.extra
+        if is_new and self.order is not None:
+            self.order.append(name)
+
+        if name == "key":
+            self.key = sys.intern(value) if isinstance(value, str) else value
+        elif name in ENTRY_FIELDS:
+            setattr(self, name, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+
+    def __delitem__(self, name: str) -> None:
+        if name in ENTRY_FIELDS:
+            try:
+                delattr(self, name)
+            except AttributeError:
+                raise KeyError(name) from None
+        elif self.extra is None:
+            raise KeyError(name)
+        else:
+            del self.extra[name]
+        if self.order is not None:
+            self.order.remove(name)
+
+    def __iter__(self) -> Iterator[str]:
+        if self.order is not None:
+            yield from list(self.order)
+            return
+        for name in ENTRY_FIELDS:
+            if hasattr(self, name):
+                yield name
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        count = sum(1 for name in ENTRY_FIELDS if hasattr(self, name))
+        return count + (len(self.extra) if self.extra is not None else 0)
+
+    def __copy__(self) -> "JsonEntry":
+        entry = JsonEntry()
+        for name in ENTRY_FIELDS:
+            if hasattr(self, name):
+                setattr(entry, name, getattr(self, name))
+        entry.extra = dict(self.extra) if self.extra is not None else None
+        entry.order = list(self.order) if self.order is not None else None
+        return entry
+
+    def __repr__(self) -> str:
+        return f"JsonEntry({dict(self)!r})"
+
+
+def json_default(obj: Any) -> Any:
+    """
+    json.dump的default参数，将词条转换为普通字典
+    """
+    if isinstance(obj, JsonEntry):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def load_entries(entry_list: List[Dict[str, Any]]) -> Dict[str, JsonEntry]:
+    """
+    将字典文件中的词条列表转换为以key为键的词条字典
+    """
+    entries: Dict[str, JsonEntry] = {}
+    for entry_json in entry_list:
+        entry = JsonEntry.from_json(entry_json)
+        entries[entry["key"]] = entry
+    return entries
+
+
 WholeDictionary = Dict[Path, Dict[str, JsonEntry]]
 SingleDictionary = Dict[str, JsonEntry]
 
@@ -14,7 +146,7 @@ class Entry:
     translation: str
     stage: int
 
-    def to_json(self) -> dict:
+    def to_json(self) -> JsonEntry:
         pass
 
     def to_id(self) -> str:
@@ -28,28 +160,23 @@ class XmlEntry(Entry):
     node_idx: Optional[int]
 
     @staticmethod
-    def from_json(file: Path, entry_json: Dict[str, str]) -> "XmlEntry":
-        if "." in entry_json["key"]:
-            entry_json["key"] = entry_json["key"][: entry_json["key"].rfind("_")]
+    def from_json(file: Path, entry_json: JsonEntry) -> "XmlEntry":
+        key = entry_json["key"]
+        if "." in key:
+            key = entry_json["key"] = key[: key.rfind("_")]
+        parts = key.split("_")
         return XmlEntry(
             file=file.as_posix(),
             original=entry_json["original"],
             translation=entry_json["translation"],
-            node_tag=entry_json["key"].split("_")[0],
-            attribute=entry_json["key"].split("_")[1].replace("-", "_")
-            if entry_json["key"].split("_")[1] != "text"
-            else None,
+            node_tag=parts[0],
+            attribute=parts[1].replace("-", "_") if parts[1] != "text" else None,
             stage=entry_json["stage"] if entry_json.get("stage") is not None else 0,
-            node_idx=int(entry_json["key"].split("_")[-1]),
+            node_idx=int(parts[-1]),
         )
 
-    def to_json(self) -> Dict:
-        return {
-            "key": self.to_id(),
-            "original": self.original,
-            "translation": self.translation,
-            "stage": self.stage,
-        }
+    def to_json(self) -> JsonEntry:
+        return JsonEntry(self.to_id(), self.original, self.translation, self.stage)
 
     def to_id(self) -> str:
         return f"{self.node_tag}_{self.attribute if self.attribute is not None else 'text'}"
@@ -60,24 +187,20 @@ class CodeEntry(Entry):
     line: int
 
     @staticmethod
-    def from_json(file: Path, entry_json: Dict[str, str]) -> "CodeEntry":
-        if "." in entry_json["key"]:
-            entry_json["key"] = entry_json["key"][: entry_json["key"].rfind("_")]
+    def from_json(file: Path, entry_json: JsonEntry) -> "CodeEntry":
+        key = entry_json["key"]
+        if "." in key:
+            key = entry_json["key"] = key[: key.rfind("_")]
         return CodeEntry(
             file=file.as_posix(),
             original=entry_json["original"],
             translation=entry_json["translation"],
-            line=int(entry_json["key"]),
+            line=int(key),
             stage=entry_json["stage"] if entry_json.get("stage") is not None else 0,
         )
 
-    def to_json(self) -> Dict:
-        return {
-            "key": self.to_id(),
-            "original": self.original,
-            "translation": self.translation,
-            "stage": self.stage,
-        }
+    def to_json(self) -> JsonEntry:
+        return JsonEntry(self.to_id(), self.original, self.translation, self.stage)
 
     def to_id(self) -> str:
         return f"{self.line:0>5}"
@@ -0,0 +1,142 @@
+import json
+import logging
+import queue
+from collections import Counter
+from dataclasses import asdict, dataclass
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from logger import logger, diagnostics_logger
+
+# 诊断类别及其说明，用于控制台汇总
+KINDS: Dict[str, str] = {
+    "odd_quotes": "翻译文本有奇数个双引号",
+    "extra_newline": "翻译文本有额外换行符",
+    "missing_comma": "翻译文本末尾无逗号",
+    "missing_semicolon": "翻译文本末尾无分号",
+    "no_match": "原文本无匹配",
+    "overlapping_blocks": "文本块相互重叠",
+    "missing_entries": "文件存在遗失条目",
+    "removed_file": "文件在新提取中已不存在",
+    "empty_file": "文件不再包含任何条目",
+    "memory_translation": "沿用其他词条的翻译",
+    "fuzzy_translation": "沿用相似原文的翻译",
+    "unmatched_patch_rule": "源码修改规则未生效",
+    "missing_patch_file": "源码修改规则未找到文件",
+    "xml_peak_memory": "流式解析xml的内存峰值",
+}
+
+# 控制台输出级别：0仅输出各类别数量，1另输出每类前几条，2输出全部记录
+QUIET, SUMMARY, VERBOSE = 0, 1, 2
+SUMMARY_SAMPLES = 3
+
+
+@dataclass
+class Diagnostic:
+    kind: str
+    message: str
+    file: Optional[str] = None
+    line: Optional[int] = None
+    link: Optional[str] = None  # Paratranz中对应词条的链接
+    detail: Optional[str] = None  # 相关的代码行、词条key等
+
+    def format(self) -> str:
+        text = "\t****"
+        if self.file is not None:
+            text += self.file if self.line is None else f"{self.file}[{self.line}]"
+            text += ":"
+        text += self.message
+        if self.link is not None:
+            text += f"|{self.link}"
+        if self.detail is not None:
+            text += f"\n\t{self.detail}"
+        return text
+
+
+def report(
+    kind: str,
+    message: str,
+    file: Optional[str] = None,
+    line: Optional[int] = None,
+    link: Optional[str] = None,
+    detail: Optional[str] = None,
+    level: int = logging.WARNING,
+) -> None:
+    """
+    记录一条诊断，未启用Diagnostics时与普通日志一样直接输出
+    """
+    diagnostic = Diagnostic(kind, message, file, line, link, detail)
+    diagnostics_logger.log(
+        level, "%s", diagnostic.format(), extra={"diagnostic": diagnostic}
+    )
+
+
+class DiagnosticCollector(logging.Handler):
+    """
+    在QueueListener的线程中接收诊断记录
+    """
+
+    def __init__(self, verbosity: int) -> None:
+        super().__init__()
+        self.verbosity = verbosity
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+        if self.verbosity >= VERBOSE:
+            logger.log(record.levelno, record.getMessage())
+
+
+class Diagnostics:
+    """
+    汇总运行期间的诊断记录：经队列交给后台线程收集，避免逐条同步输出到控制台
+    结束时写入JSONL报告，并在控制台输出简短汇总
+    """
+
+    def __init__(self, report_file: Path, verbosity: int = SUMMARY) -> None:
+        self.report_file = Path(report_file)
+        self.verbosity = verbosity
+        self.collector = DiagnosticCollector(verbosity)
+        self.queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.handler = QueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, self.collector)
+        self.propagate = diagnostics_logger.propagate
+
+    def __enter__(self) -> "Diagnostics":
+        diagnostics_logger.addHandler(self.handler)
+        diagnostics_logger.propagate = False
+        self.listener.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.listener.stop()
+        diagnostics_logger.removeHandler(self.handler)
+        diagnostics_logger.propagate = self.propagate
+        self.write_report()
+        self.summary()
+
+    def diagnostics(self) -> List[Diagnostic]:
+        return [record.diagnostic for record in self.collector.records]
+
+    def write_report(self) -> None:
+        self.report_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.report_file, "w", encoding="utf-8") as f:
+            for record in self.collector.records:
+                item = {"level": record.levelname}
+                item.update(asdict(record.diagnostic))
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def summary(self) -> None:
+        records = self.collector.records
+        logger.info(
+            "诊断记录：共%s条，已写入%s", len(records), self.report_file.as_posix()
+        )
+        counts = Counter(record.diagnostic.kind for record in records)
+        for kind, count in counts.most_common():
+            logger.info("\t%s：%s条", KINDS.get(kind, kind), count)
+            if self.verbosity != SUMMARY:
+                continue
+            samples = [r for r in records if r.diagnostic.kind == kind]
+            for record in samples[:SUMMARY_SAMPLES]:
+                logger.log(record.levelno, record.getMessage())
@@ -1,14 +1,27 @@
+import logging
 import re
-from typing import List, Optional, Dict
+import sys
+from typing import List, Optional, Dict, Tuple, Callable
+from functools import partial
 from pathlib import Path
 import json
-import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 
 from lxml import etree
 
-from data import XmlEntry, CodeEntry, FilePair, WholeDictionary, SingleDictionary
+from data import XmlEntry, CodeEntry, FilePair, WholeDictionary, SingleDictionary, JsonEntry
 from const import BLACKLIST_FILE, BLACKLIST_HTMLCONTENT
+import util
 from util import split_htmlContent, get_element_CDATA
+from cache import ExtractionCache, sources_digest
+import java_lexer
+from java_lexer import lex_lines
+from logger import logger
+import diagnostics
+from peak_memory import measure_peak_memory
+from tree_cache import ElementText, TreeCache
+from apply_state import ApplyState
 
 
 def try_xml_entry_attrib(
@@ -28,8 +41,10 @@ def try_xml_entry_attrib(
         return None
 
 
-def try_xml_entry_text(file: str, element: etree._Element) -> Optional[XmlEntry]:
-    text = get_element_CDATA(element)
+def try_xml_entry_text(
+    file: str, element: etree._Element, element_text: ElementText = get_element_CDATA
+) -> Optional[XmlEntry]:
+    text = element_text(element)
 
     if text is None:
         return None
@@ -84,12 +99,258 @@ def get_splited_htmlContent(file: Path, element: etree._Element) -> List[XmlEntr
     ]
 
 
+@dataclass
+class XmlTagRule:
+    tag: str
+    exclude_parents: Tuple[str, ...] = ()  # 父节点为其中之一时跳过
+    require_parents: Tuple[str, ...] = ()  # 仅当父节点为其中之一时提取
+    html_content: bool = False  # 是否按htmlContent拆分成小段
+
+    def extract(
+        self,
+        xml_path: Path,
+        element: etree._Element,
+        element_text: ElementText = get_element_CDATA,
+    ) -> List[XmlEntry]:
+        if self.exclude_parents or self.require_parents:
+            parent = element.getparent()
+            parent_tag = parent.tag if parent is not None else None
+            if parent_tag in self.exclude_parents:
+                return []
+            if self.require_parents and parent_tag not in self.require_parents:
+                return []
+
+        if self.html_content:
+            return get_splited_htmlContent(xml_path, element)
+
+        e = try_xml_entry_text(xml_path.as_posix(), element, element_text)
+        return [e] if e is not None else []
+
+
+def _tag_rules(*rules: XmlTagRule) -> Dict[str, XmlTagRule]:
+    registry: Dict[str, XmlTagRule] = {}
+    for rule in rules:
+        if rule.tag in registry:
+            raise ValueError(f"Duplicated xml tag rule: {rule.tag}")
+        registry[rule.tag] = rule
+    return registry
+
+
+# xml标签提取规则，登记顺序即条目在字典中的顺序
+XML_TAG_RULES: Dict[str, XmlTagRule] = _tag_rules(
+    # exportedCharacter
+    XmlTagRule("name", exclude_parents=("formattingNames",)),
+    XmlTagRule("namePlural"),
+    XmlTagRule("description"),
+    # clothing
+    XmlTagRule("determiner"),
+    XmlTagRule("self"),
+    XmlTagRule("other"),
+    XmlTagRule("otherRough"),
+    XmlTagRule("clothingAuthorTag"),
+    XmlTagRule("authorTag"),
+    ## sticker related
+    XmlTagRule("stickerName"),
+    XmlTagRule("namePrefix"),
+    XmlTagRule("namePostfix"),
+    XmlTagRule("descriptionModification"),
+    # combat move nodes
+    XmlTagRule("availabilityDescription"),
+    XmlTagRule("criticalDescription"),
+    XmlTagRule("movePredictionDescriptionWithTarget"),
+    XmlTagRule("movePredictionDescriptionNoTarget"),
+    XmlTagRule("execute"),
+    XmlTagRule("critDescription"),
+    XmlTagRule("critEffectDescription"),
+    # dialogueNodes
+    XmlTagRule("title"),
+    XmlTagRule("responseTitle"),
+    XmlTagRule("responseTooltip"),
+    XmlTagRule("effects", require_parents=("response",)),
+    XmlTagRule("preParsingEffects"),
+    XmlTagRule("combatant"),
+    # item
+    XmlTagRule("useDescriptor"),
+    XmlTagRule("potionDescriptor"),
+    # effectTooltipLines
+    XmlTagRule("line"),
+    XmlTagRule("applyEffects"),
+    # useDescriptor
+    XmlTagRule("selfUse"),
+    XmlTagRule("otherUse"),
+    # placeType
+    XmlTagRule("tooltipDescription"),
+    XmlTagRule("virginityLossDescription"),
+    # worldType
+    XmlTagRule("sexBlockedReason"),
+    # race
+    XmlTagRule("defaultTransformName"),
+    # subspecies
+    XmlTagRule("bookName"),
+    XmlTagRule("singularMaleName"),
+    XmlTagRule("singularFemaleName"),
+    XmlTagRule("pluralMaleName"),
+    XmlTagRule("pluralFemaleName"),
+    XmlTagRule("nameSillyMode"),
+    XmlTagRule("namePluralSillyMode"),
+    XmlTagRule("nameHalfDemon"),
+    XmlTagRule("namePluralHalfDemon"),
+    XmlTagRule("singularMaleNameHalfDemon"),
+    XmlTagRule("singularFemaleNameHalfDemon"),
+    XmlTagRule("pluralMaleNameHalfDemon"),
+    XmlTagRule("pluralFemaleNameHalfDemon"),
+    XmlTagRule("feralName"),
+    XmlTagRule("feralNamePlural"),
+    XmlTagRule("feralSingularMaleName"),
+    XmlTagRule("feralSingularFemaleName"),
+    XmlTagRule("feralPluralMaleName"),
+    XmlTagRule("feralPluralFemaleName"),
+    XmlTagRule("statusEffectDescription"),
+    # bookText / txt / dialogue
+    XmlTagRule("htmlContent", html_content=True),
+    # Bodyparts
+    XmlTagRule("transformationName"),
+    XmlTagRule("transformationDescription"),
+    XmlTagRule("bodyDescription"),
+    XmlTagRule("crotchBoobsTransformationDescription"),
+    XmlTagRule("crotchBoobsBodyDescription"),
+    XmlTagRule("descriptor"),
+    XmlTagRule("handName"),
+    XmlTagRule("handNamePlural"),
+    XmlTagRule("fingerName"),
+    XmlTagRule("fingerNamePlural"),
+    XmlTagRule("noseName"),
+    XmlTagRule("tipName"),
+    XmlTagRule("tipNamePlural"),
+    # sexAction
+    XmlTagRule("tooltip"),
+    XmlTagRule("text"),
+    # sexManager
+    XmlTagRule("deskName"),
+    XmlTagRule("wallName"),
+    XmlTagRule("startingDescription"),
+    # statusEffect
+    XmlTagRule("effect", exclude_parents=("statusEffects",)),
+    # tatto
+    XmlTagRule("bodyOverviewDescription"),
+    # txt / dialogue
+    XmlTagRule("tab"),
+    # weapon
+    XmlTagRule("attackDescriptor"),
+    XmlTagRule("attackTooltipDescription"),
+    XmlTagRule("equipText"),
+    XmlTagRule("unequipText"),
+    XmlTagRule("hitText"),
+    XmlTagRule("criticalHitText"),
+    XmlTagRule("missText"),
+    XmlTagRule("onCriticalHitEffect"),
+    # names
+    XmlTagRule("fem"),
+    XmlTagRule("and"),
+    XmlTagRule("mas"),
+)
+
+
+def build_xml_entry_dict(tag_entries: Dict[str, List[XmlEntry]]) -> SingleDictionary:
+    """
+    按规则登记顺序插入条目，同一标签与属性下的条目依次编号
+    """
+    entry_dict: SingleDictionary = {}
+    entry_cluster: Dict[str, Dict[str, int]] = {}
+
+    def insert_entry(entry: Optional[XmlEntry]):
+        if entry is None:
+            return
+        tag = entry.node_tag
+        attrib = entry.attribute if entry.attribute is not None else "text"
+
+        entry_json = entry.to_json()
+        if entry_cluster.get(tag) is None:
+            entry_cluster[tag] = {attrib: 0}
+        elif entry_cluster[tag].get(attrib) is None:
+            entry_cluster[tag][attrib] = 0
+        else:
+            entry_cluster[tag][attrib] += 1
+
+        entry_json["key"] += "_" + str(entry_cluster[tag][attrib])
+        entry_dict[entry_json["key"]] = entry_json
+
+    for tag in XML_TAG_RULES:
+        for e in tag_entries[tag]:
+            insert_entry(e)
+
+    return entry_dict
+
+
+def extractor_rules_version() -> str:
+    """
+    提取规则版本：只根据决定提取结果的代码与规则表计算，这些输入变动时缓存自动失效
+    """
+    return sources_digest(
+        # xml
+        try_xml_entry_attrib,
+        try_xml_entry_text,
+        get_splited_htmlContent,
+        XmlTagRule,
+        XML_TAG_RULES,
+        build_xml_entry_dict,
+        Extractor.extract_xml,
+        Extractor.extract_xml_streaming,
+        TreeCache.element_text,
+        util.split_htmlContent,
+        util._findall,
+        util.BLOCK_REGEXES,
+        util.FILTERED_BLOCK_REGEXES,
+        util.get_element_CDATA,
+        BLACKLIST_HTMLCONTENT,
+        # java
+        Extractor.extract_java,
+        java_lexer,
+        NORMAL_TRIGGERS,
+        DIRECTORY_TRIGGERS,
+        route_java_file,
+        TriggerMatcher,
+        SKIP_LINE_REGEX,
+        JavaExtractor,
+        BLACKLIST_FILE,
+        # 词条及缓存的格式
+        JsonEntry,
+        XmlEntry,
+        CodeEntry,
+    )
+
+
 class Extractor:
-    def __init__(self, target: str, root: str, new_dict_path: str, commit_sha: str):
+    def __init__(
+        self,
+        target: str,
+        root: str,
+        new_dict_path: str,
+        commit_sha: str,
+        jobs: int = 1,
+        cache_dir: Optional[Path] = None,
+        stream_xml: bool = False,
+        tree_cache: Optional[TreeCache] = None,
+        apply_state: Optional[ApplyState] = None,
+    ):
         self.target = target
         self.root = Path(root)
         self.target_dir = Path(new_dict_path)
+        self.jobs = max(jobs, 1)
+        # 流式解析xml，降低大文件的内存占用
+        self.stream_xml = stream_xml
+        # 缓存解析树供应用字典时复用，仅在单进程非流式提取时生效
+        self.tree_cache = tree_cache
+        # 增量应用时源码目录中可能存在已应用的文件，需按原始内容提取
+        self.apply_state = apply_state
         self.new_data: WholeDictionary = {}
+        # java文件(相对路径)对应的触发规则分组，用于检查规则覆盖情况
+        self.java_routes: Dict[str, Optional[str]] = {}
+        self.cache: Optional[ExtractionCache] = (
+            ExtractionCache(cache_dir, extractor_rules_version())
+            if cache_dir is not None
+            else None
+        )
 
         if not self.root.is_dir():
             raise NotADirectoryError("Invalid root directory")
@@ -101,9 +362,11 @@ class Extractor:
         if self.target == "main":
             self.extract_src()
 
-    def extract_res(self):
-        loop = asyncio.get_event_loop()
+        if self.cache is not None:
+            self.cache.report()
+            self.cache.evict()
 
+    def extract_res(self):
         if self.target == "main":
             res_path = self.root.joinpath("res")
         elif self.target == "mod":
@@ -120,486 +383,166 @@ class Extractor:
             # if not result_path.parent.exists():
             #     result_path.parent.mkdir(parents=True)
 
-        tasks = [
-            self.extract_xml_gather(file.original_file, file.entry_file)
-            for file in file_pairs
-        ]
+        if self.stream_xml:
+            # 流式解析时统计每个文件的内存峰值，记入诊断
+            extract_func = partial(measure_peak_memory, Extractor.extract_xml_streaming)
+        elif self.tree_cache is not None and self.jobs == 1:
+            extract_func = partial(Extractor.extract_xml, tree_cache=self.tree_cache)
+        else:
+            extract_func = Extractor.extract_xml
+        self.extract_files(extract_func, file_pairs, measure_memory=self.stream_xml)
+
+    def extract_files(
+        self,
+        extract_func: Callable[[Path], SingleDictionary],
+        file_pairs: List[FilePair],
+        measure_memory: bool = False,
+    ):
+        """
+        提取所有文件，jobs大于1时使用多进程
+        结果按路径排序后合并，保证与单进程结果一致
+        measure_memory为True时extract_func返回(提取结果, 内存峰值增量)，峰值记入诊断
+        """
+        file_pairs = sorted(file_pairs, key=lambda pair: pair.original_file.as_posix())
+        results: List[Optional[SingleDictionary]] = [None] * len(file_pairs)
+
+        # 内容未变动的文件直接使用缓存结果
+        cache_keys: List[Optional[str]] = [None] * len(file_pairs)
+        pending: List[int] = []
+        for idx, pair in enumerate(file_pairs):
+            if self.cache is not None:
+                data = (
+                    self.apply_state.pristine_bytes(pair.original_file)
+                    if self.apply_state is not None
+                    else None
+                )
+                cache_keys[idx] = self.cache.key(pair.original_file, data)
+                results[idx] = self.cache.get(cache_keys[idx])
+            if results[idx] is None:
+                pending.append(idx)
+                # 已应用的文件需恢复原始内容后重新提取
+                if self.apply_state is not None:
+                    self.apply_state.restore(pair.original_file)
+
+        pending_files = [file_pairs[idx].original_file for idx in pending]
+        if self.jobs > 1 and len(pending_files) > 1:
+            chunksize = max(1, len(pending_files) // (self.jobs * 4))
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                extracted = list(
+                    executor.map(extract_func, pending_files, chunksize=chunksize)
+                )
+        else:
+            extracted = map(extract_func, pending_files)
+
+        peaks: List[Tuple[int, Path]] = []
+        for idx, entry_dict in zip(pending, extracted):
+            if measure_memory:
+                entry_dict, peak = entry_dict
+                if peak is not None:
+                    peaks.append((peak, file_pairs[idx].original_file))
+            results[idx] = entry_dict
+            if self.cache is not None:
+                self.cache.put(cache_keys[idx], entry_dict)
+
+        for pair, entry_dict in zip(file_pairs, results):
+            if len(entry_dict) <= 0:
+                continue
+            path_key = sys.intern(
+                pair.entry_file.relative_to(self.target_dir).as_posix()
+            )
+            self.new_data[path_key] = entry_dict
 
-        loop.run_until_complete(asyncio.gather(*tasks))
+        if measure_memory:
+            self.report_peak_memory(peaks, len(pending_files))
 
-    async def extract_xml_gather(self, xml_path, entry_path):
-        entry_dict = await self.extract_xml(xml_path)
-        if len(entry_dict) <= 0:
+    @staticmethod
+    def report_peak_memory(peaks: List[Tuple[int, Path]], files: int) -> None:
+        """
+        按内存峰值从高到低记录每个重新提取的文件，命中缓存的文件未经解析，不计入
+        多进程时每个子进程提取的第一个文件另含一次性的初始化开销
+        """
+        if files > 0 and len(peaks) == 0:
+            logger.warning("当前平台不支持统计单个文件的内存峰值")
             return
+        for peak, file in sorted(peaks, key=lambda item: (-item[0], item[1])):
+            diagnostics.report(
+                "xml_peak_memory",
+                f"流式解析的内存峰值增量为{peak}KB",
+                file.as_posix(),
+                detail=f"文件大小：{file.stat().st_size // 1024}KB",
+                level=logging.INFO,
+            )
 
-        self.new_data[entry_path.relative_to(self.target_dir).as_posix()] = entry_dict
-
-        # with open(entry_path, "w", encoding="utf-8") as f:
-        #     json.dump(entry_list, f, ensure_ascii=False, indent=4)
-
-    async def extract_xml(self, xml_path: Path) -> List[Dict[str, XmlEntry]]:
-        entry_dict: SingleDictionary = {}
-        entry_cluster: Dict[str, Dict[str, int]] = {}
-
-        def insert_entry(entry: Optional[XmlEntry]):
-            if entry is None:
-                return
-            tag = entry.node_tag
-            attrib = entry.attribute if entry.attribute is not None else "text"
-
-            entry_json = entry.to_json()
-            if entry_cluster.get(tag) is None:
-                entry_cluster[tag] = {attrib: 0}
-            elif entry_cluster[tag].get(attrib) is None:
-                entry_cluster[tag][attrib] = 0
-            else:
-                entry_cluster[tag][attrib] += 1
-
-            entry_json["key"] += "_" + str(entry_cluster[tag][attrib])
-            entry_dict[entry_json["key"]] = entry_json
-
+    @staticmethod
+    def extract_xml(
+        xml_path: Path, tree_cache: Optional[TreeCache] = None
+    ) -> SingleDictionary:
         file = xml_path.as_posix()
 
-        parser = etree.XMLParser(strip_cdata=False)
-
-        root = etree.parse(file, parser)
-
-        # exportedCharacter
-        for name in root.iter("name"):
-            # e = try_xml_entry_attrib(file, name, "nameAndrogynous")
-            # insert_entry(e)
-            # e = try_xml_entry_attrib(file, name, "nameFeminine")
-            # insert_entry(e)
-            # e = try_xml_entry_attrib(file, name, "nameMasculine")
-            # insert_entry(e)
-            parent = name.getparent()
-            if parent is not None and parent.tag == "formattingNames":
-                continue
-            e = try_xml_entry_text(file, name)
-            insert_entry(e)
-
-        for namePlural in root.iter("namePlural"):
-            e = try_xml_entry_text(file, namePlural)
-            insert_entry(e)
-
-        # for surname in root.iter("surname"):
-        #     e = try_xml_entry_attrib(file, surname, "value")
-        #     insert_entry(e)
-
-        # for genericName in root.iter("genericName"):
-        #     e = try_xml_entry_attrib(file, genericName, "value")
-        #     insert_entry(e)
-
-        for description in root.iter("description"):
-            # e = try_xml_entry_attrib(file, description, "value")
-            # insert_entry(e)
-            e = try_xml_entry_text(file, description)
-            insert_entry(e)
-
-        # for clothing in root.iter("clothing"):
-        #     e = try_xml_entry_attrib(file, clothing, "name")
-        #     insert_entry(e)
-        # for weapon in root.iter("weapon"):
-        #     e = try_xml_entry_attrib(file, weapon, "name")
-        #     insert_entry(e)
-
-        # clothing
-        for determiner in root.iter("determiner"):
-            e = try_xml_entry_text(file, determiner)
-            insert_entry(e)
-
-        for _self in root.iter("self"):
-            e = try_xml_entry_text(file, _self)
-            insert_entry(e)
-        for other in root.iter("other"):
-            e = try_xml_entry_text(file, other)
-            insert_entry(e)
-        for otherRough in root.iter("otherRough"):
-            e = try_xml_entry_text(file, otherRough)
-            insert_entry(e)
-
-        for clothingAuthorTag in root.iter("clothingAuthorTag"):
-            e = try_xml_entry_text(file, clothingAuthorTag)
-            insert_entry(e)
-        for authorTag in root.iter("authorTag"):
-            e = try_xml_entry_text(file, authorTag)
-            insert_entry(e)
-
-        ## sticker related
-        for stickerName in root.iter("stickerName"):
-            e = try_xml_entry_text(file, stickerName)
-            insert_entry(e)
-        for namePrefix in root.iter("namePrefix"):
-            e = try_xml_entry_text(file, namePrefix)
-            insert_entry(e)
-        for namePostfix in root.iter("namePostfix"):
-            e = try_xml_entry_text(file, namePostfix)
-            insert_entry(e)
-        for descriptionModification in root.iter("descriptionModification"):
-            e = try_xml_entry_text(file, descriptionModification)
-            insert_entry(e)
-
-        # combat move nodes
-        for availabilityDescription in root.iter("availabilityDescription"):
-            e = try_xml_entry_text(file, availabilityDescription)
-            insert_entry(e)
-
-        for criticalDescription in root.iter("criticalDescription"):
-            e = try_xml_entry_text(file, criticalDescription)
-            insert_entry(e)
-
-        for movePredictionDescriptionWithTarget in root.iter(
-            "movePredictionDescriptionWithTarget"
-        ):
-            e = try_xml_entry_text(file, movePredictionDescriptionWithTarget)
-            insert_entry(e)
-
-        for movePredictionDescriptionNoTarget in root.iter(
-            "movePredictionDescriptionNoTarget"
-        ):
-            e = try_xml_entry_text(file, movePredictionDescriptionNoTarget)
-            insert_entry(e)
-
-        for execute in root.iter("execute"):
-            e = try_xml_entry_text(file, execute)
-            insert_entry(e)
-
-        for critDescription in root.iter("critDescription"):
-            e = try_xml_entry_text(file, critDescription)
-            insert_entry(e)
-
-        for critEffectDescription in root.iter("critEffectDescription"):
-            e = try_xml_entry_text(file, critEffectDescription)
-            insert_entry(e)
-
-        # dialogueNodes
-        for title in root.iter("title"):
-            e = try_xml_entry_text(file, title)
-            insert_entry(e)
-
-        for responseTitle in root.iter("responseTitle"):
-            e = try_xml_entry_text(file, responseTitle)
-            insert_entry(e)
-
-        for responseTooltip in root.iter("responseTooltip"):
-            e = try_xml_entry_text(file, responseTooltip)
-            insert_entry(e)
-
-        for effects in root.iter("effects"):
-            parent = effects.getparent()
-            if parent is not None and parent.tag == "response":
-                e = try_xml_entry_text(file, effects)
-                insert_entry(e)
-
-        for preParsingEffects in root.iter("preParsingEffects"):
-            e = try_xml_entry_text(file, preParsingEffects)
-            insert_entry(e)
-
-        for combatant in root.iter("combatant"):
-            e = try_xml_entry_text(file, combatant)
-            insert_entry(e)
-
-        # encounter
-        # name
-
-        # item
-        # determiner
-        # name
-        # namePlural
-        # description
-
-        for useDescriptor in root.iter("useDescriptor"):
-            e = try_xml_entry_text(file, useDescriptor)
-            insert_entry(e)
-
-        for potionDescriptor in root.iter("potionDescriptor"):
-            e = try_xml_entry_text(file, potionDescriptor)
-            insert_entry(e)
-
-        # effectTooltipLines
-        for line in root.iter("line"):
-            e = try_xml_entry_text(file, line)
-            insert_entry(e)
-
-        for applyEffects in root.iter("applyEffects"):
-            e = try_xml_entry_text(file, applyEffects)
-            insert_entry(e)
-
-        # useDescriptor
-        for selfUse in root.iter("selfUse"):
-            e = try_xml_entry_text(file, selfUse)
-            insert_entry(e)
-        for otherUse in root.iter("otherUse"):
-            e = try_xml_entry_text(file, otherUse)
-            insert_entry(e)
-
-        # placeType
-        # name
-        for tooltipDescription in root.iter("tooltipDescription"):
-            e = try_xml_entry_text(file, tooltipDescription)
-            insert_entry(e)
-        for virginityLossDescription in root.iter("virginityLossDescription"):
-            e = try_xml_entry_text(file, virginityLossDescription)
-            insert_entry(e)
-
-        # worldType
-        # name
-        for sexBlockedReason in root.iter("sexBlockedReason"):
-            e = try_xml_entry_text(file, sexBlockedReason)
-            insert_entry(e)
-
-        # outfit
-        # name
-        # description
-
-        # pattern
-        # name
-
-        # race
-        # name
-        # namePlural
-        # nameFeral.name
-        # nameFeralPlural.name
-
-        for defaultTransformName in root.iter("defaultTransformName"):
-            e = try_xml_entry_text(file, defaultTransformName)
-            insert_entry(e)
-
-        # racialBody
-        # no
+        if tree_cache is not None:
+            root, element_text = tree_cache.parse(xml_path)
+        else:
+            parser = etree.XMLParser(strip_cdata=False)
+            root = etree.parse(file, parser)
+            element_text = get_element_CDATA
+
+        # 单次遍历文档，按标签分派到对应规则
+        tag_entries: Dict[str, List[XmlEntry]] = {tag: [] for tag in XML_TAG_RULES}
+        for element in root.iter(*XML_TAG_RULES):
+            tag_entries[element.tag].extend(
+                XML_TAG_RULES[element.tag].extract(xml_path, element, element_text)
+            )
 
-        # subspecies
-        # bookName
-        for bookName in root.iter("bookName"):
-            e = try_xml_entry_text(file, bookName)
-            insert_entry(e)
-        # name
-        # namePlural
-        for singularMaleName in root.iter("singularMaleName"):
-            e = try_xml_entry_text(file, singularMaleName)
-            insert_entry(e)
-        for singularFemaleName in root.iter("singularFemaleName"):
-            e = try_xml_entry_text(file, singularFemaleName)
-            insert_entry(e)
-        for pluralMaleName in root.iter("pluralMaleName"):
-            e = try_xml_entry_text(file, pluralMaleName)
-            insert_entry(e)
-        for pluralFemaleName in root.iter("pluralFemaleName"):
-            e = try_xml_entry_text(file, pluralFemaleName)
-            insert_entry(e)
-        for nameSillyMode in root.iter("nameSillyMode"):
-            e = try_xml_entry_text(file, nameSillyMode)
-            insert_entry(e)
-        for namePluralSillyMode in root.iter("namePluralSillyMode"):
-            e = try_xml_entry_text(file, namePluralSillyMode)
-            insert_entry(e)
-        for nameHalfDemon in root.iter("nameHalfDemon"):
-            e = try_xml_entry_text(file, nameHalfDemon)
-            insert_entry(e)
-        for namePluralHalfDemon in root.iter("namePluralHalfDemon"):
-            e = try_xml_entry_text(file, namePluralHalfDemon)
-            insert_entry(e)
-        for singularMaleNameHalfDemon in root.iter("singularMaleNameHalfDemon"):
-            e = try_xml_entry_text(file, singularMaleNameHalfDemon)
-            insert_entry(e)
-        for singularFemaleNameHalfDemon in root.iter("singularFemaleNameHalfDemon"):
-            e = try_xml_entry_text(file, singularFemaleNameHalfDemon)
-            insert_entry(e)
-        for pluralMaleNameHalfDemon in root.iter("pluralMaleNameHalfDemon"):
-            e = try_xml_entry_text(file, pluralMaleNameHalfDemon)
-            insert_entry(e)
-        for pluralFemaleNameHalfDemon in root.iter("pluralFemaleNameHalfDemon"):
-            e = try_xml_entry_text(file, pluralFemaleNameHalfDemon)
-            insert_entry(e)
+        return build_xml_entry_dict(tag_entries)
 
-        # description
-        for feralName in root.iter("feralName"):
-            e = try_xml_entry_text(file, feralName)
-            insert_entry(e)
-        for feralNamePlural in root.iter("feralNamePlural"):
-            e = try_xml_entry_text(file, feralNamePlural)
-            insert_entry(e)
-        for feralSingularMaleName in root.iter("feralSingularMaleName"):
-            e = try_xml_entry_text(file, feralSingularMaleName)
-            insert_entry(e)
-        for feralSingularFemaleName in root.iter("feralSingularFemaleName"):
-            e = try_xml_entry_text(file, feralSingularFemaleName)
-            insert_entry(e)
-        for feralPluralMaleName in root.iter("feralPluralMaleName"):
-            e = try_xml_entry_text(file, feralPluralMaleName)
-            insert_entry(e)
-        for feralPluralFemaleName in root.iter("feralPluralFemaleName"):
-            e = try_xml_entry_text(file, feralPluralFemaleName)
-            insert_entry(e)
+    @staticmethod
+    def extract_xml_streaming(xml_path: Path) -> SingleDictionary:
+        """
+        使用iterparse流式提取，处理完毕的节点即被清除，内存占用与文件大小基本无关
+        提取结果与extract_xml一致
+        """
+        file = xml_path.as_posix()
 
-        for statusEffectDescription in root.iter("statusEffectDescription"):
-            e = try_xml_entry_text(file, statusEffectDescription)
-            insert_entry(e)
+        # 每个规则节点在开始标签处占位，保证同一标签下的条目仍按文档顺序排列
+        tag_slots: Dict[str, List[List[XmlEntry]]] = {tag: [] for tag in XML_TAG_RULES}
+        # 尚未结束的规则节点对应的位置
+        open_slots: List[List[XmlEntry]] = []
 
-        # coveringType
-        # determiner
-        # name
-        # namePlural
-
-        # bookText
-        for htmlContent in root.iter("htmlContent"):
-            # 将htmlContent拆分成小段
-            e_list = get_splited_htmlContent(xml_path, htmlContent)
-            for e in e_list:
-                insert_entry(e)
-
-            # 保留大段文本
-            # e = try_xml_entry_text(file, htmlContent)
-            # insert_entry(e)
-
-        # Bodyparts
-        # name
-        # namePlural
-        for transformationName in root.iter("transformationName"):
-            e = try_xml_entry_text(file, transformationName)
-            insert_entry(e)
-        for transformationDescription in root.iter("transformationDescription"):
-            e = try_xml_entry_text(file, transformationDescription)
-            insert_entry(e)
-        for bodyDescription in root.iter("bodyDescription"):
-            e = try_xml_entry_text(file, bodyDescription)
-            insert_entry(e)
-        for crotchBoobsTransformationDescription in root.iter(
-            "crotchBoobsTransformationDescription"
+        for event, element in etree.iterparse(
+            file, events=("start", "end"), strip_cdata=False
         ):
-            e = try_xml_entry_text(file, crotchBoobsTransformationDescription)
-            insert_entry(e)
-        for crotchBoobsBodyDescription in root.iter("crotchBoobsBodyDescription"):
-            e = try_xml_entry_text(file, crotchBoobsBodyDescription)
-            insert_entry(e)
-        # fluid.namesFeminine.name
-        # fluid.namesMusculine.name
-        # fluid.descriptorsMasculine.name
-        # fluid.descriptorsFeminine.name
-        # hair.determiner
-        for descriptor in root.iter("descriptor"):
-            e = try_xml_entry_text(file, descriptor)
-            insert_entry(e)
-
-        for handName in root.iter("handName"):
-            e = try_xml_entry_text(file, handName)
-            insert_entry(e)
-        for handNamePlural in root.iter("handNamePlural"):
-            e = try_xml_entry_text(file, handNamePlural)
-            insert_entry(e)
-        for fingerName in root.iter("fingerName"):
-            e = try_xml_entry_text(file, fingerName)
-            insert_entry(e)
-        for fingerNamePlural in root.iter("fingerNamePlural"):
-            e = try_xml_entry_text(file, fingerNamePlural)
-            insert_entry(e)
-        for noseName in root.iter("noseName"):
-            e = try_xml_entry_text(file, noseName)
-            insert_entry(e)
-        for tipName in root.iter("tipName"):
-            e = try_xml_entry_text(file, tipName)
-            insert_entry(e)
-        for tipNamePlural in root.iter("tipNamePlural"):
-            e = try_xml_entry_text(file, tipNamePlural)
-            insert_entry(e)
-
-        # setBonus
-        # name
-
-        # sexAction
-        # title
-        for tooltip in root.iter("tooltip"):
-            e = try_xml_entry_text(file, tooltip)
-            insert_entry(e)
-        for text in root.iter("text"):
-            e = try_xml_entry_text(file, text)
-            insert_entry(e)
-
-        # sexManager
-        for deskName in root.iter("deskName"):
-            e = try_xml_entry_text(file, deskName)
-            insert_entry(e)
-        for wallName in root.iter("wallName"):
-            e = try_xml_entry_text(file, wallName)
-            insert_entry(e)
-        for startingDescription in root.iter("startingDescription"):
-            e = try_xml_entry_text(file, startingDescription)
-            insert_entry(e)
-
-        # statusEffect
-        # name
-        # description
-        for effect in root.iter("effect"):
-            parent = effect.getparent()
-            if parent is not None and parent.tag == "statusEffects":
+            rule = XML_TAG_RULES.get(element.tag)
+            if event == "start":
+                if rule is not None:
+                    slot: List[XmlEntry] = []
+                    tag_slots[element.tag].append(slot)
+                    open_slots.append(slot)
                 continue
-            e = try_xml_entry_text(file, effect)
-            insert_entry(e)
 
-        # tatto
-        # name
-        # description
-        for bodyOverviewDescription in root.iter("bodyOverviewDescription"):
-            e = try_xml_entry_text(file, bodyOverviewDescription)
-            insert_entry(e)
+            if rule is not None:
+                open_slots.pop().extend(rule.extract(xml_path, element))
 
-        # txt / dialogue
-        # htmlContent
-        for tab in root.iter("tab"):
-            e = try_xml_entry_text(file, tab)
-            insert_entry(e)
-
-        # weapon
-        # determiner
-        # name
-        # namePlural
-        # description
-        for attackDescriptor in root.iter("attackDescriptor"):
-            e = try_xml_entry_text(file, attackDescriptor)
-            insert_entry(e)
-        for attackTooltipDescription in root.iter("attackTooltipDescription"):
-            e = try_xml_entry_text(file, attackTooltipDescription)
-            insert_entry(e)
-        for equipText in root.iter("equipText"):
-            e = try_xml_entry_text(file, equipText)
-            insert_entry(e)
-        for unequipText in root.iter("unequipText"):
-            e = try_xml_entry_text(file, unequipText)
-            insert_entry(e)
-        for hitText in root.iter("hitText"):
-            e = try_xml_entry_text(file, hitText)
-            insert_entry(e)
-        for criticalHitText in root.iter("criticalHitText"):
-            e = try_xml_entry_text(file, criticalHitText)
-            insert_entry(e)
-        for missText in root.iter("missText"):
-            e = try_xml_entry_text(file, missText)
-            insert_entry(e)
-        for onCriticalHitEffect in root.iter("onCriticalHitEffect"):
-            e = try_xml_entry_text(file, onCriticalHitEffect)
-            insert_entry(e)
-
-        # names
-        for fem in root.iter("fem"):
-            e = try_xml_entry_text(file, fem)
-            insert_entry(e)
-        for _and in root.iter("and"):
-            e = try_xml_entry_text(file, _and)
-            insert_entry(e)
-        for mas in root.iter("mas"):
-            e = try_xml_entry_text(file, mas)
-            insert_entry(e)
-
-        return entry_dict
+            # 外层仍有未结束的规则节点时需保留子节点，否则其文本判断会改变
+            if len(open_slots) > 0:
+                continue
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+        tag_entries: Dict[str, List[XmlEntry]] = {
+            tag: [e for slot in slots for e in slot]
+            for tag, slots in tag_slots.items()
+        }
+        return build_xml_entry_dict(tag_entries)
 
     def extract_src(self):
-        loop = asyncio.get_event_loop()
-
         src_path = self.root.joinpath("src")
 
         file_pairs: List[FilePair] = []
 
-        # 递归获取所有后缀为xml的文件
+        # 递归获取所有后缀为java的文件
         for file in src_path.glob("**/*.java"):
             result_path = self.target_dir.joinpath(
                 file.relative_to(self.root)
@@ -607,117 +550,49 @@ class Extractor:
             file_pairs.append(FilePair(file, result_path))
             # if not result_path.parent.exists():
             #     result_path.parent.mkdir(parents=True)
+            self.java_routes[file.relative_to(self.root).as_posix()] = route_java_file(
+                file
+            )
 
-        tasks = [
-            self.extract_java_gather(file.original_file, file.entry_file)
-            for file in file_pairs
-        ]
+        self.log_java_routes()
+        self.extract_files(Extractor.extract_java, file_pairs)
 
-        loop.run_until_complete(asyncio.gather(*tasks))
+    def log_java_routes(self):
+        route_count: Dict[str, int] = {}
+        for route in self.java_routes.values():
+            route = route if route is not None else "无分组"
+            route_count[route] = route_count.get(route, 0) + 1
 
-    async def extract_java_gather(self, java_path: Path, entry_path: Path):
-        entry_dict = await self.extract_java(java_path)
-        if len(entry_dict) <= 0:
-            return
-        self.new_data[entry_path.relative_to(self.target_dir).as_posix()] = entry_dict
-        # with open(entry_path, "w", encoding="utf-8") as f:
-        #     json.dump(entry_list, f, ensure_ascii=False, indent=4)
+        logger.info(
+            "java文件规则分组：%s",
+            ", ".join(f"{route}={count}" for route, count in sorted(route_count.items())),
+        )
 
-    async def extract_java(self, file: Path):
+    @staticmethod
+    def extract_java(file: Path) -> SingleDictionary:
         if file.name in BLACKLIST_FILE:
-            return []
-        java_extractor = JavaExtractor()
+            return {}
+        java_extractor = JavaExtractor.for_file(file)
         entry_dict: SingleDictionary = {}
 
         with open(file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        for idx, line in enumerate(lines):
-            line = line.strip()
-            original_line = line
+            text = f.read()
 
-            line = java_extractor.process_comment(line)
-            line = line.strip()
+        original_lines = text.split("\n")
+        for idx, java_line in enumerate(lex_lines(text)):
+            line = java_line.code.strip()
 
             if len(line) == 0:
                 continue
 
-            # controller\eventListeners\tooltips
-            if file.parent.name == "tooltips":
-                java_extractor.parse_tooltips(line)
-            # game\character\attributes
-            elif file.parent.name == "attributes":
-                java_extractor.parse_attributes(line)
-            # game\character\body
-            elif file.parent.name == "body" or file.parent.parent.name == "body":
-                java_extractor.parse_body(line)
-            # game\character\effects
-            elif file.parent.name == "effects":
-                java_extractor.parse_effects(file.name, line)
-            # game\character\fetishes
-            elif file.parent.name == "fetishes":
-                java_extractor.parse_fetishs(line)
-            # game\character\npc
-            elif "npc" in file.parent.as_posix():
-                java_extractor.parse_npc(file.name, line)
-            # game\character\race
-            elif file.parent.name == "race":
-                java_extractor.parse_race(line)
-            # game\combat\moves
-            elif file.parent.name == "moves":
-                java_extractor.parse_moves(line)
-            # game\iventory\clothing
-            elif file.parent.name == "clothing":
-                java_extractor.parse_clothing(line)
-            # game\iventory\enchanting
-            elif file.parent.name == "enchanting":
-                java_extractor.parse_enchanting(line)
-            # game\iventory\item
-            elif file.parent.name == "item":
-                java_extractor.parse_item(line)
-            # main
-            elif file.parent.name == "main":
-                java_extractor.parse_main(line)
-            # rendering
-            elif file.parent.name == "rendering":
-                java_extractor.parse_rendering(line)
-            # utils\colours
-            elif file.parent.name == "colours":
-                java_extractor.parse_colours(line)
-            # world\population
-            elif file.parent.name == "population":
-                java_extractor.parse_population(line)
-            # world no sub
-            elif file.parent.name == "world":
-                java_extractor.parse_world(line)
-            # rest in controller\
-            elif "controller" in file.parent.as_posix():
-                java_extractor.parse_controller(line)
-            # game\sex\positions
-            elif "positions" in file.parent.as_posix():
-                java_extractor.parse_positions(line)
-            # rest in game\sex\
-            elif "sex" in file.parent.as_posix():
-                java_extractor.parse_sex(file.name, line)
-            # rest in game\character\
-            elif "character" in file.parent.as_posix():
-                java_extractor.parse_character(file.name, line)
-            # rest in game\dialogue\
-            elif "dialogue" in file.parent.as_posix():
-                java_extractor.parse_dialogue(file.name, line)
-            # rest in game\
-            elif "game" in file.parent.as_posix():
-                java_extractor.parse_game(file.name, line)
-            # rest in world\places
-            elif "places" in file.parent.as_posix():
-                java_extractor.parse_places(file.name, line)
-
-            java_extractor.parse_normal(line)
-
-            if java_extractor.general_string_parse(line):
+            java_extractor.parse_triggers(line)
+
+            if java_extractor.general_string_parse(
+                line, java_line.has_string, java_line.ends_statement
+            ):
                 entry = CodeEntry(
                     file=file.as_posix(),
-                    original=original_line,
+                    original=original_lines[idx].strip(),
                     translation="",
                     line=idx,
                     stage=0,
@@ -745,391 +620,388 @@ ASSIGN_REGEX = r"\s*\+?=\s*"
 ADD_REGEX = r"(List)?.add"
 
 
-class JavaExtractor:
-    def __init__(self):
-        self.interest_line: bool = False
-        self.comment: bool = False
-
-    def parse_normal(self, line: str):
-        if self.interest_line:
-            return
-
-        if "return" in line:
-            self.interest_line = True
-        elif (
-            re.search(
-                rf"({SB_REGEX}|{DESC_REGEX}|{TEXT_REGEX}|{STRING_REGEX}|[o|O]utput)\.append",
-                line,
-            )
-            is not None
-        ):
-            self.interest_line = True
-        elif "new Response" in line:
-            self.interest_line = True
-        elif ".setInformation" in line:
-            self.interest_line = True
-        elif (
-            re.search(
-                rf"({SB_REGEX}|{ADJ_REGEX}|{TEXT_REGEX}|{NAME_REGEX}|{TITLE_REGEX}|{DESC_REGEX}|returnValue|{PREFIX_REGEX}|{SUFFIX_REGEX}|{STRING_REGEX}|{DETER_REGEX}|[o|O]utput){ASSIGN_REGEX}",
-                line,
-            )
-            is not None
-        ):
-            self.interest_line = True
-        elif (
-            re.search(
-                rf"({ADJ_REGEX}|{TEXT_REGEX}|{NAME_REGEX}(Plural)?|{TITLE_REGEX}|{DESC_REGEX}|{EFFECT_REGEX}|{MOD_REGEX}){ADD_REGEX}",
-                line,
-            )
-            is not None
-        ):
-            self.interest_line = True
-        elif "list.add" in line or "list2.add" in line:
-            self.interest_line = True
-        elif "Names.contains" in line:
-            self.interest_line = True
-        # elif "System.err.println" in line:
-        #     self.interest_line = True
-        elif "new Value<>" in line:
-            self.interest_line = True
-        elif "public enum" in line:  # 枚举项
-            self.interest_line = True
-        elif re.search(r"^\s*[A-Z_0-9]+\(", line) is not None:  # 枚举项
-            self.interest_line = True
-        elif "new String[]" in line or "static String[]" in line:
-            self.interest_line = True
-        elif "super(" in line or "this(" in line:
-            self.interest_line = True
-        elif "new TattooWriting" in line:
-            self.interest_line = True
-        elif "setName" in line or "setSurname" in line or "setGenericName" in line:
-            self.interest_line = True
-        elif "setDescription" in line:
-            self.interest_line = True
-        elif "new NameTriplet" in line:
-            self.interest_line = True
-        elif (
-            "UtilText.parse" in line
-            or "Util.capitaliseSentence" in line
-            or "UtilText.returnStringAtRandom" in line
-            or "Util.randomItemFromValues" in line
-        ):
-            self.interest_line = True
-        elif "new EventLogEntry" in line:
-            self.interest_line = True
-        elif "new DialogueNode" in line:
-            self.interest_line = True
-        elif ".flashMessage" in line:
-            self.interest_line = True
-        elif ".addSpecialParsingString" in line:
-            self.interest_line = True
-        elif "spawnDomGloryHoleNPC" in line or "spawnSubGloryHoleNPC" in line:
-            self.interest_line = True
-        elif "getTooltipText" in line:
-            self.interest_line = True
-        elif "appendToTextEndStringBuilder" in line:
-            self.interest_line = True
-        elif line.strip().startswith('"'):
-            self.interest_line = True
-
-    def parse_tooltips(self, line: str):
-        if "tooltipSB.append" in line:
-            self.interest_line = True
+@dataclass(frozen=True)
+class JavaTrigger:
+    pattern: str
+    regex: bool = False  # 为False时按子串匹配
+    filename: Optional[str] = None  # 仅对该文件生效
+    prefilter: str = ""  # 正则匹配成功时行内必然包含的子串，用于快速跳过
 
-        elif ".setTooltipContent" in line:
-            self.interest_line = True
 
-    def parse_controller(self, line: str):
-        if "tooltipDescriptionSB.append" in line:
-            self.interest_line = True
-        elif "getTextStartStringBuilder()" in line:
-            self.interest_line = True
-        elif "verb = " in line:
-            self.interest_line = True
+def _kw(*keywords: str, file: Optional[str] = None) -> List[JavaTrigger]:
+    return [JavaTrigger(keyword, filename=file) for keyword in keywords]
 
-    def parse_attributes(self, line: str):
-        if "new AbstractAttribute" in line:
-            self.interest_line = True
 
-    def parse_body(self, line: str):
-        if "new BodyCoveringTemplate" in line:
-            self.interest_line = True
-        elif "new AbstractBodyCoveringType" in line:
-            self.interest_line = True
-        elif re.search(r"new Abstract\w+Type", line) is not None:
-            self.interest_line = True
-        elif "faceBodyDescriptionFeral = " in line:
-            self.interest_line = True
-        elif "stage = " in line or "areaEgged = " in line:
-            self.interest_line = True
-        elif "extraEffectsLsit.add" in line:
-            self.interest_line = True
+def _re(
+    *patterns: str, prefilter: str = "", file: Optional[str] = None
+) -> List[JavaTrigger]:
+    return [
+        JavaTrigger(pattern, regex=True, filename=file, prefilter=prefilter)
+        for pattern in patterns
+    ]
 
-    def parse_effects(self, filename: str, line: str):
-        if filename == "AbstractStatusEffect.java":
-            if "stringBuilderToAppendTo.append" in line:
-                self.interest_line = True
-        elif filename == "StatusEffect.java":
-            if "from1 = " in line or "from2 = " in line:
-                self.interest_line = True
-            elif "orificesRecovering.add" in line:
-                self.interest_line = True
-        if "new AbstractPerk" in line:
-            self.interest_line = True
-        elif "new AbstractStatusEffect" in line:
-            self.interest_line = True
 
-    def parse_fetishs(self, line: str):
-        if "new AbstractFetish" in line:
-            self.interest_line = True
-        elif "perkRequirementsList.add" in line:
-            self.interest_line = True
+# 所有java文件通用的触发规则
+NORMAL_TRIGGERS: List[JavaTrigger] = [
+    *_kw("return"),
+    *_re(
+        rf"({SB_REGEX}|{DESC_REGEX}|{TEXT_REGEX}|{STRING_REGEX}|[o|O]utput)\.append",
+        prefilter=".append",
+    ),
+    *_kw("new Response", ".setInformation"),
+    *_re(
+        rf"({SB_REGEX}|{ADJ_REGEX}|{TEXT_REGEX}|{NAME_REGEX}|{TITLE_REGEX}|{DESC_REGEX}|returnValue|{PREFIX_REGEX}|{SUFFIX_REGEX}|{STRING_REGEX}|{DETER_REGEX}|[o|O]utput){ASSIGN_REGEX}",
+        prefilter="=",
+    ),
+    *_re(
+        rf"({ADJ_REGEX}|{TEXT_REGEX}|{NAME_REGEX}(Plural)?|{TITLE_REGEX}|{DESC_REGEX}|{EFFECT_REGEX}|{MOD_REGEX}){ADD_REGEX}",
+        prefilter="add",
+    ),
+    *_kw("list.add", "list2.add", "Names.contains"),
+    # *_kw("System.err.println"),
+    *_kw("new Value<>"),
+    *_kw("public enum"),  # 枚举项
+    *_re(r"^\s*[A-Z_0-9]+\(", prefilter="("),  # 枚举项
+    *_kw("new String[]", "static String[]"),
+    *_kw("super(", "this("),
+    *_kw("new TattooWriting"),
+    *_kw("setName", "setSurname", "setGenericName", "setDescription"),
+    *_kw("new NameTriplet"),
+    *_kw(
+        "UtilText.parse",
+        "Util.capitaliseSentence",
+        "UtilText.returnStringAtRandom",
+        "Util.randomItemFromValues",
+    ),
+    *_kw("new EventLogEntry", "new DialogueNode"),
+    *_kw(".flashMessage", ".addSpecialParsingString"),
+    *_kw("spawnDomGloryHoleNPC", "spawnSubGloryHoleNPC"),
+    *_kw("getTooltipText", "appendToTextEndStringBuilder"),
+    *_re(r'^\s*"', prefilter='"'),
+]
+
+# 按目录划分的触发规则
+DIRECTORY_TRIGGERS: Dict[str, List[JavaTrigger]] = {
+    # controller\eventListeners\tooltips
+    "tooltips": [
+        *_kw("tooltipSB.append", ".setTooltipContent"),
+    ],
+    # rest in controller\
+    "controller": [
+        *_kw("tooltipDescriptionSB.append", "getTextStartStringBuilder()", "verb = "),
+    ],
+    # game\character\attributes
+    "attributes": [
+        *_kw("new AbstractAttribute"),
+    ],
+    # game\character\body
+    "body": [
+        *_kw("new BodyCoveringTemplate", "new AbstractBodyCoveringType"),
+        *_re(r"new Abstract\w+Type", prefilter="new Abstract"),
+        *_kw("faceBodyDescriptionFeral = ", "stage = ", "areaEgged = "),
+        *_kw("extraEffectsLsit.add"),
+    ],
+    # game\character\effects
+    "effects": [
+        *_kw("stringBuilderToAppendTo.append", file="AbstractStatusEffect.java"),
+        *_kw(
+            "from1 = ", "from2 = ", "orificesRecovering.add", file="StatusEffect.java"
+        ),
+        *_kw("new AbstractPerk", "new AbstractStatusEffect"),
+    ],
+    # game\character\fetishes
+    "fetishes": [
+        *_kw("new AbstractFetish", "perkRequirementsList.add"),
+    ],
+    # game\character\npc
+    "npc": [
+        *_kw("result = ", file="NPCOffspring.java"),
+        *_kw(
+            "new PossibleItemEffect",
+            "FlavorText",
+            "getSurname().endsWith",
+            "speech.add",
+        ),
+    ],
+    # game\character\race
+    "race": [
+        *_kw("new AbstractRace", "new AbstractSubspecies", "Modified.add"),
+        *_kw("names.put"),
+    ],
+    # rest in game\character\
+    "character": [
+        *_kw("tooDeep.add", "stretching.add", file="StatusEffect.java"),
+        *_kw("target = ", "additional = ", file="GameCharacter.java"),
+        *_kw("entries.add", file="Litter.java"),
+        *_kw("ingredientMap.put", file="Heather.java"),
+        *_kw("adjectivesUsed =", file="Angelixx.java"),
+        *_re(r"writing\s*=\s*", prefilter="writing"),
+        *_kw("new GenderAppearance", "_CALCULATION = ", "newArrayListOfValues"),
+    ],
+    # game\combat\moves
+    "moves": [
+        *_kw("new AbstractCombatMove", "formatAttackOutcome", "reason = "),
+    ],
+    # rest in game\dialogue\
+    "dialogue": [
+        *_kw(
+            "demonstoneImages = ",
+            "demonstoneEnergy = ",
+            file="PrologueDialogue.java",
+        ),
+        *_kw("clothingSlotCategories.put", file="PhoneDialogue.java"),
+        *_kw("descriptionStart = ", file="ClothingEmporium.java"),
+        *_kw("entry.getValue().getValue().add", file="SuccubisSecrets.java"),
+        *_kw(".add", file="RoomPlayer.java"),
+        *_kw("Comments = ", file="SlaveAuctionBidder.java"),
+        *_kw("Availability.add", file="SlaverAlleyDialogue.java"),
+        *_kw("dangerousDirections.add", file="EnforcerWarehouse.java"),
+        *_kw("disabledMsg = ", file="OptionsDialogue.java"),
+        *_kw("KaySexResponse(", file="KaysWarehouse.java"),
+        *_kw("new ParserCommand", "input = ", file="UtilText.java"),
+        *_kw("legsSpreading = ", file="SlaveDialogue.java"),
+        *_kw("new MuleReward", file="DominionExpress.java"),
+        *_kw("purchaseAvailability.append"),
+        *_re(r"(Cry|Reaction|Speech)\s*=\s*", prefilter="="),
+        *_kw("new AbstractParserTarget", "OffspringHeaderDisplay", "map.put"),
+        *_kw("responses.add", "failEffects"),
+    ],
+    # game\iventory\clothing
+    "clothing": [
+        *_kw("new AbstractClothingType"),
+    ],
+    # game\iventory\enchanting
+    "enchanting": [
+        *_kw("new AbstractItemEffectType", "area = ", "descriptionToReturn = "),
+    ],
+    # game\iventory\item
+    "item": [
+        *_kw("new AbstractItemType", "Util.newArrayListOfValues", "parsed.add"),
+        *_kw("new AbstractStatusEffect"),
+    ],
+    # game\sex\positions
+    "positions": [
+        *_kw("new AbstractSexPosition", "new SexSlot"),
+    ],
+    # rest in game\sex\
+    "sex": [
+        *_kw("tailSpecial1 = ", "tailSpecial2 = ", file="SadisticActions.java"),
+        *_kw("assTargeting = ", file="PenisAnus.java"),
+        *_kw("breasts = ", "areas.add", file="GenericOrgasms.java"),
+    ],
+    # main
+    "main": [
+        *_re(r"disclaimer\s*=\s*", prefilter="disclaimer"),
+    ],
+    # rendering
+    "rendering": [
+        *_kw("equippedPanelSB.append", "panelSB.append"),
+    ],
+    # utils\colours
+    "colours": [
+        *_kw("new Colour"),
+    ],
+    # rest in world\places
+    "places": [
+        *_kw(
+            "new AbstractPlaceType",
+            "new AbstractPlaceUpgrade",
+            "new AbstractGlobalPlaceType",
+        ),
+    ],
+    # world\population
+    "population": [
+        *_kw("new AbstractPopulationType"),
+    ],
+    # world no sub
+    "world": [
+        *_kw("new AbstractWorldType"),
+    ],
+    # rest in game\
+    "game": [
+        *_kw("corruptionGains = ", file="Game.java"),
+        *_kw("Content.put", "Content.get", "critText.append", file="Combat.java"),
+        *_kw("cost = ", file="Spell.java"),
+    ],
+}
+
+
+def route_java_file(file: Path) -> Optional[str]:
+    """
+    根据文件所在目录决定适用的触发规则分组，无对应分组时返回None
+    """
+    parent_path = file.parent.as_posix()
+
+    # controller\eventListeners\tooltips
+    if file.parent.name == "tooltips":
+        return "tooltips"
+    # game\character\attributes
+    elif file.parent.name == "attributes":
+        return "attributes"
+    # game\character\body
+    elif file.parent.name == "body" or file.parent.parent.name == "body":
+        return "body"
+    # game\character\effects
+    elif file.parent.name == "effects":
+        return "effects"
+    # game\character\fetishes
+    elif file.parent.name == "fetishes":
+        return "fetishes"
+    # game\character\npc
+    elif "npc" in parent_path:
+        return "npc"
+    # game\character\race
+    elif file.parent.name == "race":
+        return "race"
+    # game\combat\moves
+    elif file.parent.name == "moves":
+        return "moves"
+    # game\iventory\clothing
+    elif file.parent.name == "clothing":
+        return "clothing"
+    # game\iventory\enchanting
+    elif file.parent.name == "enchanting":
+        return "enchanting"
+    # game\iventory\item
+    elif file.parent.name == "item":
+        return "item"
+    # main
+    elif file.parent.name == "main":
+        return "main"
+    # rendering
+    elif file.parent.name == "rendering":
+        return "rendering"
+    # utils\colours
+    elif file.parent.name == "colours":
+        return "colours"
+    # world\population
+    elif file.parent.name == "population":
+        return "population"
+    # world no sub
+    elif file.parent.name == "world":
+        return "world"
+    # rest in controller\
+    elif "controller" in parent_path:
+        return "controller"
+    # game\sex\positions
+    elif "positions" in parent_path:
+        return "positions"
+    # rest in game\sex\
+    elif "sex" in parent_path:
+        return "sex"
+    # rest in game\character\
+    elif "character" in parent_path:
+        return "character"
+    # rest in game\dialogue\
+    elif "dialogue" in parent_path:
+        return "dialogue"
+    # rest in game\
+    elif "game" in parent_path:
+        return "game"
+    # rest in world\places
+    elif "places" in parent_path:
+        return "places"
+
+    return None
+
+
+class TriggerMatcher:
+    """
+    将一组触发规则编译后匹配：所有关键字合并为单个正则，每行只需扫描一次；
+    正则规则仅在行内包含其前置子串时才进行匹配
+    """
+
+    def __init__(self, triggers: List[JavaTrigger]):
+        keywords = sorted(
+            {trigger.pattern for trigger in triggers if not trigger.regex},
+            key=lambda keyword: (-len(keyword), keyword),
+        )
+        # 空正则会匹配任意行，故无关键字时使用永不匹配的正则
+        self.keyword_regex = re.compile(
+            "|".join(map(re.escape, keywords)) if keywords else r"(?!)"
+        )
 
-    def parse_npc(self, filename: str, line: str):
-        if filename == "NPCOffspring.java":
-            if "result = " in line:
-                self.interest_line = True
-        if "new PossibleItemEffect" in line:
-            self.interest_line = True
-        elif "FlavorText" in line:
-            self.interest_line = True
-        elif "getSurname().endsWith" in line:
-            self.interest_line = True
-        elif "speech.add" in line:
-            self.interest_line = True
+        # 前置子串相同的正则合并为一个
+        grouped: Dict[str, List[str]] = {}
+        for trigger in triggers:
+            if trigger.regex:
+                grouped.setdefault(trigger.prefilter, []).append(trigger.pattern)
+        self.regexes: List[Tuple[str, re.Pattern]] = [
+            (prefilter, re.compile("|".join(f"(?:{regex})" for regex in regexes)))
+            for prefilter, regexes in grouped.items()
+        ]
 
-    def parse_race(self, line: str):
-        if "new AbstractRace" in line:
-            self.interest_line = True
-        elif "new AbstractSubspecies" in line:
-            self.interest_line = True
-        elif "Modified.add" in line:
-            self.interest_line = True
-        elif "names.put" in line:
-            self.interest_line = True
+    def match(self, line: str) -> bool:
+        if self.keyword_regex.search(line) is not None:
+            return True
+        for prefilter, regex in self.regexes:
+            if prefilter in line and regex.search(line) is not None:
+                return True
+        return False
 
-    def parse_character(self, filename: str, line: str):
-        if filename == "StatusEffect.java":
-            if "tooDeep.add" in line or "stretching.add" in line:
-                self.interest_line = True
-        elif filename == "GameCharacter.java":
-            if "target = " in line:
-                self.interest_line = True
-            elif "additional = " in line:
-                self.interest_line = True
-        elif filename == "Litter.java":
-            if "entries.add" in line:
-                self.interest_line = True
-        elif filename == "Heather.java":
-            if "ingredientMap.put" in line:
-                self.interest_line = True
-        elif filename == "Angelixx.java":
-            if "adjectivesUsed =" in line:
-                self.interest_line = True
-        if re.search(r"writing\s*=\s*", line) is not None:
-            self.interest_line = True
-        elif "new GenderAppearance" in line:
-            self.interest_line = True
-        elif "_CALCULATION = " in line:
-            self.interest_line = True
-        elif "newArrayListOfValues" in line:
-            self.interest_line = True
 
-    def parse_moves(self, line: str):
-        if "new AbstractCombatMove" in line:
-            self.interest_line = True
-        elif "formatAttackOutcome" in line:
-            self.interest_line = True
-        elif "reason = " in line:
-            self.interest_line = True
+_trigger_matchers: Dict[Tuple[Optional[str], str], TriggerMatcher] = {}
 
-    def parse_dialogue(self, filename: str, line: str):
-        if filename == "PrologueDialogue.java":
-            if "demonstoneImages = " in line or "demonstoneEnergy = " in line:
-                self.interest_line = True
-        elif filename == "PhoneDialogue.java":
-            if "clothingSlotCategories.put" in line:
-                self.interest_line = True
-        elif filename == "ClothingEmporium.java":
-            if "descriptionStart = " in line:
-                self.interest_line = True
-        elif filename == "SuccubisSecrets.java":
-            if "entry.getValue().getValue().add" in line:
-                self.interest_line = True
-        elif filename == "RoomPlayer.java":
-            if ".add" in line:
-                self.interest_line = True
-        elif filename == "SlaveAuctionBidder.java":
-            if "Comments = " in line:
-                self.interest_line = True
-        elif filename == "SlaverAlleyDialogue.java":
-            if "Availability.add" in line:
-                self.interest_line = True
-        elif filename == "EnforcerWarehouse.java":
-            if "dangerousDirections.add" in line:
-                self.interest_line = True
-        elif filename == "OptionsDialogue.java":
-            if "disabledMsg = " in line:
-                self.interest_line = True
-        elif filename == "KaysWarehouse.java":
-            if "KaySexResponse(" in line:
-                self.interest_line = True
-        elif filename == "UtilText.java":
-            if "new ParserCommand" in line:
-                self.interest_line = True
-            elif "input = " in line:
-                self.interest_line = True
-        elif filename == "SlaveDialogue.java":
-            if "legsSpreading = " in line:
-                self.interest_line = True
-        elif filename == "DominionExpress.java":
-            if "new MuleReward" in line:
-                self.interest_line = True
-
-        if "purchaseAvailability.append" in line:
-            self.interest_line = True
-        elif re.search(r"(Cry|Reaction|Speech)\s*=\s*", line) is not None:
-            self.interest_line = True
-        elif "new AbstractParserTarget" in line:
-            self.interest_line = True
-        elif "OffspringHeaderDisplay" in line:
-            self.interest_line = True
-        elif "map.put" in line:
-            self.interest_line = True
-        elif "responses.add" in line:
-            self.interest_line = True
-        elif "failEffects" in line:
-            self.interest_line = True
-
-    def parse_clothing(self, line: str):
-        if "new AbstractClothingType" in line:
-            self.interest_line = True
 
-    def parse_enchanting(self, line: str):
-        if "new AbstractItemEffectType" in line:
-            self.interest_line = True
-        elif "area = " in line:
-            self.interest_line = True
-        elif "descriptionToReturn = " in line:
-            self.interest_line = True
-
-    def parse_item(self, line: str):
-        if "new AbstractItemType" in line:
-            self.interest_line = True
-        elif "Util.newArrayListOfValues" in line:
-            self.interest_line = True
-        elif "parsed.add" in line:
-            self.interest_line = True
-        elif "new AbstractStatusEffect" in line:
-            self.interest_line = True
+def get_trigger_matcher(directory: Optional[str], filename: str) -> TriggerMatcher:
+    """
+    获取某目录下某文件适用的触发规则(通用规则+目录规则+文件规则)
+    """
+    key = (directory, filename)
+    matcher = _trigger_matchers.get(key)
+    if matcher is None:
+        triggers = NORMAL_TRIGGERS + [
+            trigger
+            for trigger in DIRECTORY_TRIGGERS.get(directory, [])
+            if trigger.filename is None or trigger.filename == filename
+        ]
+        matcher = _trigger_matchers[key] = TriggerMatcher(triggers)
+    return matcher
 
-    def parse_positions(self, line: str):
-        if "new AbstractSexPosition" in line:
-            self.interest_line = True
-        elif "new SexSlot" in line:
-            self.interest_line = True
 
-    def parse_sex(self, filename: str, line: str):
-        if filename == "SadisticActions.java":
-            if "tailSpecial1 = " in line or "tailSpecial2 = " in line:
-                self.interest_line = True
-        elif filename == "PenisAnus.java":
-            if "assTargeting = " in line:
-                self.interest_line = True
-        elif filename == "GenericOrgasms.java":
-            if "breasts = " in line:
-                self.interest_line = True
-            elif "areas.add" in line:
-                self.interest_line = True
-
-    def parse_main(self, line: str):
-        if re.search(r"disclaimer\s*=\s*", line) is not None:
-            self.interest_line = True
+SKIP_LINE_REGEX = re.compile(r"(getMandatoryFirstOf|getAllOf|parseFromXMLFile)")
 
-    def parse_rendering(self, line: str):
-        if "equippedPanelSB.append" in line:
-            self.interest_line = True
-        elif "panelSB.append" in line:
-            self.interest_line = True
 
-    def parse_colours(self, line: str):
-        if "new Colour" in line:
-            self.interest_line = True
+class JavaExtractor:
+    def __init__(self, directory: Optional[str] = None, filename: str = ""):
+        self.interest_line: bool = False
+        # 文件适用的规则在创建时确定，逐行处理时无需再判断路径
+        self.directory = directory
+        self.matcher = get_trigger_matcher(directory, filename)
 
-    def parse_places(self, filename: str, line: str):
-        if "new AbstractPlaceType" in line:
-            self.interest_line = True
-        elif "new AbstractPlaceUpgrade" in line:
-            self.interest_line = True
-        elif "new AbstractGlobalPlaceType" in line:
-            self.interest_line = True
+    @staticmethod
+    def for_file(file: Path) -> "JavaExtractor":
+        return JavaExtractor(route_java_file(file), file.name)
 
-    def parse_population(self, line: str):
-        if "new AbstractPopulationType" in line:
-            self.interest_line = True
+    def parse_triggers(self, line: str):
+        """
+        判断该行是否为需要提取的语句的开始
+        """
+        if self.interest_line:
+            return
 
-    def parse_world(self, line: str):
-        if "new AbstractWorldType" in line:
+        if self.matcher.match(line):
             self.interest_line = True
 
-    def parse_game(self, filename: str, line: str):
-        if filename == "Game.java":
-            if "corruptionGains = " in line:
-                self.interest_line = True
-        elif filename == "Combat.java":
-            if "Content.put" in line or "Content.get" in line:
-                self.interest_line = True
-            elif "critText.append" in line:
-                self.interest_line = True
-        elif filename == "Spell.java":
-            if "cost = " in line:
-                self.interest_line = True
-
-    def general_string_parse(self, line: str) -> bool:
+    def general_string_parse(
+        self, line: str, has_string: bool, ends_statement: bool
+    ) -> bool:
+        """
+        line为已移除注释的代码行，has_string与ends_statement由词法分析得到
+        """
         if not self.interest_line:
             return False
 
-        if line.strip().endswith(";"):
+        if ends_statement:
             self.interest_line = False
         elif "@Override" in line:  # 有效？
             self.interest_line = False
 
-        if (
-            re.search(r"(getMandatoryFirstOf|getAllOf|parseFromXMLFile)", line)
-            is not None
-        ):
+        if SKIP_LINE_REGEX.search(line) is not None:
             return False
         elif "SVGImageSB.append" in line:
             return False
         elif "System.err.println" in line:  # 暂不翻译报错信息
             return False
 
-        if re.search(r"\"[^\"]+\"(?!\")", line) is not None:
-            return True
-        return False
-
-    def process_comment(self, line: str) -> str:
-        """
-        处理多行注释
-        """
-        if re.search(r"^/\*", line) is not None:
-            if "*/" not in line:
-                self.comment = True
-            else:
-                return line[: line.find("/*")]
-        elif self.comment and "*/" in line:
-            self.comment = False
-            return line[: line.find("*/")]
-
-        # 处于多行注释内部则返回空字符串
-        if self.comment:
-            return ""
-
-        # 移除单行注释
-        if line.find(r"//") != -1:
-            match = re.search(r"(?<!s:)//", line)
-            if match is not None:
-                return line[: match.start()]
-
-        # 返回原字符串
-        return line
+        return has_string
@@ -0,0 +1,96 @@
+import re
+from dataclasses import dataclass
+from typing import List, Set
+
+# 以正则记号进行词法分析，目的是修正逐行正则处理的误判(字符串内的"//"、跨行注释、文本块中的分号)
+# 而非提速：整体耗时与逐行正则相当，逐字符扫描的纯Python实现反而更慢
+
+# 每次匹配一段普通代码及其后的一个记号：文本块、字符串、字符、注释
+# 未闭合的引号及不构成注释的"/"按普通字符处理；文本块内的"//"、";"及换行属于字符串内容
+TOKEN_REGEX = re.compile(
+    r"""[^"'/]*"""
+    r"(?:"
+    r'(?P<text_block>"""[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*(?:"""|\Z))'
+    r'|(?P<string>"[^"\\\n]*(?:\\.[^"\\\n]*)*")'
+    r"|(?P<char>'[^'\\\n]*(?:\\.[^'\\\n]*)*')"
+    r"|(?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))"
+    r"""|["'/]|\Z)"""
+)
+
+
+@dataclass
+class JavaLine:
+    """
+    词法分析后的一行java源码
+    """
+
+    code: str  # 移除注释后的代码，字符串与文本块内容保持不变
+    has_string: bool  # 是否含有非空字符串(或文本块内容)
+    ends_statement: bool  # 行末(忽略空白与注释)是否为结束语句的分号(不含文本块内的分号)
+
+
+def lex_lines(text: str) -> List[JavaLine]:
+    """
+    单次扫描java源码，按行返回移除注释后的代码、是否含有字符串及语句边界
+    行数与text.split("\\n")相同，多行注释与文本块中的换行均保留
+    """
+    parts: List[str] = []  # 移除注释后的代码片段
+    string_rows: Set[int] = set()  # 含有非空字符串的行
+    block_rows: Set[int] = set()  # 文本块内部(不含结束行)的行
+    pos = 0  # 尚未写入parts的位置
+    row = 0  # 当前记号所在的行
+    row_pos = 0  # 已计入row的位置
+
+    for match in TOKEN_REGEX.finditer(text):
+        kind = match.lastgroup
+        if kind is None or kind == "char":
+            continue
+        start, end = match.span(kind)
+        row += text.count("\n", row_pos, start)
+        row_pos = end
+        token = match.group(kind)
+
+        if kind == "string":
+            if end - start > 2:
+                string_rows.add(row)
+        elif kind == "comment":
+            parts.append(text[pos:start])
+            # 保留多行注释中的换行，保证行号不变
+            newlines = token.count("\n")
+            if newlines > 0:
+                parts.append("\n" * newlines)
+                row += newlines
+            pos = end
+        else:
+            # 文本块：内容按行计入，内部的行不会结束语句
+            pieces = token.split("\n")
+            last = len(pieces) - 1
+            for idx in range(1, last + 1):
+                content = pieces[idx]
+                if idx < last:
+                    block_rows.add(row + idx)
+                elif content.endswith('"""'):
+                    content = content[:-3]
+                if content != "" and not content.isspace():
+                    string_rows.add(row + idx)
+            row += last
+
+    parts.append(text[pos:])
+    return [
+        JavaLine(
+            code,
+            row in string_rows,
+            row not in block_rows and code.rstrip().endswith(";"),
+        )
+        for row, code in enumerate("".join(parts).split("\n"))
+    ]
+
+
+def strip_comments(text: str) -> str:
+    """
+    移除java源码中的所有注释，字符串与行号保持不变
+    """
+    return "\n".join(line.code for line in lex_lines(text))
+
+
+__all__ = ["JavaLine", "lex_lines", "strip_comments"]
@@ -1,7 +1,58 @@
 import logging
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s # %(levelname)s # %(message)s"
 )
 
 logger = logging.getLogger(__name__)
+# 结构化的诊断记录(见diagnostics.py)，未启用汇总时与普通日志一样直接输出
+diagnostics_logger = logging.getLogger(f"{__name__}.diagnostics")
+
+# (日志级别, 日志文本, 诊断记录)
+LogMessages = List[Tuple[int, str, Optional[Any]]]
+
+
+class MessageCollector(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: LogMessages = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.messages.append(
+                (
+                    record.levelno,
+                    record.getMessage(),
+                    getattr(record, "diagnostic", None),
+                )
+            )
+        except Exception:
+            self.handleError(record)
+
+
+@contextmanager
+def collect_logs() -> Iterator[LogMessages]:
+    """
+    暂存期间的日志而不输出，之后可用emit_logs按需要的顺序输出
+    """
+    collector = MessageCollector()
+    saved = [(log, log.handlers, log.propagate) for log in (logger, diagnostics_logger)]
+    for log in (logger, diagnostics_logger):
+        log.handlers = [collector]
+        log.propagate = False
+    try:
+        yield collector.messages
+    finally:
+        for log, handlers, propagate in saved:
+            log.handlers = handlers
+            log.propagate = propagate
+
+
+def emit_logs(messages: LogMessages) -> None:
+    for level, message, diagnostic in messages:
+        if diagnostic is not None:
+            diagnostics_logger.log(level, message, extra={"diagnostic": diagnostic})
+        else:
+            logger.log(level, message)
@@ -5,12 +5,25 @@ import argparse
 
 from pathlib import Path
 
+from data import json_default
+from diagnostics import Diagnostics, QUIET, SUMMARY, VERBOSE
 from extractor import Extractor
 from applier import Applier
+from apply_state import ApplyState
 from processor import Processor
 from repo_dump import Repo
+from tree_cache import TreeCache
 from update import Updater
-from const import NEW_DICT_DIR, OLD_DICT_DIR, REPO_BRANCH
+from outdated_store import OutdatedStore
+from const import (
+    NEW_DICT_DIR,
+    OLD_DICT_DIR,
+    EXTRACT_CACHE_DIR,
+    APPLY_STATE_DIR,
+    DIAGNOSTICS_FILE,
+    OUTDATED_STORE_FILE,
+    REPO_BRANCH,
+)
 from logger import logger
 from util import dict_update_splited_htmlContent
 
@@ -42,6 +55,24 @@ argparser.add_argument(
     action="store_true",
     help="whether to ignore untranslated entries",
 )
+argparser.add_argument(
+    "--translation-memory",
+    action="store_true",
+    default=False,
+    help="whether to fill entries without a match in their own file from identical originals in other files",
+)
+argparser.add_argument(
+    "--fuzzy-match",
+    action="store_true",
+    default=False,
+    help="whether to carry translations over from similar outdated originals to entries that are still untranslated (marked with a 'fuzzy' field for review and not applied to the game)",
+)
+argparser.add_argument(
+    "--outdated-store",
+    action="store_true",
+    default=False,
+    help="whether to keep outdated entries in an append-only sqlite store (downloaded outdated files are imported only when changed) and only export the outdated files that got new entries in this run",
+)
 
 argparser.add_argument(
     "--target",
@@ -50,11 +81,55 @@ argparser.add_argument(
     choices=["main", "mod"],
     help="determine which project to localize",
 )
+argparser.add_argument(
+    "--jobs",
+    "-j",
+    type=int,
+    default=1,
+    help="number of worker processes used to extract entries, merge and apply the dictionary",
+)
+argparser.add_argument(
+    "--extract-cache",
+    action="store_true",
+    default=False,
+    help="whether to cache extracted entries on disk so that unchanged files are not re-extracted on the next run (for local reruns, keep it off in CI)",
+)
+argparser.add_argument(
+    "--stream-xml",
+    action="store_true",
+    default=False,
+    help="whether to parse xml files incrementally to reduce peak memory (per-file peak memory is written to the diagnostics report)",
+)
+argparser.add_argument(
+    "--tree-cache-size",
+    type=int,
+    default=0,
+    help="memory budget in MB for reusing parsed xml trees between extraction and applying, 0 to disable (single process, non-streaming extraction only)",
+)
+argparser.add_argument(
+    "--incremental",
+    action="store_true",
+    default=False,
+    help="whether to keep a per-file applied-state manifest and only restore and reapply files whose source, dictionary or patch rules changed (no need to reset the source tree between runs)",
+)
+argparser.add_argument(
+    "--verbosity",
+    "-v",
+    type=int,
+    default=SUMMARY,
+    choices=[QUIET, SUMMARY, VERBOSE],
+    help="console output of diagnostics (all are written to the jsonl report): 0 counts per kind, 1 also a few samples per kind, 2 every record",
+)
 
 
 def main():
     args = argparser.parse_args()
 
+    with Diagnostics(Path(DIAGNOSTICS_FILE[args.target]), args.verbosity):
+        localize(args)
+
+
+def localize(args):
     target = args.target
 
     pt_token = (
@@ -86,7 +161,27 @@ def main():
         logger.info("==== 正在解压最新版本游戏源码 ====")
         repo.unzip_latest_version()
 
-    extractor = Extractor(target, root, new_dict_dir, repo.latest_commit)
+    tree_cache = (
+        TreeCache(args.tree_cache_size * 1024 * 1024)
+        if args.tree_cache_size > 0
+        else None
+    )
+
+    apply_state = (
+        ApplyState(Path(APPLY_STATE_DIR[target]), root) if args.incremental else None
+    )
+
+    extractor = Extractor(
+        target,
+        root,
+        new_dict_dir,
+        repo.latest_commit,
+        jobs=args.jobs,
+        cache_dir=Path(EXTRACT_CACHE_DIR[target]) if args.extract_cache else None,
+        stream_xml=args.stream_xml,
+        tree_cache=tree_cache,
+        apply_state=apply_state,
+    )
 
     logger.info("==== 正在提取翻译条目 ====")
     extractor.extract()
@@ -100,10 +195,27 @@ def main():
         logger.info("==== 正在解压最新字典文件 ====")
         repo.unzip_latest_dict(old_dict_dir)
 
-    updater = Updater(old_dict_dir, new_dict_dir, new_data)
+    outdated_store = (
+        OutdatedStore(Path(OUTDATED_STORE_FILE[target]))
+        if args.outdated_store
+        else None
+    )
+    updater = Updater(
+        old_dict_dir,
+        new_dict_dir,
+        new_data,
+        jobs=args.jobs,
+        translation_memory=args.translation_memory,
+        fuzzy_match=args.fuzzy_match,
+        outdated_store=outdated_store,
+        # 提取结果只交给合并使用，可直接修改其中的词条
+        own_new_data=True,
+    )
 
     logger.info("==== 正在合并字典 ====")
     updater.update_dict(new_data, args.ignore_untranslated)
+    if outdated_store is not None:
+        outdated_store.close()
 
     old_data = updater.old_data
     new_data = updater.new_data
@@ -117,7 +229,15 @@ def main():
 
     dump(new_data, new_dict_dir)
 
-    applier = Applier(target, root, new_dict_dir, new_data)
+    applier = Applier(
+        target,
+        root,
+        new_dict_dir,
+        new_data,
+        tree_cache=tree_cache,
+        jobs=args.jobs,
+        apply_state=apply_state,
+    )
 
     logger.info("==== 正在应用字典 ====")
     applier.apply()
@@ -129,7 +249,13 @@ def dump(new_data, new_dict_dir):
     for path, new_dict in new_data.items():
         (new_dict_dir / path).parent.mkdir(parents=True, exist_ok=True)
         with open(new_dict_dir / path, "w", encoding="utf-8") as f:
-            json.dump(list(new_dict.values()), f, ensure_ascii=False, indent=2)
+            json.dump(
+                list(new_dict.values()),
+                f,
+                ensure_ascii=False,
+                indent=2,
+                default=json_default,
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+from data import JsonEntry, SingleDictionary, json_default, load_entries
+from translation_memory import is_java_entry, old_original
+from logger import logger
+
+# 每条记录为某一过时词条的一个版本，已有记录不会被修改或删除
+# 同一(文件路径, key, 版本号)以最后插入的记录为准，文件中的顺序以首次插入的顺序为准
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outdated_revisions (
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version TEXT NOT NULL,
+    java INTEGER NOT NULL,
+    original TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outdated_entry ON outdated_revisions (path, key, version);
+CREATE INDEX IF NOT EXISTS outdated_original ON outdated_revisions (java, original);
+CREATE TABLE IF NOT EXISTS imported_files (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+"""
+
+# 某一文件中每个过时词条的最新记录，按首次插入的顺序
+LATEST_ENTRIES_QUERY = """
+SELECT revision.entry FROM outdated_revisions AS revision
+JOIN (
+    SELECT MIN(rowid) AS first, MAX(rowid) AS last FROM outdated_revisions
+    WHERE path = ? GROUP BY key, version
+) AS entry_rows ON revision.rowid = entry_rows.last
+ORDER BY entry_rows.first
+"""
+
+
+def split_version(key: str) -> Tuple[str, str]:
+    """
+    从过时词条的key中分离出游戏版本号，如00012_0.4.8 -> (00012, 0.4.8)
+    旧版本合并产生的00012__0.4.8 -> (00012_, 0.4.8)，与前者可同时存在于一个文件中
+    """
+    idx = key.rfind("_")
+    if idx < 0 or "." not in key[idx + 1 :]:
+        return key, ""
+    return key[:idx], key[idx + 1 :]
+
+
+def digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class OutdatedStore:
+    """
+    过时词条的只追加存储(SQLite)：每次运行只插入新的记录，不再融合并重写已有的过时词条
+    下载的过时词条文件按内容摘要增量导入，Paratranz上的修改作为新记录插入；原文建有索引
+    只导出本次插入了新词条的文件，内容由查询得到
+    """
+
+    def __init__(self, file: Path) -> None:
+        self.file = Path(file)
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.file.as_posix())
+        self.connection.executescript(SCHEMA)
+        # 本次运行中插入了新词条的文件
+        self.touched: Set[str] = set()
+
+    def __len__(self) -> int:
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM outdated_revisions"
+        ).fetchone()[0]
+
+    def insert(self, path: str, entry: JsonEntry) -> bool:
+        """
+        插入词条的一个版本，与该词条的最新记录内容相同时忽略，返回是否插入了新记录
+        """
+        key, version = split_version(entry["key"])
+        text = json.dumps(entry, ensure_ascii=False, default=json_default)
+        entry_digest = digest(text.encode("utf-8"))
+        latest = self.connection.execute(
+            """
+            SELECT digest FROM outdated_revisions
+            WHERE path = ? AND key = ? AND version = ? ORDER BY rowid DESC LIMIT 1
+            """,
+            (path, key, version),
+        ).fetchone()
+        if latest is not None and latest[0] == entry_digest:
+            return False
+        self.connection.execute(
+            """
+            INSERT INTO outdated_revisions
+                (path, key, version, java, original, entry, digest)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                path,
+                key,
+                version,
+                is_java_entry(entry),
+                old_original(entry),
+                text,
+                entry_digest,
+            ),
+        )
+        return True
+
+    def add(self, path: str, entry: JsonEntry) -> None:
+        """
+        记录本次遗失的词条，有新记录的文件在导出时写出
+        """
+        if self.insert(path, entry):
+            self.touched.add(path)
+
+    def entries(self, path: str) -> SingleDictionary:
+        """
+        某一过时词条文件中各词条的最新记录
+        """
+        return load_entries(
+            [
+                json.loads(entry)
+                for (entry,) in self.connection.execute(LATEST_ENTRIES_QUERY, (path,))
+            ]
+        )
+
+    def import_dir(self, outdated_dir: Path) -> None:
+        """
+        导入下载的过时词条文件夹，内容与上次导入时相同的文件直接跳过
+        """
+        files = sorted(outdated_dir.glob("**/*.json"))
+        imported, inserted = 0, 0
+        for file in files:
+            path = file.relative_to(outdated_dir).as_posix()
+            data = file.read_bytes()
+            file_digest = digest(data)
+            row = self.connection.execute(
+                "SELECT digest FROM imported_files WHERE path = ?", (path,)
+            ).fetchone()
+            if row is not None and row[0] == file_digest:
+                continue
+            for entry in load_entries(json.loads(data.decode("utf-8"))).values():
+                inserted += self.insert(path, entry)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO imported_files (path, digest) VALUES (?, ?)",
+                (path, file_digest),
+            )
+            imported += 1
+        self.commit()
+        logger.info(
+            "过时词条：%s中共%s个文件，导入有变动的%s个，新增记录%s条",
+            outdated_dir.as_posix(),
+            len(files),
+            imported,
+            inserted,
+        )
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def find(self, java: bool, original: str) -> Optional[Tuple[str, JsonEntry]]:
+        """
+        按规范化原文查找最新记录的过时词条，返回(文件路径, 词条)
+        """
+        row = self.connection.execute(
+            """
+            SELECT path, entry FROM outdated_revisions WHERE java = ? AND original = ?
+            ORDER BY rowid DESC LIMIT 1
+            """,
+            (java, original),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], JsonEntry.from_json(json.loads(row[1]))
+
+    def export(self, target_dir: Path) -> None:
+        """
+        按原过时词条文件夹的结构导出本次有新词条的json文件
+        """
+        for path in sorted(self.touched):
+            file = target_dir / path
+            file.parent.mkdir(parents=True, exist_ok=True)
+            with open(file, "w", encoding="utf-8") as f:
+                json.dump(
+                    list(self.entries(path).values()),
+                    f,
+                    ensure_ascii=False,
+                    indent=4,
+                    default=json_default,
+                )
+        logger.info(
+            "过时词条：共%s条记录，已导出%s个有新词条的文件", len(self), len(self.touched)
+        )
+
+    def close(self) -> None:
+        self.connection.close()
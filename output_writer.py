@@ -0,0 +1,58 @@
+import os
+from pathlib import Path
+from typing import Tuple
+
+from logger import logger
+
+
+class OutputWriter:
+    """
+    仅在内容变化时写入文件，未变化的文件保留原修改时间，避免触发重新编译
+    """
+
+    def __init__(self) -> None:
+        self.written = 0
+        self.skipped = 0
+
+    def write_bytes(self, path: Path, data: bytes) -> bool:
+        try:
+            if os.path.getsize(path) == len(data):
+                with open(path, "rb") as f:
+                    if f.read() == data:
+                        self.skipped += 1
+                        return False
+        except FileNotFoundError:
+            pass
+
+        with open(path, "wb") as f:
+            f.write(data)
+        self.written += 1
+        return True
+
+    def write_text(self, path: Path, text: str, encoding: str = "utf-8") -> bool:
+        # 与文本模式写入相同，换行符按平台转换
+        if os.linesep != "\n":
+            text = text.replace("\n", os.linesep)
+        return self.write_bytes(path, text.encode(encoding))
+
+    def copy_file(self, src: str, dst: str) -> str:
+        """
+        用作shutil.copytree的copy_function
+        """
+        self.write_bytes(Path(dst), Path(src).read_bytes())
+        return dst
+
+    def counts(self) -> Tuple[int, int]:
+        return self.written, self.skipped
+
+    def merge(self, counts: Tuple[int, int]) -> None:
+        """
+        合并其他进程中的写入统计
+        """
+        self.written += counts[0]
+        self.skipped += counts[1]
+
+    def report(self) -> None:
+        logger.info(
+            "写入文件：%s个有变动，%s个无变动已跳过", self.written, self.skipped
+        )
@@ -0,0 +1,45 @@
+from typing import Callable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+PROC_STATUS = "/proc/self/status"
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def _read_status(field: str) -> int:
+    """
+    /proc/self/status中以KB为单位的字段
+    """
+    with open(PROC_STATUS, "r", encoding="ascii") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(f"{field} not found in {PROC_STATUS}")
+
+
+def reset_peak_rss() -> Optional[int]:
+    """
+    重置进程的内存峰值(VmHWM)，返回当前内存占用(RSS)，单位KB
+    仅Linux支持，其他平台返回None
+    """
+    try:
+        with open(PROC_CLEAR_REFS, "w", encoding="ascii") as f:
+            f.write("5")
+        return _read_status("VmRSS")
+    except OSError:
+        return None
+
+
+def measure_peak_memory(func: Callable[..., T], *args) -> Tuple[T, Optional[int]]:
+    """
+    执行func，返回其结果及执行期间内存峰值(RSS，含lxml等C扩展的分配)相对执行前的增量，单位KB
+    可在子进程中调用，无法统计时增量为None
+    """
+    before = reset_peak_rss()
+    result = func(*args)
+    if before is None:
+        return result, None
+    return result, max(_read_status("VmHWM") - before, 0)
+
+
+__all__ = ["reset_peak_rss", "measure_peak_memory"]
@@ -6,7 +6,7 @@ from pathlib import Path
 from typing import Dict, Union, List, Tuple, Set
 
 from logger import logger
-from data import JsonEntry, WholeDictionary, SingleDictionary
+from data import JsonEntry, WholeDictionary, SingleDictionary, json_default
 from const import ENTRY_DIFF_DIR, TRANS_DIFF_DIR
 from update import Updater
 
@@ -36,7 +36,7 @@ class Processor:
         self.old_data: WholeDictionary = old_data
         
         self.updater = updater
-        print(updater.file_with_missing_entry)
+        logger.info("存在遗失条目的文件：%s个", len(updater.file_with_missing_entry))
 
     def load(self):
         for path, fileDict in self.new_data.items():
@@ -104,13 +104,13 @@ class Processor:
             out_path = Path(ENTRY_DIFF_DIR[self.target], path)
             os.makedirs(out_path.parent, exist_ok=True)
             with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(list(self.new_data[path].values()), f, indent=2, ensure_ascii=False)
+                json.dump(list(self.new_data[path].values()), f, indent=2, ensure_ascii=False, default=json_default)
 
         for path, entries in trans_diff.items():
             out_path = Path(TRANS_DIFF_DIR[self.target], path)
             os.makedirs(out_path.parent, exist_ok=True)
             with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(entries, f, indent=2, ensure_ascii=False)
+                json.dump(entries, f, indent=2, ensure_ascii=False, default=json_default)
 
     def check_same(self):
         same_checker: Dict[str, str] = {}  # Dict[original_text, first_key]
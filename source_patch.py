@@ -0,0 +1,252 @@
+import json
+import re
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from const import ROOT_DIR, SVG_DIR, SOURCE_PATCH_FILE
+from logger import logger
+import diagnostics
+
+FONT_SIZE_REGEX = r"font-size\s*:\s*(\d+)\s*(?:px|pt)"
+LINE_HEIGHT_REGEX = r"line-height\s*:\s*(\d+)\s*(?:px|pt)"
+
+
+def ui_value_modify(line: str, regex: str, multiplier: float) -> str:
+    matches = re.search(regex, line)
+    if matches is not None:
+        for group in matches.groups():
+            if group.isdigit():
+                value = int(group)
+                if value <= 16:
+                    value = int(value * min(multiplier + 0.1, 1))
+                else:
+                    value = int(value * multiplier)
+                line = line.replace(group, str(value))
+            else:
+                multiplier = int(multiplier * 10)
+                line = line.replace(group, f"({group})*{str(multiplier)}/10")
+
+    return line
+
+
+@dataclass
+class SourcePatch:
+    """
+    对文件名匹配pattern的源文件进行的修改，patch接收并返回整个文件的文本
+    """
+
+    pattern: str  # 文件名，或含通配符的文件名模式
+    patch: Callable[[str], str]
+
+    def matches(self, name: str) -> bool:
+        return pattern_matches(self.pattern, name)
+
+
+def is_glob(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
+
+
+def pattern_matches(pattern: str, name: str) -> bool:
+    if is_glob(pattern):
+        return fnmatch(name, pattern)
+    return name == pattern
+
+
+def _lines(pattern: str, literal: str, modify: Callable[[str], str]) -> SourcePatch:
+    """
+    逐行修改，仅处理含有literal的行
+    """
+
+    def patch(text: str) -> str:
+        if literal not in text:
+            return text
+        lines = text.split("\n")
+        for idx, line in enumerate(lines):
+            if literal in line:
+                lines[idx] = modify(line)
+        return "\n".join(lines)
+
+    return SourcePatch(pattern, patch)
+
+
+def _ui_value(pattern: str, regex: str, literal: str, multiplier: float):
+    return _lines(
+        pattern, literal, lambda line: ui_value_modify(line, regex, multiplier)
+    )
+
+
+def css_font_family(line: str) -> str:
+    if line.strip().startswith("-fx-font-family") or line.strip().startswith(
+        "font-family"
+    ):
+        item = line.split(":")
+        fonts = item[1].split(",")
+        fonts.insert(0, '"Source Han Sans CN"')
+        item[1] = ",".join(fonts)
+        line = ":".join(item)
+    return line
+
+
+def replace_svg(text: str) -> str:
+    with open(
+        Path(ROOT_DIR) / SVG_DIR / "eisek_mob_hideout.svg", "r", encoding="utf-8"
+    ) as f:
+        svg = f.read()
+    return re.sub(r"(<svg.*</svg>)", svg, text, flags=re.DOTALL)
+
+
+# 需逐行判断的修改，同一文件按登记顺序执行，之后再执行数据文件中的字面替换
+SOURCE_PATCHES: List[SourcePatch] = [
+    # 添加中文字体，调整字体和行高
+    _lines("*.css", "font-family", css_font_family),
+    _ui_value("*.css", FONT_SIZE_REGEX, "font-size", 0.8),
+    _ui_value("*.css", LINE_HEIGHT_REGEX, "line-height", 0.9),
+    _ui_value("*.java", FONT_SIZE_REGEX, "font-size", 0.8),
+    _ui_value("*.java", LINE_HEIGHT_REGEX, "line-height", 0.8),
+    # 替换地图
+    SourcePatch("eisek_mob_hideout.xml", replace_svg),
+]
+
+
+@dataclass
+class ReplaceRule:
+    """
+    数据文件中登记的一条字面替换规则
+    """
+
+    pattern: str  # 文件名，或含通配符的文件名模式
+    old: str
+    new: str
+    comment: str = ""
+    files: int = 0  # 处理过的文件数
+    hits: int = 0  # 替换次数
+
+    def matches(self, name: str) -> bool:
+        return pattern_matches(self.pattern, name)
+
+    def describe(self) -> str:
+        text = f"{self.pattern}: {self.old.strip()[:80]}"
+        return f"{text}（{self.comment}）" if self.comment else text
+
+
+class MultiReplacer:
+    """
+    将同一文件适用的全部字面替换编译为一个正则，单次扫描完成所有替换
+    同一位置可匹配多条规则时按登记顺序取第一条，与依次调用str.replace一致
+    """
+
+    def __init__(self, rules: List[ReplaceRule]) -> None:
+        self.all_rules = rules
+        self.rules: Dict[str, ReplaceRule] = {}
+        for rule in rules:
+            self.rules.setdefault(rule.old, rule)
+        self.regex = re.compile("|".join(re.escape(old) for old in self.rules))
+
+    def replace(self, match: re.Match) -> str:
+        rule = self.rules[match.group(0)]
+        rule.hits += 1
+        return rule.new
+
+    def __call__(self, text: str) -> str:
+        for rule in self.all_rules:
+            rule.files += 1
+        return self.regex.sub(self.replace, text)
+
+
+class SourcePatcher:
+    """
+    对游戏源码的其他修改：SOURCE_PATCHES中的逐行修改，以及数据文件中的字面替换规则
+    """
+
+    def __init__(self, rules: List[ReplaceRule]) -> None:
+        self.rules = rules
+        # 适用规则相同的文件共用一个替换器
+        self.replacers: Dict[Tuple[int, ...], MultiReplacer] = {}
+        self.patches: Dict[str, Tuple[Callable[[str], str], ...]] = {}
+
+        # 启动时预编译各文件名规则对应的替换器
+        for rule in rules:
+            if not is_glob(rule.pattern):
+                self.patches_for(rule.pattern)
+
+    @classmethod
+    def load(cls, file: Path = Path(SOURCE_PATCH_FILE)) -> "SourcePatcher":
+        with open(file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            [
+                ReplaceRule(item["file"], old, new, item.get("comment", ""))
+                for item in data
+                for old, new in item["replace"]
+            ]
+        )
+
+    def replacer_for(self, name: str) -> Optional[MultiReplacer]:
+        indices = tuple(
+            idx for idx, rule in enumerate(self.rules) if rule.matches(name)
+        )
+        if not indices:
+            return None
+        if indices not in self.replacers:
+            self.replacers[indices] = MultiReplacer(
+                [self.rules[idx] for idx in indices]
+            )
+        return self.replacers[indices]
+
+    def patches_for(self, name: str) -> Tuple[Callable[[str], str], ...]:
+        try:
+            return self.patches[name]
+        except KeyError:
+            pass
+
+        patches: List[Callable[[str], str]] = [
+            patch.patch for patch in SOURCE_PATCHES if patch.matches(name)
+        ]
+        replacer = self.replacer_for(name)
+        if replacer is not None:
+            patches.append(replacer)
+
+        self.patches[name] = tuple(patches)
+        return self.patches[name]
+
+    def patch(self, name: str, text: str) -> str:
+        for patch in self.patches_for(name):
+            text = patch(text)
+        return text
+
+    def unmatched(self) -> List[ReplaceRule]:
+        return [rule for rule in self.rules if rule.hits == 0]
+
+    def report(self) -> None:
+        """
+        报告从未生效的规则，通常意味着上游源码已改动，需要更新规则
+        """
+        unmatched = self.unmatched()
+        for rule in unmatched:
+            if rule.files == 0:
+                diagnostics.report(
+                    "missing_patch_file", "源码修改规则未找到文件", detail=rule.describe()
+                )
+            else:
+                diagnostics.report(
+                    "unmatched_patch_rule", "源码修改规则未生效", detail=rule.describe()
+                )
+        logger.info(
+            "源码修改规则：%s条生效，%s条未生效",
+            len(self.rules) - len(unmatched),
+            len(unmatched),
+        )
+
+
+__all__ = [
+    "FONT_SIZE_REGEX",
+    "LINE_HEIGHT_REGEX",
+    "ui_value_modify",
+    "SourcePatch",
+    "SOURCE_PATCHES",
+    "ReplaceRule",
+    "MultiReplacer",
+    "SourcePatcher",
+]
@@ -0,0 +1,265 @@
+import argparse
+import random
+from pathlib import Path
+from typing import List
+
+from logger import logger
+
+# 用于拼接文本的词汇，仅需形似游戏文本
+WORDS = (
+    "the a you your her his their shadow demon succubus alley market wolf-girl "
+    "cat-boy street warehouse glass potion arcane aura collar dress boots "
+    "slowly quickly softly grin smile whisper step towards against behind "
+    "Dominion Lilaya Rose Nyan Ralph Vicky Scarlett Harpy Nests Submission"
+).split()
+
+PARSING_TOKENS = (
+    "[npc.Name]",
+    "[npc.she]",
+    "[npc.herHis]",
+    "[pc.name]",
+    "[pc.speech(Hello there!)]",
+    "[npc.speech(What do you want?)]",
+    "[style.boldGood(success)]",
+    "[#npc.getName()]",
+)
+
+COLOURS = ("BASE_PINK", "BASE_BLUE", "GENERIC_ARCANE", "BASE_GREY")
+
+
+class SyntheticCorpus:
+    """
+    生成形似Lilith's Throne源码的合成语料，用于离线基准测试
+    scale为1时约含200个xml文件与40个java文件
+    """
+
+    def __init__(self, root: Path, scale: int = 1, seed: int = 0) -> None:
+        self.root = Path(root)
+        self.scale = max(scale, 1)
+        self.random = random.Random(seed)
+
+    def sentence(self, min_words: int = 4, max_words: int = 16) -> str:
+        words = self.random.choices(WORDS, k=self.random.randint(min_words, max_words))
+        if self.random.random() < 0.4:
+            words.insert(
+                self.random.randrange(len(words) + 1),
+                self.random.choice(PARSING_TOKENS),
+            )
+        text = " ".join(words)
+        return text[0].upper() + text[1:] + self.random.choice((".", "!", "?", "..."))
+
+    def paragraph(self) -> str:
+        text = " ".join(self.sentence() for _ in range(self.random.randint(1, 4)))
+        r = self.random.random()
+        if r < 0.15:
+            text = f"<i>{text}</i>"
+        elif r < 0.25:
+            text = f"<span style='color:{self.random.choice(COLOURS)};'>{text}</span>"
+        return f"<p>{text}</p>"
+
+    def html_content(self) -> str:
+        paragraphs: List[str] = []
+        for _ in range(self.random.randint(2, 12)):
+            if self.random.random() < 0.15:
+                paragraphs.append(
+                    "#IF(npc.isFeminine())\n"
+                    + self.paragraph()
+                    + "\n#ELSE\n"
+                    + self.paragraph()
+                    + "\n#ENDIF"
+                )
+            else:
+                paragraphs.append(self.paragraph())
+        return "\n".join(paragraphs)
+
+    def write(self, path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    def dialogue_xml(self) -> str:
+        nodes = [
+            f'\t<htmlContent tag="NODE_{idx}"><![CDATA[\n{self.html_content()}\n\t]]></htmlContent>'
+            for idx in range(self.random.randint(10, 40))
+        ]
+        return (
+            '<?xml version="1.0" encoding="utf-8" standalone="no"?>\n<dialogue>\n'
+            + "\n".join(nodes)
+            + "\n</dialogue>\n"
+        )
+
+    def item_xml(self) -> str:
+        name = self.sentence(1, 3).rstrip(".!?")
+        lines = "".join(
+            f"\n\t\t\t<line><![CDATA[{self.sentence(2, 6)}]]></line>"
+            for _ in range(self.random.randint(1, 4))
+        )
+        return f"""<?xml version="1.0" encoding="utf-8" standalone="no"?>
+<item>
+\t<coreAttributes>
+\t\t<value>{self.random.randint(10, 5000)}</value>
+\t\t<determiner><![CDATA[a]]></determiner>
+\t\t<name><![CDATA[{name}]]></name>
+\t\t<namePlural pluralByDefault="false"><![CDATA[{name}s]]></namePlural>
+\t\t<description><![CDATA[{" ".join(self.sentence() for _ in range(3))}]]></description>
+\t\t<useDescriptor>drink</useDescriptor>
+\t\t<effectTooltipLines>{lines}
+\t\t</effectTooltipLines>
+\t\t<applyEffects><![CDATA[[#npc.incrementHealth(10)]]]></applyEffects>
+\t</coreAttributes>
+\t<useDescriptions>
+\t\t<selfUse><![CDATA[{self.paragraph()}]]></selfUse>
+\t\t<otherUse><![CDATA[{self.paragraph()}]]></otherUse>
+\t</useDescriptions>
+</item>
+"""
+
+    def clothing_xml(self) -> str:
+        name = self.sentence(1, 3).rstrip(".!?")
+        displacements = "".join(
+            f"""
+\t<displacementText type="{kind}">
+\t\t<self><![CDATA[{self.sentence()}]]></self>
+\t\t<other><![CDATA[{self.sentence()}]]></other>
+\t\t<otherRough><![CDATA[{self.sentence()}]]></otherRough>
+\t</displacementText>"""
+            for kind in ("REMOVE_OR_EQUIP", "UNZIPS", "PULLS_UP")[
+                : self.random.randint(1, 3)
+            ]
+        )
+        return f"""<?xml version="1.0" encoding="utf-8" standalone="no"?>
+<clothing>
+\t<coreAttributes>
+\t\t<value>{self.random.randint(10, 5000)}</value>
+\t\t<determiner><![CDATA[a pair of]]></determiner>
+\t\t<name appendColourName="true"><![CDATA[{name}]]></name>
+\t\t<namePlural pluralByDefault="true"><![CDATA[{name}s]]></namePlural>
+\t\t<description><![CDATA[{" ".join(self.sentence() for _ in range(3))}]]></description>
+\t\t<authorTag><![CDATA[{self.sentence(3, 8)}]]></authorTag>
+\t</coreAttributes>{displacements}
+</clothing>
+"""
+
+    def java_string(self) -> str:
+        return self.sentence().replace('"', '\\"')
+
+    def java_source(self, package: str, class_name: str) -> str:
+        lines: List[str] = [
+            f"package {package};",
+            "",
+            "import java.util.List;",
+            "",
+            "/**",
+            f" * {self.sentence()}",
+            " * @since 0.1.0",
+            " */",
+            f"public class {class_name} {{",
+            "",
+            f"\tpublic enum {class_name}Type {{",
+        ]
+        for idx in range(self.random.randint(3, 10)):
+            lines.append(
+                f'\t\tTYPE_{idx}("{self.sentence(1, 3)}", "{self.java_string()}"),'
+            )
+        lines += ["\t\t;", "\t}", ""]
+
+        for idx in range(self.random.randint(5, 15)):
+            lines += [
+                f'\tpublic static final DialogueNode NODE_{idx} = new DialogueNode("{self.sentence(1, 4)}", "", true) {{',
+                "\t\t@Override",
+                "\t\tpublic String getContent() {",
+                "\t\t\tStringBuilder sb = new StringBuilder();",
+                "\t\t\t// the description depends on the npc",
+            ]
+            for _ in range(self.random.randint(2, 8)):
+                r = self.random.random()
+                if r < 0.5:
+                    lines.append(f'\t\t\tsb.append("{self.paragraph()}");')
+                elif r < 0.7:
+                    lines += [
+                        "\t\t\tsb.append(UtilText.parse(npc,",
+                        '\t\t\t\t\t"<p>"',
+                        f'\t\t\t\t\t\t+ "{self.java_string()}"',
+                        f'\t\t\t\t\t\t+ " {self.java_string()}"',
+                        '\t\t\t\t\t+ "</p>"));',
+                    ]
+                elif r < 0.8:
+                    lines.append(
+                        f'\t\t\tsb.append("<a href=\\"https://www.lilithsthrone.com\\">{self.sentence(1, 3)}</a>"); // link'
+                    )
+                elif r < 0.9:
+                    lines += [
+                        "\t\t\t/* old text:",
+                        f'\t\t\tsb.append("{self.java_string()}");',
+                        "\t\t\t*/",
+                    ]
+                else:
+                    lines.append("\t\t\tint value = Util.random.nextInt(100);")
+            lines += [
+                "\t\t\treturn sb.toString();",
+                "\t\t}",
+                "\t\t@Override",
+                "\t\tpublic Response getResponse(int responseTab, int index) {",
+                "\t\t\tif (index == 1) {",
+                f'\t\t\t\treturn new Response("{self.sentence(1, 3)}", "{self.java_string()}", NODE_{idx});',
+                "\t\t\t}",
+                "\t\t\treturn null;",
+                "\t\t}",
+                "\t};",
+                "",
+            ]
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def generate(self) -> Path:
+        res = self.root.joinpath("res")
+        src = self.root.joinpath("src", "com", "lilithsthrone", "game")
+
+        for idx in range(40 * self.scale):
+            self.write(
+                res.joinpath("txt", "places", f"area_{idx % 8}", f"dialogue_{idx}.xml"),
+                self.dialogue_xml(),
+            )
+        for idx in range(80 * self.scale):
+            self.write(
+                res.joinpath("items", "innoxia", f"item_{idx % 6}", f"item_{idx}.xml"),
+                self.item_xml(),
+            )
+        for idx in range(80 * self.scale):
+            self.write(
+                res.joinpath(
+                    "clothing", "innoxia", f"set_{idx % 6}", f"clothing_{idx}.xml"
+                ),
+                self.clothing_xml(),
+            )
+
+        java_dirs = (
+            ("dialogue.places.dominion", ("dialogue", "places", "dominion")),
+            ("character.npc.dominion", ("character", "npc", "dominion")),
+            ("inventory.item", ("inventory", "item")),
+            ("character.effects", ("character", "effects")),
+        )
+        for idx in range(40 * self.scale):
+            package, parts = java_dirs[idx % len(java_dirs)]
+            class_name = f"Synthetic{idx}"
+            self.write(
+                src.joinpath(*parts, f"{class_name}.java"),
+                self.java_source(f"com.lilithsthrone.game.{package}", class_name),
+            )
+
+        return self.root
+
+
+def generate_corpus(root: Path, scale: int = 1, seed: int = 0) -> Path:
+    return SyntheticCorpus(root, scale, seed).generate()
+
+
+argparser = argparse.ArgumentParser()
+argparser.add_argument("output", type=str, help="directory to write the corpus to")
+argparser.add_argument("--scale", type=int, default=1, help="corpus size multiplier")
+argparser.add_argument("--seed", type=int, default=0, help="random seed")
+
+
+if __name__ == "__main__":
+    args = argparser.parse_args()
+    root = generate_corpus(Path(args.output), args.scale, args.seed)
+    logger.info("合成语料已生成：%s", root.as_posix())
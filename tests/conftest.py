@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# 各模块位于仓库根目录
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic_corpus import generate_corpus
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory) -> Path:
+    """
+    合成语料(res/src)，整个测试会话共用，测试不应修改其中的文件
+    """
+    return generate_corpus(tmp_path_factory.mktemp("corpus"), scale=1, seed=0)
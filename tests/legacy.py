@@ -0,0 +1,675 @@
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from lxml import etree
+
+from applier import Applier, valid_element
+from const import BLACKLIST_FILE, FUZZY_FIELD
+from data import CodeEntry, SingleDictionary, XmlEntry
+from extractor import JavaExtractor
+from java_lexer import JavaLine
+from update import translation_process
+from util import xml_node_replace_translation
+
+# 已被替换的旧实现，冻结在此作为测试与benchmark.py的对比基准，不应随现有代码修改
+
+LEGACY_STRING_LITERAL_REGEX = re.compile(r"\"[^\"]+\"(?!\")")
+
+
+def legacy_java_lines(text: str) -> List[JavaLine]:
+    """
+    旧的逐行正则处理(词法分析之前)：逐行移除注释，以正则判断字符串，以行末的分号判断语句结束
+    """
+    lines: List[JavaLine] = []
+    comment = False
+    for line in text.split("\n"):
+        line = line.strip()
+        # 处理多行注释
+        if re.search(r"^/\*", line) is not None:
+            if "*/" not in line:
+                comment = True
+            else:
+                line = line[: line.find("/*")]
+        elif comment and "*/" in line:
+            comment = False
+            line = line[: line.find("*/")]
+        elif comment:
+            line = ""
+        elif line.find(r"//") != -1:
+            # 移除单行注释
+            match = re.search(r"(?<!s:)//", line)
+            if match is not None:
+                line = line[: match.start()]
+        lines.append(
+            JavaLine(
+                line,
+                LEGACY_STRING_LITERAL_REGEX.search(line) is not None,
+                line.strip().endswith(";"),
+            )
+        )
+    return lines
+
+
+def legacy_extract_java(file: Path) -> SingleDictionary:
+    """
+    与Extractor.extract_java相同，但使用旧的逐行正则处理
+    """
+    if file.name in BLACKLIST_FILE:
+        return {}
+    java_extractor = JavaExtractor.for_file(file)
+    entry_dict: SingleDictionary = {}
+
+    with open(file, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    original_lines = text.split("\n")
+    for idx, java_line in enumerate(legacy_java_lines(text)):
+        line = java_line.code.strip()
+        if len(line) == 0:
+            continue
+        java_extractor.parse_triggers(line)
+        if java_extractor.general_string_parse(
+            line, java_line.has_string, java_line.ends_statement
+        ):
+            entry_json = CodeEntry(
+                file=file.as_posix(),
+                original=original_lines[idx].strip(),
+                translation="",
+                line=idx,
+                stage=0,
+            ).to_json()
+            entry_dict[entry_json["key"]] = entry_json
+    return entry_dict
+
+
+def legacy_split_htmlContent(text: str) -> List[str]:
+    """
+    旧的htmlContent拆分(预编译正则之前)：每次调用重新匹配所有正则，逐个文本块判断包含关系
+    """
+    TAG_REGEX = r"(?:div|p)"
+
+    PARAGRAPH_REGEX = r"(<p[^>]*?>.*?</p>)"
+    TITLE_REGEX = r"(<h[1-9][^>]*?>.*?</h[1-9]>)"
+    BOTH_START_P_REGEX = r"<p>\n[^<>]*?\n\s*<p>"
+    BOTH_END_P_REGEX = r"</p>\n[^<>]*?\n\s*</p>"
+    DIV_REGEX = r"(<div[^>]*?>.*?</div>)"
+    HALF_BLOCK_F_REGEX = rf"(<{TAG_REGEX}[^>]*?>[^<>]*?\Z)"
+    HALF_BLOCK_B_REGEX = rf"(\A[^<>]*?</{TAG_REGEX}>)"
+    VAR_REGEX = r"(#VAR.*?#ENDVAR)"
+    CUT_END_TAG_REGEX = rf"(#[A-Z]+[^<>]*?</{TAG_REGEX}>)"
+
+    extracted_blocks: List[str] = []
+    for regex in (
+        PARAGRAPH_REGEX,
+        TITLE_REGEX,
+        DIV_REGEX,
+        VAR_REGEX,
+        HALF_BLOCK_F_REGEX,
+        HALF_BLOCK_B_REGEX,
+    ):
+        extracted_blocks += re.findall(regex, text, re.DOTALL)
+    for regex in (CUT_END_TAG_REGEX, BOTH_START_P_REGEX, BOTH_END_P_REGEX):
+        # filter惰性求值，新加入的文本块同样参与之后的判断
+        extracted_blocks += filter(
+            lambda x: not any([x in block for block in extracted_blocks]),
+            re.findall(regex, text, re.DOTALL),
+        )
+
+    if len(extracted_blocks) == 0:
+        extracted_blocks.extend(text.split("<br/><br/>"))
+
+    if len(extracted_blocks) == 0:
+        extracted_blocks.append(text)
+
+    return extracted_blocks
+
+
+def legacy_apply_xml(applier: Applier, original_file: Path, dict_file: Path) -> None:
+    """
+    与Applier.apply_xml相同，但对每个标签或htmlContent属性单独遍历文档查找节点(建立索引之前)
+    """
+    json_dict: SingleDictionary = applier.new_data[
+        dict_file.relative_to(applier.dict_dir).as_posix()
+    ]
+    parser = etree.XMLParser(strip_cdata=False)
+    tree: etree._Element = etree.parse(str(original_file), parser)
+
+    entry_dict: Dict[str, List[XmlEntry]] = {}
+    for entry in json_dict.values():
+        if FUZZY_FIELD in entry:
+            continue
+        entry = XmlEntry.from_json(original_file, entry)
+        entry_dict.setdefault(entry.node_tag, []).append(entry)
+
+    for tag, entry_cluster in entry_dict.items():
+        if tag == "htmlContent":
+            attribute_dict: Dict[str, List[XmlEntry]] = {}
+            for entry in entry_cluster:
+                attribute_dict.setdefault(entry.attribute, []).append(entry)
+            for attribute, entries in attribute_dict.items():
+                for node in tree.xpath(f"//htmlContent[@tag='{attribute}']"):
+                    applier.replace_htmlContent(original_file, attribute, node, entries)
+        else:
+            nodes = list(filter(valid_element, tree.iter(tag)))
+            for entry in entry_cluster:
+                xml_node_replace_translation(nodes[entry.node_idx], entry)
+
+    original_file.write_bytes(
+        etree.tostring(
+            tree,
+            encoding="UTF-8",
+            xml_declaration=True,
+            pretty_print=True,
+            standalone=False,
+        )
+    )
+
+
+def legacy_update_data(
+    old_dict_data: SingleDictionary,
+    new_dict_data: SingleDictionary,
+    version: str = "",
+) -> Tuple[SingleDictionary, SingleDictionary]:
+    """
+    旧的就地合并(Updater.update_data改为纯函数之前)：直接修改传入的旧字典与新旧词条
+    调用方需预先深拷贝旧字典，仅用于对比
+    """
+    new_dict_map: Dict[str, List[str]] = {}  # [原文文本, new_dict_data词典中对应的key]
+    old_dict_map: Dict[str, List[str]] = {}  # [原文文本, old_dict_data词典中对应的key]
+
+    new_dict_data = dict(sorted(new_dict_data.items(), key=lambda x: x[1]["key"]))
+    old_dict_data = dict(sorted(old_dict_data.items(), key=lambda x: x[1]["key"]))
+
+    for key, data in new_dict_data.items():
+        new_dict_map.setdefault(data["original"].strip(), []).append(key)
+
+    for key, data in old_dict_data.items():
+        if data["stage"] == 0:
+            old_dict_data[key] = None
+            continue
+        original = data["original"]
+        # 是否为xml文件
+        if not data["key"][0].isdigit():
+            original = original.replace("\\n", "\n")
+        old_dict_map.setdefault(original.strip(), []).append(key)
+
+    for ori, keys in old_dict_map.items():
+        new_idx_list = new_dict_map.get(ori)
+        if version != "":
+            for idx, old_key in enumerate(keys):
+                if (
+                    old_dict_data[old_key]["original"]
+                    == old_dict_data[old_key]["translation"]
+                ):
+                    continue
+                if new_idx_list is None or idx >= len(new_idx_list):
+                    new_dict_data[old_key] = old_dict_data[old_key]
+                    new_dict_data[old_key]["key"] = f"{old_key}_{version}"
+                    new_dict_data[old_key]["stage"] = 9
+                    continue
+                entry = new_dict_data[new_idx_list[idx]]
+                entry["translation"] = old_dict_data[old_key]["translation"].strip()
+                entry["stage"] = 9
+                if "." in entry["key"].split("_")[-1]:
+                    entry["key"] = "_".join(
+                        entry["key"].split("_")[:-1] + [f"_{version}"]
+                    )
+                else:
+                    entry["key"] += f"_{version}"
+        else:
+            if new_idx_list is None:
+                continue
+            for idx, old_key in enumerate(keys[: min(len(keys), len(new_idx_list))]):
+                entry = new_dict_data[new_idx_list[idx]]
+                entry["translation"] = translation_process(
+                    old_dict_data[old_key]["translation"], old_dict_data[old_key]["key"]
+                )
+                entry["stage"] = old_dict_data[old_key]["stage"]
+                old_dict_data[old_key] = None
+
+    for key in [key for key, value in old_dict_data.items() if value is None]:
+        old_dict_data.pop(key)
+
+    return old_dict_data, new_dict_data
+
+
+# 旧的触发判断(触发规则表之前)使用的正则片段
+SB_REGEX = r"([sS][bB]|StringBuilder)(\(\))?"
+ADJ_REGEX = r"[a|A]djectives?"
+TEXT_REGEX = r"[t|T]exts?"
+NAME_REGEX = r"[n|N]ames?"
+TITLE_REGEX = r"[t|T]itles?"
+DESC_REGEX = r"[d|D]esc(ription|riptor)?s?"
+DETER_REGEX = r"[d|D]eterminers?"
+STRING_REGEX = r"[s|S]trings?"
+PREFIX_REGEX = r"[p|P]refixe?s?"
+SUFFIX_REGEX = r"[s|S]uffixe?s?"
+EFFECT_REGEX = r"[e|E]ff(ect)?s?"
+MOD_REGEX = r"[m|M]od(ifier)?s?"
+
+ASSIGN_REGEX = r"\s*\+?=\s*"
+ADD_REGEX = r"(List)?.add"
+
+
+class LegacyJavaExtractor:
+    """
+    旧的逐行触发判断：各目录的parse_*方法以elif依次尝试关键字与正则
+    """
+
+    def __init__(self):
+        self.interest_line: bool = False
+
+    def parse_normal(self, line: str):
+        if self.interest_line:
+            return
+
+        if "return" in line:
+            self.interest_line = True
+        elif (
+            re.search(
+                rf"({SB_REGEX}|{DESC_REGEX}|{TEXT_REGEX}|{STRING_REGEX}|[o|O]utput)\.append",
+                line,
+            )
+            is not None
+        ):
+            self.interest_line = True
+        elif "new Response" in line:
+            self.interest_line = True
+        elif ".setInformation" in line:
+            self.interest_line = True
+        elif (
+            re.search(
+                rf"({SB_REGEX}|{ADJ_REGEX}|{TEXT_REGEX}|{NAME_REGEX}|{TITLE_REGEX}|{DESC_REGEX}|returnValue|{PREFIX_REGEX}|{SUFFIX_REGEX}|{STRING_REGEX}|{DETER_REGEX}|[o|O]utput){ASSIGN_REGEX}",
+                line,
+            )
+            is not None
+        ):
+            self.interest_line = True
+        elif (
+            re.search(
+                rf"({ADJ_REGEX}|{TEXT_REGEX}|{NAME_REGEX}(Plural)?|{TITLE_REGEX}|{DESC_REGEX}|{EFFECT_REGEX}|{MOD_REGEX}){ADD_REGEX}",
+                line,
+            )
+            is not None
+        ):
+            self.interest_line = True
+        elif "list.add" in line or "list2.add" in line:
+            self.interest_line = True
+        elif "Names.contains" in line:
+            self.interest_line = True
+        # elif "System.err.println" in line:
+        #     self.interest_line = True
+        elif "new Value<>" in line:
+            self.interest_line = True
+        elif "public enum" in line:  # 枚举项
+            self.interest_line = True
+        elif re.search(r"^\s*[A-Z_0-9]+\(", line) is not None:  # 枚举项
+            self.interest_line = True
+        elif "new String[]" in line or "static String[]" in line:
+            self.interest_line = True
+        elif "super(" in line or "this(" in line:
+            self.interest_line = True
+        elif "new TattooWriting" in line:
+            self.interest_line = True
+        elif "setName" in line or "setSurname" in line or "setGenericName" in line:
+            self.interest_line = True
+        elif "setDescription" in line:
+            self.interest_line = True
+        elif "new NameTriplet" in line:
+            self.interest_line = True
+        elif (
+            "UtilText.parse" in line
+            or "Util.capitaliseSentence" in line
+            or "UtilText.returnStringAtRandom" in line
+            or "Util.randomItemFromValues" in line
+        ):
+            self.interest_line = True
+        elif "new EventLogEntry" in line:
+            self.interest_line = True
+        elif "new DialogueNode" in line:
+            self.interest_line = True
+        elif ".flashMessage" in line:
+            self.interest_line = True
+        elif ".addSpecialParsingString" in line:
+            self.interest_line = True
+        elif "spawnDomGloryHoleNPC" in line or "spawnSubGloryHoleNPC" in line:
+            self.interest_line = True
+        elif "getTooltipText" in line:
+            self.interest_line = True
+        elif "appendToTextEndStringBuilder" in line:
+            self.interest_line = True
+        elif line.strip().startswith('"'):
+            self.interest_line = True
+
+    def parse_tooltips(self, line: str):
+        if "tooltipSB.append" in line:
+            self.interest_line = True
+
+        elif ".setTooltipContent" in line:
+            self.interest_line = True
+
+    def parse_controller(self, line: str):
+        if "tooltipDescriptionSB.append" in line:
+            self.interest_line = True
+        elif "getTextStartStringBuilder()" in line:
+            self.interest_line = True
+        elif "verb = " in line:
+            self.interest_line = True
+
+    def parse_attributes(self, line: str):
+        if "new AbstractAttribute" in line:
+            self.interest_line = True
+
+    def parse_body(self, line: str):
+        if "new BodyCoveringTemplate" in line:
+            self.interest_line = True
+        elif "new AbstractBodyCoveringType" in line:
+            self.interest_line = True
+        elif re.search(r"new Abstract\w+Type", line) is not None:
+            self.interest_line = True
+        elif "faceBodyDescriptionFeral = " in line:
+            self.interest_line = True
+        elif "stage = " in line or "areaEgged = " in line:
+            self.interest_line = True
+        elif "extraEffectsLsit.add" in line:
+            self.interest_line = True
+
+    def parse_effects(self, filename: str, line: str):
+        if filename == "AbstractStatusEffect.java":
+            if "stringBuilderToAppendTo.append" in line:
+                self.interest_line = True
+        elif filename == "StatusEffect.java":
+            if "from1 = " in line or "from2 = " in line:
+                self.interest_line = True
+            elif "orificesRecovering.add" in line:
+                self.interest_line = True
+        if "new AbstractPerk" in line:
+            self.interest_line = True
+        elif "new AbstractStatusEffect" in line:
+            self.interest_line = True
+
+    def parse_fetishs(self, line: str):
+        if "new AbstractFetish" in line:
+            self.interest_line = True
+        elif "perkRequirementsList.add" in line:
+            self.interest_line = True
+
+    def parse_npc(self, filename: str, line: str):
+        if filename == "NPCOffspring.java":
+            if "result = " in line:
+                self.interest_line = True
+        if "new PossibleItemEffect" in line:
+            self.interest_line = True
+        elif "FlavorText" in line:
+            self.interest_line = True
+        elif "getSurname().endsWith" in line:
+            self.interest_line = True
+        elif "speech.add" in line:
+            self.interest_line = True
+
+    def parse_race(self, line: str):
+        if "new AbstractRace" in line:
+            self.interest_line = True
+        elif "new AbstractSubspecies" in line:
+            self.interest_line = True
+        elif "Modified.add" in line:
+            self.interest_line = True
+        elif "names.put" in line:
+            self.interest_line = True
+
+    def parse_character(self, filename: str, line: str):
+        if filename == "StatusEffect.java":
+            if "tooDeep.add" in line or "stretching.add" in line:
+                self.interest_line = True
+        elif filename == "GameCharacter.java":
+            if "target = " in line:
+                self.interest_line = True
+            elif "additional = " in line:
+                self.interest_line = True
+        elif filename == "Litter.java":
+            if "entries.add" in line:
+                self.interest_line = True
+        elif filename == "Heather.java":
+            if "ingredientMap.put" in line:
+                self.interest_line = True
+        elif filename == "Angelixx.java":
+            if "adjectivesUsed =" in line:
+                self.interest_line = True
+        if re.search(r"writing\s*=\s*", line) is not None:
+            self.interest_line = True
+        elif "new GenderAppearance" in line:
+            self.interest_line = True
+        elif "_CALCULATION = " in line:
+            self.interest_line = True
+        elif "newArrayListOfValues" in line:
+            self.interest_line = True
+
+    def parse_moves(self, line: str):
+        if "new AbstractCombatMove" in line:
+            self.interest_line = True
+        elif "formatAttackOutcome" in line:
+            self.interest_line = True
+        elif "reason = " in line:
+            self.interest_line = True
+
+    def parse_dialogue(self, filename: str, line: str):
+        if filename == "PrologueDialogue.java":
+            if "demonstoneImages = " in line or "demonstoneEnergy = " in line:
+                self.interest_line = True
+        elif filename == "PhoneDialogue.java":
+            if "clothingSlotCategories.put" in line:
+                self.interest_line = True
+        elif filename == "ClothingEmporium.java":
+            if "descriptionStart = " in line:
+                self.interest_line = True
+        elif filename == "SuccubisSecrets.java":
+            if "entry.getValue().getValue().add" in line:
+                self.interest_line = True
+        elif filename == "RoomPlayer.java":
+            if ".add" in line:
+                self.interest_line = True
+        elif filename == "SlaveAuctionBidder.java":
+            if "Comments = " in line:
+                self.interest_line = True
+        elif filename == "SlaverAlleyDialogue.java":
+            if "Availability.add" in line:
+                self.interest_line = True
+        elif filename == "EnforcerWarehouse.java":
+            if "dangerousDirections.add" in line:
+                self.interest_line = True
+        elif filename == "OptionsDialogue.java":
+            if "disabledMsg = " in line:
+                self.interest_line = True
+        elif filename == "KaysWarehouse.java":
+            if "KaySexResponse(" in line:
+                self.interest_line = True
+        elif filename == "UtilText.java":
+            if "new ParserCommand" in line:
+                self.interest_line = True
+            elif "input = " in line:
+                self.interest_line = True
+        elif filename == "SlaveDialogue.java":
+            if "legsSpreading = " in line:
+                self.interest_line = True
+        elif filename == "DominionExpress.java":
+            if "new MuleReward" in line:
+                self.interest_line = True
+
+        if "purchaseAvailability.append" in line:
+            self.interest_line = True
+        elif re.search(r"(Cry|Reaction|Speech)\s*=\s*", line) is not None:
+            self.interest_line = True
+        elif "new AbstractParserTarget" in line:
+            self.interest_line = True
+        elif "OffspringHeaderDisplay" in line:
+            self.interest_line = True
+        elif "map.put" in line:
+            self.interest_line = True
+        elif "responses.add" in line:
+            self.interest_line = True
+        elif "failEffects" in line:
+            self.interest_line = True
+
+    def parse_clothing(self, line: str):
+        if "new AbstractClothingType" in line:
+            self.interest_line = True
+
+    def parse_enchanting(self, line: str):
+        if "new AbstractItemEffectType" in line:
+            self.interest_line = True
+        elif "area = " in line:
+            self.interest_line = True
+        elif "descriptionToReturn = " in line:
+            self.interest_line = True
+
+    def parse_item(self, line: str):
+        if "new AbstractItemType" in line:
+            self.interest_line = True
+        elif "Util.newArrayListOfValues" in line:
+            self.interest_line = True
+        elif "parsed.add" in line:
+            self.interest_line = True
+        elif "new AbstractStatusEffect" in line:
+            self.interest_line = True
+
+    def parse_positions(self, line: str):
+        if "new AbstractSexPosition" in line:
+            self.interest_line = True
+        elif "new SexSlot" in line:
+            self.interest_line = True
+
+    def parse_sex(self, filename: str, line: str):
+        if filename == "SadisticActions.java":
+            if "tailSpecial1 = " in line or "tailSpecial2 = " in line:
+                self.interest_line = True
+        elif filename == "PenisAnus.java":
+            if "assTargeting = " in line:
+                self.interest_line = True
+        elif filename == "GenericOrgasms.java":
+            if "breasts = " in line:
+                self.interest_line = True
+            elif "areas.add" in line:
+                self.interest_line = True
+
+    def parse_main(self, line: str):
+        if re.search(r"disclaimer\s*=\s*", line) is not None:
+            self.interest_line = True
+
+    def parse_rendering(self, line: str):
+        if "equippedPanelSB.append" in line:
+            self.interest_line = True
+        elif "panelSB.append" in line:
+            self.interest_line = True
+
+    def parse_colours(self, line: str):
+        if "new Colour" in line:
+            self.interest_line = True
+
+    def parse_places(self, filename: str, line: str):
+        if "new AbstractPlaceType" in line:
+            self.interest_line = True
+        elif "new AbstractPlaceUpgrade" in line:
+            self.interest_line = True
+        elif "new AbstractGlobalPlaceType" in line:
+            self.interest_line = True
+
+    def parse_population(self, line: str):
+        if "new AbstractPopulationType" in line:
+            self.interest_line = True
+
+    def parse_world(self, line: str):
+        if "new AbstractWorldType" in line:
+            self.interest_line = True
+
+    def parse_game(self, filename: str, line: str):
+        if filename == "Game.java":
+            if "corruptionGains = " in line:
+                self.interest_line = True
+        elif filename == "Combat.java":
+            if "Content.put" in line or "Content.get" in line:
+                self.interest_line = True
+            elif "critText.append" in line:
+                self.interest_line = True
+        elif filename == "Spell.java":
+            if "cost = " in line:
+                self.interest_line = True
+
+
+def legacy_parse_triggers(file: Path, line: str) -> bool:
+    """
+    按旧的目录判断调用对应的parse_*方法及通用规则，返回该行是否为需要提取的语句的开始
+    """
+    java_extractor = LegacyJavaExtractor()
+    # controller\eventListeners\tooltips
+    if file.parent.name == "tooltips":
+        java_extractor.parse_tooltips(line)
+    # game\character\attributes
+    elif file.parent.name == "attributes":
+        java_extractor.parse_attributes(line)
+    # game\character\body
+    elif file.parent.name == "body" or file.parent.parent.name == "body":
+        java_extractor.parse_body(line)
+    # game\character\effects
+    elif file.parent.name == "effects":
+        java_extractor.parse_effects(file.name, line)
+    # game\character\fetishes
+    elif file.parent.name == "fetishes":
+        java_extractor.parse_fetishs(line)
+    # game\character\npc
+    elif "npc" in file.parent.as_posix():
+        java_extractor.parse_npc(file.name, line)
+    # game\character\race
+    elif file.parent.name == "race":
+        java_extractor.parse_race(line)
+    # game\combat\moves
+    elif file.parent.name == "moves":
+        java_extractor.parse_moves(line)
+    # game\iventory\clothing
+    elif file.parent.name == "clothing":
+        java_extractor.parse_clothing(line)
+    # game\iventory\enchanting
+    elif file.parent.name == "enchanting":
+        java_extractor.parse_enchanting(line)
+    # game\iventory\item
+    elif file.parent.name == "item":
+        java_extractor.parse_item(line)
+    # main
+    elif file.parent.name == "main":
+        java_extractor.parse_main(line)
+    # rendering
+    elif file.parent.name == "rendering":
+        java_extractor.parse_rendering(line)
+    # utils\colours
+    elif file.parent.name == "colours":
+        java_extractor.parse_colours(line)
+    # world\population
+    elif file.parent.name == "population":
+        java_extractor.parse_population(line)
+    # world no sub
+    elif file.parent.name == "world":
+        java_extractor.parse_world(line)
+    # rest in controller\
+    elif "controller" in file.parent.as_posix():
+        java_extractor.parse_controller(line)
+    # game\sex\positions
+    elif "positions" in file.parent.as_posix():
+        java_extractor.parse_positions(line)
+    # rest in game\sex\
+    elif "sex" in file.parent.as_posix():
+        java_extractor.parse_sex(file.name, line)
+    # rest in game\character\
+    elif "character" in file.parent.as_posix():
+        java_extractor.parse_character(file.name, line)
+    # rest in game\dialogue\
+    elif "dialogue" in file.parent.as_posix():
+        java_extractor.parse_dialogue(file.name, line)
+    # rest in game\
+    elif "game" in file.parent.as_posix():
+        java_extractor.parse_game(file.name, line)
+    # rest in world\places
+    elif "places" in file.parent.as_posix():
+        java_extractor.parse_places(file.name, line)
+
+    java_extractor.parse_normal(line)
+    return java_extractor.interest_line
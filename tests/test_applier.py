@@ -0,0 +1,124 @@
+import json
+import random
+import shutil
+from pathlib import Path
+
+from applier import Applier
+from apply_state import ApplyState
+from const import FUZZY_FIELD
+from data import json_default
+from extractor import Extractor
+from tests.legacy import legacy_apply_xml
+
+
+def test_apply_xml_matches_legacy(corpus: Path, tmp_path: Path) -> None:
+    """
+    使用索引应用字典，结果与逐个标签及htmlContent属性查找节点时逐字节相同
+    """
+    files = sorted(corpus.glob("res/**/*.xml"))
+    assert len(files) > 0
+
+    rnd = random.Random(0)
+    new_data = {}
+    for file in files:
+        entry_dict = Extractor.extract_xml(file)
+        for entry in entry_dict.values():
+            entry["translation"] = "译" + entry["original"]
+            entry["stage"] = rnd.choice([0, 1, 1, 1, 2])
+            if rnd.random() < 0.1:
+                entry[FUZZY_FIELD] = 0.9
+        new_data[file.relative_to(corpus).with_suffix(".json").as_posix()] = entry_dict
+
+    dict_dir = tmp_path / "dict"
+    applier = Applier("main", tmp_path, dict_dir, new_data)
+    changed = 0
+    for file in files:
+        relative = file.relative_to(corpus)
+        dict_file = dict_dir / relative.with_suffix(".json")
+        results = []
+        for name, apply in (
+            ("legacy", lambda target: legacy_apply_xml(applier, target, dict_file)),
+            ("index", lambda target: applier.apply_xml(target, dict_file)),
+        ):
+            target = tmp_path / name / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file, target)
+            apply(target)
+            results.append(target.read_bytes())
+        assert results[0] == results[1], relative.as_posix()
+        changed += results[1] != file.read_bytes()
+    assert changed > 0
+
+
+def test_apply_xml_skips_fuzzy_entries(tmp_path: Path) -> None:
+    """
+    阶段2(有疑问)的翻译照常应用，只有模糊匹配沿用的翻译被跳过
+    """
+    target = tmp_path / "res" / "a.xml"
+    target.parent.mkdir(parents=True)
+    target.write_text(
+        "<root><name><![CDATA[Rose]]></name><name><![CDATA[Lily]]></name></root>",
+        encoding="utf-8",
+    )
+    entries = [
+        {"key": "name_text_0", "original": "Rose", "translation": "罗丝", "stage": 2},
+        {"key": "name_text_1", "original": "Lily", "translation": "莉莉", "stage": 1},
+    ]
+    entries[1][FUZZY_FIELD] = 0.85
+    dict_dir = tmp_path / "dict"
+    new_data = {"res/a.json": {entry["key"]: entry for entry in entries}}
+    applier = Applier("main", tmp_path, dict_dir, new_data)
+    applier.apply_xml(target, dict_dir / "res" / "a.json")
+
+    text = target.read_text(encoding="utf-8")
+    assert "罗丝" in text
+    assert "Lily" in text and "莉莉" not in text
+
+
+def test_incremental_apply_restores_files_without_dictionary(
+    corpus: Path, tmp_path: Path
+) -> None:
+    """
+    增量应用时，对应字典被删除的文件在下次应用后恢复为原始内容，并移出清单
+    """
+    root = tmp_path / "game"
+    shutil.copytree(corpus / "res", root / "res")
+    dict_dir = tmp_path / "dict"
+    new_data = {}
+    for file in sorted(root.glob("res/**/*.xml")):
+        entry_dict = Extractor.extract_xml(file)
+        for entry in entry_dict.values():
+            entry["translation"] = "译" + entry["original"]
+            entry["stage"] = 1
+        path = file.relative_to(root).with_suffix(".json")
+        dict_dir.joinpath(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(dict_dir / path, "w", encoding="utf-8") as f:
+            json.dump(list(entry_dict.values()), f, default=json_default)
+        new_data[path.as_posix()] = entry_dict
+    originals = {file: file.read_bytes() for file in root.glob("res/**/*.xml")}
+    state_dir = tmp_path / "apply_state"
+
+    def apply() -> ApplyState:
+        apply_state = ApplyState(state_dir, root, version="test")
+        Applier("mod", root, dict_dir, new_data, apply_state=apply_state).apply()
+        return apply_state
+
+    apply()
+    applied = {file: file.read_bytes() for file in originals}
+    changed = [file for file in originals if applied[file] != originals[file]]
+    assert len(changed) > 1
+    removed, kept = changed[0], changed[1]
+    path = removed.relative_to(root).with_suffix(".json")
+    dict_dir.joinpath(path).unlink()
+    del new_data[path.as_posix()]
+
+    apply_state = apply()
+    assert removed.read_bytes() == originals[removed]
+    assert kept.read_bytes() == applied[kept]
+    assert removed.relative_to(root).as_posix() not in apply_state.files
+    assert apply_state.dropped == 1
+
+    # 恢复后的文件不再记录，之后的运行保持原始内容
+    apply_state = apply()
+    assert removed.read_bytes() == originals[removed]
+    assert apply_state.dropped == 0
@@ -0,0 +1,296 @@
+import inspect
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import zlib
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from diagnostics import Diagnostics
+from extractor import Extractor, JavaExtractor
+from java_lexer import JavaLine, lex_lines
+from peak_memory import reset_peak_rss
+from tests.legacy import (
+    LegacyJavaExtractor,
+    legacy_extract_java,
+    legacy_parse_triggers,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 游戏源码中的典型行
+GAME_LINES = [
+    'sb.append("<p>"',
+    'StringBuilder sb = new StringBuilder();',
+    'descriptionSB.append(UtilText.parse(character, "[npc.Name] smiles."));',
+    'UtilText.nodeContentSB.append("You step into the alley.");',
+    'return UtilText.parse(owner, "[npc.Name] is sleeping.");',
+    'public static AbstractPerk ARCANE_BOOST = new AbstractPerk(20,',
+    'public static final AbstractStatusEffect WELL_RESTED = new AbstractStatusEffect(80,',
+    'HUMAN("human", "humans", "man", "woman", "men", "women"),',
+    'public enum Subspecies {',
+    'name = "Lilaya";',
+    'nameText += " (feral)";',
+    'descriptions.add("A small, pink potion.");',
+    'namesPlural.add("wolf-girls");',
+    'list.add(new Value<>("Rose", 1));',
+    'new Response("Leave", "Turn around and head back outside.", PLACE_EXIT) {',
+    'Main.game.flashMessage(PresetColour.GENERIC_GOOD, "Saved!");',
+    'setName(new NameTriplet("Vicky"));',
+    'super(true, "Nyan", "A shy cat-girl.",',
+    'this(null, "", "", "");',
+    '"[npc.She] grins at you.",',
+    '+ " and then she leaves."',
+    'tooltipSB.append("<div class=\'title\'>Arcane</div>");',
+    'stringBuilderToAppendTo.append("[style.boldBad(Warning)]");',
+    'from1 = " from your pussy";',
+    'critText.append("Critical hit!");',
+    'Content.put("key", "value");',
+    'cost = 10;',
+    'corruptionGains = "You feel corrupted.";',
+    'if (character.isPlayer()) {',
+    '} else {',
+    'int count = 0;',
+    'getTooltipText(character, true);',
+    'returnValue = "[pc.Name]";',
+    'private static String getDescription() {',
+    'verb = "kiss";',
+    'new AbstractWorldType(WorldRegion.DOMINION, "Dominion",',
+    'new AbstractClothingType(ClothingType.TORSO_SHIRT,',
+    'areaEgged = "womb";',
+    'orificesRecovering.add("mouth");',
+]
+
+# 用于组合合成行的片段
+FRAGMENTS = [
+    "sb", "SB", "StringBuilder()", "desc", "Description", "descriptor", "texts",
+    "Name", "namesPlural", "title", "Strings", "prefix", "Suffixes", "effs",
+    "Modifiers", "determiner", "output", "Output", "returnValue", "adjective",
+    ".append(", "=", " = ", " += ", "+=", "add(", "List.add(", "Xadd", ".add",
+    "return", "new Response", ".setInformation", "list.add", "list2.add",
+    "Names.contains", "new Value<>", "public enum", "FOO_BAR(", "A(", "new String[]",
+    "static String[]", "super(", "this(", "new TattooWriting", "setName",
+    "setSurname", "UtilText.parse", "Util.capitaliseSentence", "new EventLogEntry",
+    "new DialogueNode", ".flashMessage", "getTooltipText", '"', '"text"', " ", "  ",
+    "\t", "(", ")", ";", ",", "{", "}", "new AbstractPerk", "new AbstractBodyType",
+    "new AbstractLegType", "tooltipSB.append", "verb = ", "stage = ", "cost = ",
+    "Content.put", "critText.append", "from1 = ", "Main.game", "x", "_", "9", "[npc.Name]",
+]
+
+
+def synthetic_lines(count: int, seed: int) -> List[str]:
+    rnd = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        line = "".join(rnd.choice(FRAGMENTS) for _ in range(rnd.randint(1, 6)))
+        if rnd.random() < 0.3:
+            line = line.strip()
+        lines.append(line)
+    return lines
+
+
+def java_lines(root: Path) -> List[str]:
+    lines = []
+    for file in sorted(root.glob("**/*.java")):
+        lines += [line.strip() for line in file.read_text(encoding="utf-8").split("\n")]
+    return lines
+
+
+# 旧的目录判断中各分支对应的典型目录(相对src/com/lilithsthrone)，最后一个不属于任何分支
+JAVA_DIRECTORIES = [
+    "controller/eventListeners/tooltips",
+    "game/character/attributes",
+    "game/character/body",
+    "game/character/body/types",
+    "game/character/effects",
+    "game/character/fetishes",
+    "game/character/npc/dominion",
+    "game/character/race",
+    "game/combat/moves",
+    "game/inventory/clothing",
+    "game/inventory/enchanting",
+    "game/inventory/item",
+    "main",
+    "rendering",
+    "utils/colours",
+    "world/population",
+    "world",
+    "controller",
+    "game/sex/positions",
+    "game/sex/sexActions/baseActions",
+    "game/character/quests",
+    "game/dialogue/places/dominion",
+    "game/combat",
+    "world/places",
+    "utils",
+]
+
+LEGACY_SOURCE = inspect.getsource(LegacyJavaExtractor)
+# 旧的parse_*方法中按文件名限定的规则
+LEGACY_FILENAMES = sorted(set(re.findall(r'filename == "(\w+\.java)"', LEGACY_SOURCE)))
+# 旧的parse_*方法中的全部关键字，各自组成含字符串的语句
+KEYWORD_LINES = [
+    f'{keyword}("text");'
+    for keyword in sorted(set(re.findall(r'"([^"]+)" in line', LEGACY_SOURCE)))
+]
+
+
+@pytest.mark.parametrize("directory", JAVA_DIRECTORIES)
+def test_triggers_match_legacy_parse_cascade(corpus: Path, directory: str) -> None:
+    """
+    触发规则表与旧的parse_*逐个判断(按目录及文件名选择)对每行的结果相同
+    """
+    parent = Path("src/com/lilithsthrone") / directory
+    seed = zlib.crc32(directory.encode())
+    # 按文件名限定的规则只需检查关键字所在的行
+    common_lines = GAME_LINES + KEYWORD_LINES
+    other_lines = sorted(
+        set(
+            common_lines
+            + java_lines(ROOT / "replace_file")
+            + java_lines(corpus)
+            + synthetic_lines(2000, seed=seed)
+        )
+    )
+
+    hits = 0
+    for filename in ["Other.java"] + LEGACY_FILENAMES:
+        file = parent / filename
+        lines = other_lines if filename == "Other.java" else common_lines
+        for line in lines:
+            expected = legacy_parse_triggers(file, line)
+            java_extractor = JavaExtractor.for_file(file)
+            java_extractor.parse_triggers(line)
+            assert java_extractor.interest_line == expected, (file.as_posix(), line)
+            hits += expected
+    # 两种结果均应出现
+    assert 0 < hits < len(other_lines) + len(common_lines) * len(LEGACY_FILENAMES)
+
+
+def test_lexer_keeps_strings_and_lines() -> None:
+    text = "\n".join(
+        [
+            'sb.append("http://example.com"); // comment',
+            "char c = '\"'; /* a",
+            "b */ x = 1;",
+            'list.add("");',
+            'String s = "a\\"b;" + y',
+        ]
+    )
+    assert lex_lines(text) == [
+        JavaLine('sb.append("http://example.com"); ', True, True),
+        JavaLine("char c = '\"'; ", False, True),
+        JavaLine(" x = 1;", False, True),
+        JavaLine('list.add("");', False, True),
+        JavaLine('String s = "a\\"b;" + y', True, False),
+    ]
+
+
+def test_lexer_text_block() -> None:
+    text = "\n".join(
+        [
+            'sb.append("""',
+            "    <p>Hello; // not a comment</p>",
+            "",
+            '    """);',
+            "x = 1;",
+        ]
+    )
+    assert lex_lines(text) == [
+        JavaLine('sb.append("""', False, False),
+        JavaLine("    <p>Hello; // not a comment</p>", True, False),
+        JavaLine("", False, False),
+        JavaLine('    """);', False, True),
+        JavaLine("x = 1;", False, True),
+    ]
+
+
+def test_extract_java_text_block(tmp_path: Path) -> None:
+    file = tmp_path / "Text.java"
+    file.write_text(
+        "\n".join(
+            [
+                "UtilText.nodeContentSB.append(",
+                '    """',
+                "    <p>You step into the alley; it is dark.</p>",
+                '    """);',
+                'String id = "not extracted";',
+            ]
+        ),
+        encoding="utf-8",
+    )
+    entries = Extractor.extract_java(file)
+    assert [entry["original"] for entry in entries.values()] == [
+        "<p>You step into the alley; it is dark.</p>"
+    ]
+
+
+def test_extract_java_matches_legacy(corpus: Path) -> None:
+    """
+    不含文本块与跨行注释等情况的源码，提取结果与旧的逐行正则处理相同
+    """
+    files = sorted(corpus.glob("src/**/*.java"))
+    assert len(files) > 0
+    for file in files:
+        assert Extractor.extract_java(file) == legacy_extract_java(file), file
+
+
+def test_stream_xml_reports_peak_memory(corpus: Path, tmp_path: Path) -> None:
+    """
+    流式解析的提取结果与整体解析相同，每个xml文件的内存峰值按从高到低记入诊断
+    """
+    if reset_peak_rss() is None:
+        pytest.skip("当前平台不支持统计内存峰值")
+    results = {}
+    for stream_xml in (False, True):
+        report_file = tmp_path / f"diagnostics_{stream_xml}.jsonl"
+        with Diagnostics(report_file):
+            extractor = Extractor(
+                "main",
+                corpus,
+                tmp_path / f"dict_{stream_xml}",
+                "",
+                stream_xml=stream_xml,
+            )
+            extractor.extract_res()
+        results[stream_xml] = extractor.new_data
+        records = [
+            json.loads(line) for line in report_file.read_text("utf-8").splitlines()
+        ]
+        peaks = [record for record in records if record["kind"] == "xml_peak_memory"]
+        if not stream_xml:
+            assert peaks == []
+            continue
+        assert len(peaks) == len(list(corpus.glob("res/**/*.xml")))
+        values = [
+            int(re.search(r"(\d+)KB", peak["message"]).group(1)) for peak in peaks
+        ]
+        assert values == sorted(values, reverse=True)
+    assert results[True] == results[False]
+
+
+def test_extractor_rules_version_is_stable_across_processes() -> None:
+    """
+    提取规则版本不受字符串哈希随机化影响，否则每次运行缓存都会失效
+    """
+    versions = {
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from extractor import extractor_rules_version; print(extractor_rules_version())",
+            ],
+            cwd=ROOT,
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert len(versions) == 1
@@ -0,0 +1,300 @@
+import copy
+import json
+import random
+import shutil
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from const import OUTDATE_DIR_NAME, PREVIOUS_GAME_VERSION
+from data import WholeDictionary, json_default, load_entries
+from extractor import Extractor
+from outdated_store import OutdatedStore
+from tests.legacy import legacy_update_data
+from update import Updater
+
+
+def extract(corpus: Path, target_dir: Path) -> WholeDictionary:
+    extractor = Extractor("main", corpus, target_dir, "")
+    extractor.extract()
+    return extractor.new_data
+
+
+def write_old_dict(old_dict_dir: Path, new_data: WholeDictionary) -> None:
+    """
+    由提取结果生成旧字典：随机翻译、改动原文、删除部分词条，另有已删除的文件及原有的过时词条
+    """
+    rnd = random.Random(0)
+    for path, new_dict_data in sorted(new_data.items()):
+        entries: List[Dict] = []
+        for entry in new_dict_data.values():
+            entry = dict(entry)
+            r = rnd.random()
+            if r < 0.1:
+                continue
+            if r < 0.2:
+                entry["original"] += " changed"
+            if rnd.random() < 0.7:
+                entry["translation"] = "译" + entry["original"][:20]
+                entry["stage"] = rnd.choice([1, 2, 3, 5])
+            else:
+                entry["stage"] = 0
+            if rnd.random() < 0.05:
+                entry["translation"] = entry["original"]
+            entries.append(entry)
+        file = old_dict_dir / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+
+    removed = [{"key": "name_text_0", "original": "Gone", "translation": "没了", "stage": 1}]
+    (old_dict_dir / "res" / "removed.json").write_text(
+        json.dumps(removed, ensure_ascii=False), encoding="utf-8"
+    )
+
+    # 原有的过时词条：与本次遗失的词条同名(版本号不同)及已删除文件
+    outdated_dir = old_dict_dir / OUTDATE_DIR_NAME
+    for path in sorted(new_data)[:20]:
+        entries = [
+            {
+                "key": f"{entry['key']}_0.4.8",
+                "original": entry["original"] + " changed",
+                "translation": "旧译",
+                "stage": 9,
+            }
+            for entry in list(new_data[path].values())[:3]
+        ]
+        file = outdated_dir / path
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+    (outdated_dir / "res" / "removed.json").write_text(
+        json.dumps(
+            [{"key": "name_text_0_0.4.8", "original": "Gone", "translation": "旧", "stage": 9}],
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+
+
+def legacy_update_dict(
+    old_dict_dir: Path, new_dict_dir: Path, new_data: WholeDictionary
+) -> None:
+    """
+    旧的字典合并流程(引入翻译记忆与模糊匹配之前)，就地修改new_data
+    """
+    new_outdated_dir = new_dict_dir / OUTDATE_DIR_NAME
+    old_outdated_dir = old_dict_dir / OUTDATE_DIR_NAME
+    shutil.move(old_outdated_dir, new_outdated_dir)
+
+    for old_dict_file in sorted(old_dict_dir.glob("**/*.json")):
+        path_key = old_dict_file.relative_to(old_dict_dir).as_posix()
+        with open(old_dict_file, "r", encoding="utf-8") as f:
+            old_dict_data = load_entries(json.load(f))
+
+        new_dict_data = new_data.get(path_key)
+        if new_dict_data is None:
+            outdated_data = old_dict_data
+        else:
+            outdated_data, new_data[path_key] = legacy_update_data(
+                copy.deepcopy(old_dict_data), new_dict_data
+            )
+
+        outdated_file = new_outdated_dir / path_key
+        if outdated_file.exists():
+            with open(outdated_file, "r", encoding="utf-8") as f:
+                prev_outdated_data = load_entries(json.load(f))
+        else:
+            prev_outdated_data = {}
+        if len(outdated_data) > 0:
+            _, prev_outdated_data = legacy_update_data(
+                outdated_data, prev_outdated_data, version=PREVIOUS_GAME_VERSION
+            )
+        if len(prev_outdated_data) <= 0:
+            continue
+        outdated_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(outdated_file, "w", encoding="utf-8") as f:
+            json.dump(
+                list(prev_outdated_data.values()),
+                f,
+                ensure_ascii=False,
+                indent=4,
+                default=json_default,
+            )
+
+
+def dump(new_data: WholeDictionary, new_dict_dir: Path) -> None:
+    # 与main.dump相同
+    for path, new_dict in new_data.items():
+        (new_dict_dir / path).parent.mkdir(parents=True, exist_ok=True)
+        with open(new_dict_dir / path, "w", encoding="utf-8") as f:
+            json.dump(
+                list(new_dict.values()),
+                f,
+                ensure_ascii=False,
+                indent=2,
+                default=json_default,
+            )
+
+
+def read_tree(root: Path) -> Dict[str, bytes]:
+    return {
+        file.relative_to(root).as_posix(): file.read_bytes()
+        for file in sorted(root.glob("**/*.json"))
+    }
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_default_merge_matches_legacy(corpus: Path, tmp_path: Path, jobs: int) -> None:
+    """
+    翻译记忆与模糊匹配默认关闭时，合并结果与旧的合并流程逐字节相同(含交出新字典就地合并)
+    """
+    new_data = extract(corpus, tmp_path / "extract")
+    write_old_dict(tmp_path / "old_dict", new_data)
+
+    results = {}
+    for name in ("legacy", "current", "owned"):
+        old_dict_dir = tmp_path / f"old_dict_{name}"
+        new_dict_dir = tmp_path / f"new_dict_{name}"
+        shutil.copytree(tmp_path / "old_dict", old_dict_dir)
+        new_dict_dir.mkdir()
+        data = copy.deepcopy(new_data)
+        if name == "legacy":
+            legacy_update_dict(old_dict_dir, new_dict_dir, data)
+        else:
+            updater = Updater(
+                old_dict_dir,
+                new_dict_dir,
+                data,
+                jobs=jobs,
+                own_new_data=name == "owned",
+            )
+            updater.update_dict(data)
+            data = updater.new_data
+        dump(data, new_dict_dir)
+        results[name] = read_tree(new_dict_dir)
+
+    assert len(results["legacy"]) > 0
+    assert any(path.startswith(OUTDATE_DIR_NAME) for path in results["legacy"])
+    assert results["current"] == results["legacy"]
+    assert results["owned"] == results["legacy"]
+
+
+def run_updater(
+    tmp_path: Path, name: str, new_data: WholeDictionary, **kwargs
+) -> Updater:
+    old_dict_dir = tmp_path / f"old_dict_{name}"
+    new_dict_dir = tmp_path / f"new_dict_{name}"
+    shutil.copytree(tmp_path / "old_dict", old_dict_dir)
+    new_dict_dir.mkdir()
+    data = copy.deepcopy(new_data)
+    updater = Updater(old_dict_dir, new_dict_dir, data, **kwargs)
+    updater.update_dict(data)
+    dump(updater.new_data, new_dict_dir)
+    return updater
+
+
+def test_outdated_store_appends_new_entries(corpus: Path, tmp_path: Path) -> None:
+    """
+    使用过时词条存储时，只追加本次遗失的词条并导出有新词条的文件；再次运行不插入任何记录
+    """
+    new_data = extract(corpus, tmp_path / "extract")
+    write_old_dict(tmp_path / "old_dict", new_data)
+
+    files = run_updater(tmp_path, "files", new_data)
+    store = OutdatedStore(tmp_path / "outdated.sqlite3")
+    stored = run_updater(tmp_path, "store", new_data, outdated_store=store)
+
+    # 下载的过时词条之后依次追加本次遗失的词条，同一key与版本号以新记录为准
+    downloaded_dir = tmp_path / "old_dict" / OUTDATE_DIR_NAME
+    expected: Dict[str, bytes] = {}
+    for path, keys in sorted(stored.outdated_keys.items()):
+        downloaded = downloaded_dir / path
+        entries = {
+            entry["key"]: entry
+            for entry in (
+                json.loads(downloaded.read_text("utf-8")) if downloaded.exists() else []
+            )
+        }
+        added = False
+        for key in keys:
+            entry = dict(stored.old_data[path][key])
+            if entry["original"] == entry["translation"]:
+                continue
+            entry["key"] = f"{key}_{PREVIOUS_GAME_VERSION}"
+            entry["stage"] = 9
+            entries[entry["key"]] = entry
+            added = True
+        if added:
+            expected[path] = json.dumps(
+                list(entries.values()), ensure_ascii=False, indent=4
+            ).encode("utf-8")
+
+    assert len(expected) > 0
+    assert read_tree(stored.new_dict_path / OUTDATE_DIR_NAME) == expected
+    # 合并后的字典与不使用存储时相同
+    assert {
+        path: data
+        for path, data in read_tree(stored.new_dict_path).items()
+        if not path.startswith(OUTDATE_DIR_NAME)
+    } == {
+        path: data
+        for path, data in read_tree(files.new_dict_path).items()
+        if not path.startswith(OUTDATE_DIR_NAME)
+    }
+
+    # 以相同的输入再次运行：下载的文件未变动，遗失的词条均已记录
+    rows = len(store)
+    store.touched.clear()
+    shutil.rmtree(tmp_path / "old_dict_store")
+    shutil.rmtree(tmp_path / "new_dict_store")
+    rerun = run_updater(tmp_path, "store", new_data, outdated_store=store)
+    assert len(store) == rows
+    assert read_tree(rerun.new_dict_path / OUTDATE_DIR_NAME) == {}
+    store.close()
+
+
+def write_outdated(outdated_dir: Path, path: str, entries: List[Dict]) -> None:
+    file = outdated_dir / path
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+
+
+def test_outdated_store_imports_downloaded_edits(tmp_path: Path) -> None:
+    """
+    只导入有变动的下载文件：Paratranz上的修改作为新记录，已有记录保留为历史
+    """
+    outdated_dir = tmp_path / OUTDATE_DIR_NAME
+    first = [
+        {"key": "00020_0.4.8", "original": "b c d", "translation": "乙", "stage": 9},
+        {"key": "00010_0.4.8", "original": "a b c", "translation": "甲", "stage": 9},
+    ]
+    write_outdated(outdated_dir, "src/A.json", first)
+
+    store = OutdatedStore(tmp_path / "outdated.sqlite3")
+    store.import_dir(outdated_dir)
+    assert list(store.entries("src/A.json")) == ["00020_0.4.8", "00010_0.4.8"]
+    assert len(store) == 2
+
+    # 内容未变动的文件不再导入
+    store.import_dir(outdated_dir)
+    assert len(store) == 2
+
+    edited = [dict(first[1], translation="甲改", stage=5)]
+    write_outdated(outdated_dir, "src/A.json", edited)
+    store.import_dir(outdated_dir)
+
+    entries = store.entries("src/A.json")
+    # 词条顺序以首次记录为准，不在当前文件中的词条仍保留
+    assert list(entries) == ["00020_0.4.8", "00010_0.4.8"]
+    assert entries["00010_0.4.8"]["translation"] == "甲改"
+    assert entries["00010_0.4.8"]["stage"] == 5
+    assert store.find(True, "a b c")[1]["translation"] == "甲改"
+    assert len(store) == 3
+
+    # 改回原翻译同样作为新记录
+    write_outdated(outdated_dir, "src/A.json", first)
+    store.import_dir(outdated_dir)
+    assert store.entries("src/A.json")["00010_0.4.8"]["translation"] == "甲"
+    assert len(store) == 4
+    assert store.touched == set()
+    store.close()
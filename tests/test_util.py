@@ -0,0 +1,137 @@
+import random
+import re
+from pathlib import Path
+from typing import Dict, List
+
+from lxml import etree
+
+from data import XmlEntry
+from tests.legacy import legacy_split_htmlContent
+from util import split_htmlContent, xml_node_replace_translations
+
+
+def html_entry(original: str, translation: str, stage: int = 1) -> XmlEntry:
+    return XmlEntry.from_json(
+        Path("a.xml"),
+        {
+            "key": "htmlContent_TAG_0",
+            "original": original,
+            "translation": translation,
+            "stage": stage,
+        },
+    )
+
+
+def cdata_node(text: str) -> etree._Element:
+    return etree.fromstring(
+        f"<htmlContent><![CDATA[{text}]]></htmlContent>",
+        etree.XMLParser(strip_cdata=False),
+    )
+
+
+def regex_replace(text: str, entries: List[XmlEntry]) -> str:
+    """
+    所有原文按长者优先合并为一个正则，调用一次sub
+    """
+    translations: Dict[str, str] = {}
+    for entry in entries:
+        if entry.stage == 0 or entry.translation == entry.original:
+            continue
+        if entry.original != "":
+            translations.setdefault(
+                entry.original, entry.translation.replace("\\n", "\n")
+            )
+    if len(translations) == 0:
+        return text
+    if text.strip() == "":
+        text = ""
+    regex = re.compile(
+        "|".join(map(re.escape, sorted(translations, key=len, reverse=True)))
+    )
+    return regex.sub(lambda match: translations[match.group()], text)
+
+
+def test_replace_translations_matches_alternation_regex() -> None:
+    rnd = random.Random(0)
+    alphabet = "ab<>p \n"
+    for _ in range(20000):
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 40)))
+        entries = []
+        for _ in range(rnd.randint(1, 6)):
+            start = rnd.randrange(len(text))
+            original = text[start : rnd.randint(start + 1, min(len(text), start + 9))]
+            if rnd.random() < 0.2:
+                original = "".join(rnd.choice(alphabet) for _ in range(3))
+            translation = rnd.choice(
+                ["译" + original, "X", "", original + "b", "a\\nb"]
+            )
+            entries.append(html_entry(original, translation, rnd.choice([0, 1, 1, 2])))
+
+        node = cdata_node(text)
+        xml_node_replace_translations(node, entries)
+        assert node.text == regex_replace(text, entries), (text, entries)
+
+
+def test_replace_translations_reports_shadowed_entries() -> None:
+    text = "<p>Rose smiles.</p>\n<p>Rose smiles. Lilaya nods.</p>\n<p>Lilaya nods.</p>"
+    entries = [
+        html_entry("<p>Rose smiles.</p>", "<p>罗丝微笑。</p>"),
+        html_entry("Rose smiles. Lilaya nods.", "罗丝微笑。莉莉娅点头。"),
+        html_entry("Lilaya nods.", "莉莉娅点头。"),
+        html_entry("<p>Rose smiles.</p>", "<p>重复</p>"),
+    ]
+    node = cdata_node(text)
+    shadowed = xml_node_replace_translations(node, entries)
+
+    assert node.text == (
+        "<p>罗丝微笑。</p>\n<p>罗丝微笑。莉莉娅点头。</p>\n<p>莉莉娅点头。</p>"
+    )
+    assert [entry.original for entry in shadowed] == ["Lilaya nods."]
+
+
+def test_replace_translations_skips_only_untranslated_entries() -> None:
+    # 阶段2(有疑问)的翻译与其他已翻译的词条一样应用
+    node = cdata_node("<p>Hello.</p><p>Bye.</p><p>Hi.</p>")
+    xml_node_replace_translations(
+        node,
+        [
+            html_entry("<p>Hello.</p>", "<p>你好。</p>", 0),
+            html_entry("<p>Bye.</p>", "<p>再见。</p>", 2),
+            html_entry("<p>Hi.</p>", "<p>嗨。</p>"),
+        ],
+    )
+    assert node.text == "<p>Hello.</p><p>再见。</p><p>嗨。</p>"
+
+
+# 拆分时容易出错的htmlContent
+HTML_CASES = [
+    # 嵌套的文本块
+    "<div><p>Outer <div>inner</div> text.</p></div>",
+    "<p>One <p>two</p> three</p>\n<div class='a'><div>x</div></div>",
+    "<h1><p>Title</p></h1>\n#IF(a)\n<p>Yes.</p>\n#ELSE\n<p>No.</p>\n#ENDIF",
+    # 重复的相同段落
+    "<p>Same.</p>\n<p>Same.</p>\n<p>Same.</p>",
+    "<p>\nA\n<p>\n<p>\nA\n<p>\n</p>\nB\n</p>\n</p>\nB\n</p>",
+    "#IF(x)</p>\n#IF(x)</p>\n<p>#IF(x)</p>",
+    # 含有拼接文本块时使用的分隔符
+    "tail</p> #AB\x00tail</p> <p>foo #AB",
+    "<p>a\x00b</p>\n#X\x00</p>\n<p>\nc\x00\n<p>",
+    "\x00",
+    # 无文本块
+    "",
+    "plain<br/><br/>text",
+]
+
+
+def test_split_htmlContent_matches_legacy(corpus: Path) -> None:
+    parser = etree.XMLParser(strip_cdata=False)
+    texts = [
+        element.text
+        for file in sorted(corpus.glob("res/txt/**/*.xml"))
+        for element in etree.parse(file.as_posix(), parser).iter("htmlContent")
+        if element.text is not None and element.text.strip() != ""
+    ]
+    assert len(texts) > 0
+    texts += HTML_CASES
+    for text in texts:
+        assert split_htmlContent(text) == legacy_split_htmlContent(text), text
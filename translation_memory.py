@@ -0,0 +1,181 @@
+import zlib
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from data import JsonEntry, WholeDictionary
+
+# 索引键：(是否为java词条, 规范化后的原文)
+MemoryKey = Tuple[bool, str]
+# 索引值：(字典文件路径, 词条)
+MemoryItem = Tuple[str, JsonEntry]
+
+
+def is_java_entry(entry: JsonEntry) -> bool:
+    # java词条的key为行号，xml词条的key以标签名开头
+    return entry["key"][0].isdigit()
+
+
+def old_original(entry: JsonEntry) -> str:
+    """
+    旧字典中词条的规范化原文，与Updater.update_data中的匹配方式相同
+    """
+    original = entry["original"]
+    # 是否为xml文件
+    if not is_java_entry(entry):
+        original = original.replace("\\n", "\n")
+    return original.strip()
+
+
+class TranslationMemory:
+    """
+    全局翻译记忆：以规范化原文为键索引旧字典中所有已翻译的词条
+    用于填充在本文件内未匹配到旧词条的新词条(如上游将对话移动到其他文件)
+    同一原文有多个翻译时，取阶段最高者，阶段相同时取路径顺序在前者
+    """
+
+    def __init__(self) -> None:
+        self.index: Dict[MemoryKey, MemoryItem] = {}
+
+    @staticmethod
+    def build(old_data: WholeDictionary) -> "TranslationMemory":
+        memory = TranslationMemory()
+        for path in sorted(old_data):
+            for entry in old_data[path].values():
+                memory.add(path, entry)
+        return memory
+
+    def add(self, path: str, entry: JsonEntry) -> None:
+        stage = entry.get("stage")
+        if stage is None or stage <= 0:
+            return
+        # 汉化与原文一致（即无需汉化）的词条不参与
+        if entry["original"] == entry["translation"]:
+            return
+        key = (is_java_entry(entry), old_original(entry))
+        if key[1] == "":
+            return
+        current = self.index.get(key)
+        if current is None or current[1]["stage"] < stage:
+            self.index[key] = (path, entry)
+
+    def lookup(self, entry: JsonEntry) -> Optional[MemoryItem]:
+        """
+        查找新词条对应的已翻译旧词条
+        """
+        return self.index.get((is_java_entry(entry), entry["original"].strip()))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+# MinHash签名分为NUM_BANDS段，每段BAND_ROWS个值；任一段相同即为候选
+# 分词集合的Jaccard相似度为0.4时成为候选的概率约为94%
+NUM_BANDS = 16
+BAND_ROWS = 2
+SIGNATURE_SIZE = NUM_BANDS * BAND_ROWS  # 须为2的幂
+BIN_BITS = SIGNATURE_SIZE.bit_length() - 1
+VALUE_BITS = 32 - BIN_BITS
+VALUE_MASK = (1 << VALUE_BITS) - 1
+# 32位乘法散列的乘数(黄金分割)，用于打散crc32的结果
+HASH_MULTIPLIER = 0x9E3779B1
+# 每个新词条最多比较的候选数，按相同段数从多到少选取
+MAX_CANDIDATES = 8
+# 少于该词数的原文不参与模糊匹配
+MIN_WORDS = 3
+
+
+def shingles(words: List[str]) -> List[int]:
+    """
+    原文的分词集合(单词及相邻两个单词)，以crc32哈希表示
+    """
+    grams = set(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return [zlib.crc32(gram.encode("utf-8")) for gram in grams]
+
+
+def minhash(hashes: List[int]) -> List[int]:
+    """
+    单次置换的MinHash签名：哈希值的高位决定所在的桶，每个桶取低位的最小值
+    每个分词只需散列一次；空桶取其后第一个非空桶的值并按距离偏移(旋转稠密化)
+    """
+    signature: List[Optional[int]] = [None] * SIGNATURE_SIZE
+    for h in hashes:
+        h = (h * HASH_MULTIPLIER) & 0xFFFFFFFF
+        idx = h >> VALUE_BITS
+        value = h & VALUE_MASK
+        current = signature[idx]
+        if current is None or value < current:
+            signature[idx] = value
+    # 从后向前遍历两轮，为每个空桶找到其后(循环)最近的非空桶
+    base = list(signature)
+    nearest: Tuple[int, int] = (0, 0)  # (位置, 值)
+    for pos in range(2 * SIGNATURE_SIZE - 1, -1, -1):
+        value = base[pos % SIGNATURE_SIZE]
+        if value is not None:
+            nearest = (pos, value)
+        elif pos < SIGNATURE_SIZE:
+            signature[pos] = nearest[1] + ((nearest[0] - pos) << VALUE_BITS)
+    return signature
+
+
+class FuzzyIndex:
+    """
+    对原文进行MinHash签名并按段分桶(LSH)，查找相似原文时只需比较同桶的词条，无需两两比较
+    候选以单词序列的相似度(difflib)确认，不低于threshold时视为匹配
+    """
+
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self.items: List[Tuple[List[str], MemoryItem]] = []
+
+    @staticmethod
+    def words(text: str) -> List[str]:
+        return text.split()
+
+    @staticmethod
+    def bands(words: List[str]) -> List[Tuple[int, Tuple[int, ...]]]:
+        signature = minhash(shingles([word.lower() for word in words]))
+        return [
+            (band, tuple(signature[band * BAND_ROWS : (band + 1) * BAND_ROWS]))
+            for band in range(NUM_BANDS)
+        ]
+
+    def add(self, path: str, entry: JsonEntry) -> None:
+        words = self.words(old_original(entry))
+        if len(words) < MIN_WORDS:
+            return
+        idx = len(self.items)
+        self.items.append((words, (path, entry)))
+        for band in self.bands(words):
+            self.buckets.setdefault(band, []).append(idx)
+
+    def lookup(self, entry: JsonEntry) -> Optional[Tuple[float, MemoryItem]]:
+        """
+        查找与新词条原文最相似的旧词条，返回(相似度, 旧词条)
+        """
+        words = self.words(entry["original"].strip())
+        if len(words) < MIN_WORDS or len(self.items) == 0:
+            return None
+        hits: Counter = Counter()
+        for band in self.bands(words):
+            hits.update(self.buckets.get(band, ()))
+
+        best: Optional[Tuple[float, MemoryItem]] = None
+        matcher = SequenceMatcher(None, b=words, autojunk=False)
+        # 相同段数相等时按首次命中的顺序，结果确定
+        for idx, _ in hits.most_common(MAX_CANDIDATES):
+            old_words, item = self.items[idx]
+            matcher.set_seq1(old_words)
+            if matcher.real_quick_ratio() < self.threshold:
+                continue
+            if matcher.quick_ratio() < self.threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= self.threshold and (best is None or ratio > best[0]):
+                best = (ratio, item)
+        return best
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from lxml import etree
+
+from logger import logger
+from util import get_element_CDATA
+
+# 解析树占用内存的粗略估计：约为文件大小的5倍
+TREE_SIZE_FACTOR = 5
+
+ElementText = Callable[[etree._Element], Optional[str]]
+
+
+@dataclass
+class CachedTree:
+    tree: etree._ElementTree
+    mtime_ns: int
+    file_size: int
+    texts: Dict[etree._Element, Optional[str]] = field(default_factory=dict)
+
+
+class TreeCache:
+    """
+    进程内的xml解析树缓存，提取与应用字典时共用同一棵树及节点文本
+    超出内存预算时淘汰最久未使用的树；文件被修改后缓存自动失效
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size  # 内存预算(字节)
+        self.size = 0
+        self.trees: "OrderedDict[str, CachedTree]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.text_hits = 0
+
+    def parse(self, file: Path) -> Tuple[etree._ElementTree, ElementText]:
+        """
+        返回文件的解析树，以及带缓存的get_element_CDATA
+        """
+        key = Path(file).as_posix()
+        stat = Path(file).stat()
+
+        cached = self.trees.get(key)
+        if cached is not None and (cached.mtime_ns, cached.file_size) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            self.trees.move_to_end(key)
+            self.hits += 1
+            return cached.tree, partial(self.element_text, cached)
+
+        self.discard(file)
+        self.misses += 1
+        parser = etree.XMLParser(strip_cdata=False)
+        cached = CachedTree(etree.parse(key, parser), stat.st_mtime_ns, stat.st_size)
+
+        # 单个文件超出预算时不缓存
+        if stat.st_size * TREE_SIZE_FACTOR <= self.max_size:
+            self.trees[key] = cached
+            self.size += stat.st_size * TREE_SIZE_FACTOR
+            while self.size > self.max_size:
+                _, evicted = self.trees.popitem(last=False)
+                self.size -= evicted.file_size * TREE_SIZE_FACTOR
+
+        return cached.tree, partial(self.element_text, cached)
+
+    def element_text(
+        self, cached: CachedTree, element: etree._Element
+    ) -> Optional[str]:
+        try:
+            text = cached.texts[element]
+        except KeyError:
+            text = cached.texts[element] = get_element_CDATA(element)
+        else:
+            self.text_hits += 1
+        return text
+
+    def discard(self, file: Path) -> None:
+        """
+        文件即将被修改或解析树已被修改时移除缓存
+        """
+        cached = self.trees.pop(Path(file).as_posix(), None)
+        if cached is not None:
+            self.size -= cached.file_size * TREE_SIZE_FACTOR
+
+    def report(self) -> None:
+        logger.info(
+            "xml解析树缓存：复用%s次，解析%s次，复用节点文本%s次",
+            self.hits,
+            self.misses,
+            self.text_hits,
+        )
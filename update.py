@@ -1,92 +1,341 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
+import logging
 import shutil
-import asyncio
 import re
+import sys
 import copy
 
-from data import WholeDictionary, SingleDictionary
-from const import OUTDATE_DIR_NAME, PREVIOUS_GAME_VERSION
-from logger import logger
+from data import (
+    WholeDictionary,
+    SingleDictionary,
+    JsonEntry,
+    json_default,
+    load_entries,
+)
+from const import FUZZY_FIELD, OUTDATE_DIR_NAME, PREVIOUS_GAME_VERSION
+from logger import logger, LogMessages, collect_logs, emit_logs
+from outdated_store import OutdatedStore
+from translation_memory import FuzzyIndex, TranslationMemory, is_java_entry
+import diagnostics
+
+
+# 由翻译记忆填充的词条的阶段(已翻译)
+MEMORY_STAGE = 1
+# 模糊匹配时原文相似度的下限
+FUZZY_THRESHOLD = 0.8
+
+# 单个字典文件的合并结果：(旧字典, 合并后的新字典(文件已不存在时为None), 未迁移的旧词条key)
+FileUpdate = Tuple[SingleDictionary, Optional[SingleDictionary], List[str]]
 
 
 class Updater:
     def __init__(
-        self, old_dict_path: Path, new_dict_path: Path, new_data: WholeDictionary
+        self,
+        old_dict_path: Path,
+        new_dict_path: Path,
+        new_data: WholeDictionary,
+        jobs: int = 1,
+        translation_memory: bool = False,
+        fuzzy_match: bool = False,
+        outdated_store: Optional[OutdatedStore] = None,
+        own_new_data: bool = False,
     ) -> None:
         self.old_dict_path: Path = old_dict_path
         self.new_dict_path: Path = new_dict_path
         self.new_data: WholeDictionary = new_data
         self.old_data: WholeDictionary = {}
         self.file_with_missing_entry: List[Path] = []
+        # 各文件中未迁移到新字典的旧词条
+        self.outdated_keys: Dict[str, List[str]] = {}
+        self.jobs = max(jobs, 1)
+        # 是否以全局翻译记忆填充本文件内未匹配的词条
+        self.translation_memory = translation_memory
+        # 是否为原文略有改动的词条沿用相似原文的翻译
+        self.fuzzy_match = fuzzy_match
+        # 过时词条保存在只追加的存储中，不再逐个融合并重写过时词条文件
+        self.outdated_store = outdated_store
+        # 调用方交出new_data(如提取结果)时直接修改其中的词条，不再为修改的词条创建副本
+        self.own_new_data = own_new_data
 
     def update_dict(
         self,
         new_data: WholeDictionary,
         ignore_untranslated: bool = False,
     ):
-        loop = asyncio.get_event_loop()
-
+        """
+        合并所有字典文件，jobs大于1时使用多进程
+        结果及日志按路径顺序汇总，与单进程结果一致
+        """
         new_outdated_dir = self.new_dict_path / OUTDATE_DIR_NAME
         old_outdated_dir = self.old_dict_path / OUTDATE_DIR_NAME
 
-        # 迁移旧版本过时词条
-        if old_outdated_dir.exists():
+        if self.outdated_store is not None:
+            # 导入下载的过时词条中有变动的文件，Paratranz上的修改作为新记录
+            if old_outdated_dir.exists():
+                self.outdated_store.import_dir(old_outdated_dir)
+        elif old_outdated_dir.exists():
+            # 迁移旧版本过时词条
             shutil.move(old_outdated_dir, new_outdated_dir)
 
         # 获取所有json文件
-        old_dict_files: List[Path] = list(self.old_dict_path.glob("**/*.json"))
-
-        file_pairs = [
+        old_dict_files: List[Path] = sorted(
             (
-                old_dict_file,
-                new_data.get(
-                    old_dict_file.relative_to(self.old_dict_path).as_posix(), None
-                ),
-                new_outdated_dir / old_dict_file.relative_to(self.old_dict_path),
-            )
+                file
+                for file in self.old_dict_path.glob("**/*.json")
+                if not file.is_relative_to(old_outdated_dir)
+            ),
+            key=lambda file: file.as_posix(),
+        )
+        path_keys = [
+            sys.intern(old_dict_file.relative_to(self.old_dict_path).as_posix())
             for old_dict_file in old_dict_files
         ]
 
         tasks = [
-            self.update_dict_file(
-                old_dict_file, new_data, outdated_file, ignore_untranslated
+            (
+                old_dict_file,
+                new_data.get(path_key, None),
+                new_outdated_dir / path_key if self.outdated_store is None else None,
+                ignore_untranslated,
             )
-            for old_dict_file, new_data, outdated_file in file_pairs
+            for old_dict_file, path_key in zip(old_dict_files, path_keys)
         ]
 
-        loop.run_until_complete(asyncio.gather(*tasks))
+        if self.jobs <= 1 or len(tasks) <= 1:
+            results = (
+                self.update_dict_file(*task, in_place=self.own_new_data)
+                for task in tasks
+            )
+            for path_key, result in zip(path_keys, results):
+                self.add_result(path_key, result)
+        else:
+            self.update_dict_files(new_data, path_keys, tasks)
+
+        if self.outdated_store is not None:
+            self.store_outdated(new_outdated_dir)
+        if self.translation_memory:
+            self.fill_from_memory()
+        if self.fuzzy_match:
+            self.fill_from_similar()
 
-    async def update_dict_file(
+    def update_dict_files(
         self,
+        new_data: WholeDictionary,
+        path_keys: List[str],
+        tasks: List[Tuple[Path, Optional[SingleDictionary], Optional[Path], bool]],
+    ) -> None:
+        """
+        多进程合并所有字典文件
+        """
+        chunksize = max(1, len(tasks) // (self.jobs * 4))
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for path_key, (messages, error, result) in zip(
+                path_keys,
+                executor.map(Updater.update_file, *zip(*tasks), chunksize=chunksize),
+            ):
+                emit_logs(messages)
+                if error is not None:
+                    raise error
+                old_dict_data, merged, outdated_keys = result
+                if merged is not None:
+                    keys, created = merged
+                    new_dict_data = new_data[path_key]
+                    merged = {
+                        key: created[key] if key in created else new_dict_data[key]
+                        for key in keys
+                    }
+                self.add_result(path_key, (old_dict_data, merged, outdated_keys))
+
+    def store_outdated(self, new_outdated_dir: Path) -> None:
+        """
+        将本次遗失的词条以上一版本号加入过时词条存储，已有的过时词条不再重新融合
+        与融合过时词条文件时相同，汉化与原文一致的词条不记录，记录的词条阶段为9(锁定)
+        """
+        for path in sorted(self.outdated_keys):
+            old_dict_data = self.old_data[path]
+            for key in self.outdated_keys[path]:
+                old_entry = old_dict_data[key]
+                if old_entry["original"] == old_entry["translation"]:
+                    continue
+                entry = copy.copy(old_entry)
+                entry["key"] = f"{key}_{PREVIOUS_GAME_VERSION}"
+                entry["stage"] = 9  # locked
+                self.outdated_store.add(path, entry)
+            if (
+                path not in self.new_data
+                and len(self.outdated_store.entries(path)) == 0
+            ):
+                diagnostics.report(
+                    "empty_file",
+                    "文件不再包含任何条目",
+                    (new_outdated_dir / path).as_posix(),
+                )
+        self.outdated_store.commit()
+        self.outdated_store.export(new_outdated_dir)
+
+    def fill_from_memory(self) -> None:
+        """
+        以全部旧字典建立翻译记忆，填充在本文件内未匹配到旧词条的新词条
+        沿用的翻译未经所在文件的上下文校对，阶段设为已翻译
+        """
+        memory = TranslationMemory.build(self.old_data)
+        filled = 0
+        for path in sorted(self.new_data):
+            new_dict_data = self.new_data[path]
+            for key, entry in list(new_dict_data.items()):
+                if entry["stage"] != 0:
+                    continue
+                item = memory.lookup(entry)
+                # 本次未遗失的词条中没有时，查找以往版本的过时词条
+                if item is None and self.outdated_store is not None:
+                    item = self.outdated_store.find(
+                        is_java_entry(entry), entry["original"].strip()
+                    )
+                if item is None:
+                    continue
+                source_path, source = item
+                if not self.own_new_data:
+                    entry = copy.copy(entry)
+                entry["translation"] = translation_process(
+                    source["translation"], source["key"]
+                )
+                entry["stage"] = MEMORY_STAGE
+                new_dict_data[key] = entry
+                filled += 1
+                diagnostics.report(
+                    "memory_translation",
+                    "沿用其他词条的翻译",
+                    path,
+                    detail=f"{source_path}:{source['key']}",
+                    level=logging.INFO,
+                )
+        logger.info(
+            "翻译记忆：索引%s条原文，填充%s个未匹配的词条", len(memory), filled
+        )
+
+    def fill_from_similar(self) -> None:
+        """
+        以未迁移的旧词条建立LSH索引，为仍未翻译的新词条查找原文相似的旧词条并沿用其翻译
+        沿用的翻译可能与新原文不符，以FUZZY_FIELD标记，应用字典时跳过；java词条的翻译为整行代码，不参与
+        """
+        index = FuzzyIndex(FUZZY_THRESHOLD)
+        for path in sorted(self.outdated_keys):
+            old_dict_data = self.old_data[path]
+            for key in self.outdated_keys[path]:
+                entry = old_dict_data[key]
+                if (
+                    is_java_entry(entry)
+                    or entry.get("stage") is None
+                    or entry["stage"] <= 0
+                    or entry["original"] == entry["translation"]
+                ):
+                    continue
+                index.add(path, entry)
+        if len(index) == 0:
+            return
+
+        filled = 0
+        for path in sorted(self.new_data):
+            new_dict_data = self.new_data[path]
+            for key, entry in list(new_dict_data.items()):
+                if entry["stage"] != 0 or is_java_entry(entry):
+                    continue
+                match = index.lookup(entry)
+                if match is None:
+                    continue
+                ratio, (source_path, source) = match
+                if not self.own_new_data:
+                    entry = copy.copy(entry)
+                entry["translation"] = translation_process(
+                    source["translation"], source["key"]
+                )
+                entry["stage"] = MEMORY_STAGE
+                entry[FUZZY_FIELD] = round(ratio, 2)
+                new_dict_data[key] = entry
+                filled += 1
+                diagnostics.report(
+                    "fuzzy_translation",
+                    f"沿用相似原文的翻译(相似度{ratio:.2f})，需校对",
+                    path,
+                    detail=f"{source_path}:{source['key']}",
+                    level=logging.INFO,
+                )
+        logger.info(
+            "模糊匹配：索引%s个未迁移的旧词条，填充%s个原文有改动的词条",
+            len(index),
+            filled,
+        )
+
+    def add_result(self, path_key: str, result: FileUpdate) -> None:
+        old_dict_data, new_dict_data, outdated_keys = result
+        self.old_data[path_key] = old_dict_data
+        self.outdated_keys[path_key] = outdated_keys
+        if new_dict_data is not None:
+            self.new_data[path_key] = new_dict_data
+            if len(outdated_keys) > 0:
+                self.file_with_missing_entry.append(path_key)
+
+    @staticmethod
+    def update_file(
         old_dict_file: Path,
         new_dict_data: Optional[SingleDictionary],
-        outdated_file: Path,
+        outdated_file: Optional[Path],
         ignore_untranslated: bool = False,
     ):
+        """
+        在子进程中合并单个字典文件，日志暂存后交给主进程输出
+        主进程中已有新字典，合并结果只传回词条顺序及新建的词条
+        """
+        error, result = None, None
+        with collect_logs() as messages:
+            try:
+                old_dict_data, merged, outdated_keys = Updater.update_dict_file(
+                    old_dict_file, new_dict_data, outdated_file, ignore_untranslated
+                )
+                if merged is not None:
+                    created = {
+                        key: entry
+                        for key, entry in merged.items()
+                        if entry is not new_dict_data.get(key)
+                    }
+                    merged = (list(merged), created)
+                result = (old_dict_data, merged, outdated_keys)
+            except Exception as e:
+                error = e
+        return messages, error, result
+
+    @staticmethod
+    def update_dict_file(
+        old_dict_file: Path,
+        new_dict_data: Optional[SingleDictionary],
+        outdated_file: Optional[Path],
+        ignore_untranslated: bool = False,
+        in_place: bool = False,
+    ) -> FileUpdate:
+        """
+        合并单个字典文件，并将遗失条目融合进对应的过时词条文件(outdated_file为None时跳过)
+        in_place为True时直接修改new_dict_data中的词条
+        """
         with open(old_dict_file, "r", encoding="utf-8") as old_dict:
-            old_dict_data: List[Dict] = json.load(old_dict)
-            
-        path_key = old_dict_file.relative_to(self.old_dict_path).as_posix()
-
-        hashed_old_dict_data: SingleDictionary = {}
-        for old_dict_item in old_dict_data:
-            hashed_old_dict_data[old_dict_item["key"]] = old_dict_item
-
-        self.old_data[
-            old_dict_file.relative_to(self.old_dict_path).as_posix()
-        ] = hashed_old_dict_data
+            hashed_old_dict_data: SingleDictionary = load_entries(json.load(old_dict))
 
         no_file = False
         # 若在新提取中该文件已不存在
         if new_dict_data is None:
-            logger.info("在新提取中该文件已不存在：%s", old_dict_file)
+            diagnostics.report(
+                "removed_file",
+                "在新提取中该文件已不存在",
+                old_dict_file.as_posix(),
+                level=logging.INFO,
+            )
             outdated_data = hashed_old_dict_data
             no_file = True
         else:
-            outdated_data, self.new_data[path_key] = await self.update_data(
-                copy.deepcopy(hashed_old_dict_data), new_dict_data
+            outdated_data, new_dict_data = Updater.update_data(
+                hashed_old_dict_data, new_dict_data, in_place=in_place
             )
 
             if ignore_untranslated:
@@ -96,61 +345,79 @@ class Updater:
                 result_dict_data = new_dict_data
 
             if len(outdated_data) > 0:
-                logger.info("在新提取中该文件存在遗失条目：%s", old_dict_file)
-                self.file_with_missing_entry.append(old_dict_file.relative_to(self.old_dict_path).as_posix())
-                print([key for key, data in outdated_data.items()])
+                diagnostics.report(
+                    "missing_entries",
+                    f"在新提取中该文件存在{len(outdated_data)}个遗失条目",
+                    old_dict_file.as_posix(),
+                    detail=", ".join(outdated_data),
+                    level=logging.INFO,
+                )
+
+        result = (hashed_old_dict_data, new_dict_data, list(outdated_data))
+        # 使用过时词条存储时由主进程统一记录
+        if outdated_file is None:
+            return result
 
         # 过时条目融合
         if outdated_file.exists():
             with open(outdated_file, "r", encoding="utf-8") as f:
-                prev_outdated_data_raw = json.load(f)
-            hashed_prev_outdated_data: SingleDictionary = {}
-            for prev_outdated_item in prev_outdated_data_raw:
-                hashed_prev_outdated_data[
-                    prev_outdated_item["key"]
-                ] = prev_outdated_item
-            prev_outdated_data = hashed_prev_outdated_data
+                prev_outdated_data = load_entries(json.load(f))
         else:
             prev_outdated_data = {}
 
         if len(outdated_data) > 0:
-            _, prev_outdated_data = await self.update_data(outdated_data, prev_outdated_data, version=PREVIOUS_GAME_VERSION)
+            _, prev_outdated_data = Updater.update_data(outdated_data, prev_outdated_data, version=PREVIOUS_GAME_VERSION, in_place=True)
         
         if len(prev_outdated_data) <= 0:
             if no_file:
-                logger.warning(" - 文件不再包含任何条目：%s", outdated_file)
-            return
+                diagnostics.report(
+                    "empty_file", "文件不再包含任何条目", outdated_file.as_posix()
+                )
+            return result
 
-        if not outdated_file.parent.exists():
-            outdated_file.parent.mkdir(parents=True)
+        # 多进程时不同文件可能同时创建同一目录
+        outdated_file.parent.mkdir(parents=True, exist_ok=True)
 
         with open(outdated_file, "w", encoding="utf-8") as f:
-            json.dump(list(prev_outdated_data.values()), f, ensure_ascii=False, indent=4)
+            json.dump(list(prev_outdated_data.values()), f, ensure_ascii=False, indent=4, default=json_default)
 
-    async def update_data(
-        self,
+        return result
+
+    @staticmethod
+    def update_data(
         old_dict_data: SingleDictionary,
         new_dict_data: SingleDictionary,
         version: str = "",
-    ) -> SingleDictionary:
+        in_place: bool = False,
+    ) -> Tuple[SingleDictionary, SingleDictionary]:
+        """
+        合并新旧字典，返回(未迁移的旧词条, 合并后的新字典)，均按词条key排序
+        不修改传入的字典及词条：未变动的词条直接共用，只为被修改的词条创建新记录
+        in_place为True时调用方交出new_dict_data的所有权，直接修改其中的词条，不再创建副本
+        version不为空时为过时词条融合，old_dict_data中的词条以该版本号合并入new_dict_data
+        """
         new_dict_map: Dict[str, List[str]] = {}  # [原文文本, new_dict_data词典中对应的key]
         old_dict_map: Dict[str, List[str]] = {}  # [原文文本, old_dict_data词典中对应的key]
-        
+
         # sort the new data and old data
-        new_dict_data = dict(sorted(new_dict_data.items(), key=lambda x: x[1]["key"]))
-        old_dict_data = dict(sorted(old_dict_data.items(), key=lambda x: x[1]["key"]))
+        merged_data: SingleDictionary = dict(
+            sorted(new_dict_data.items(), key=lambda x: x[1]["key"])
+        )
+        old_keys = sorted(old_dict_data, key=lambda key: old_dict_data[key]["key"])
 
-        for key, data in new_dict_data.items():
+        for key, data in merged_data.items():
             original = data["original"].strip()
             if not new_dict_map.get(original):
                 new_dict_map[original] = [key]
             else:
                 new_dict_map[original].append(key)
 
-        for key, data in old_dict_data.items():
+        remaining = set()  # 未被迁移的旧词条
+        for key in old_keys:
+            data = old_dict_data[key]
             if data["stage"] == 0:
-                old_dict_data[key] = None
                 continue
+            remaining.add(key)
             original = data["original"]
             # 是否为xml文件
             if not data["key"][0].isdigit():
@@ -160,73 +427,63 @@ class Updater:
                 old_dict_map[original] = [key]
             else:
                 old_dict_map[original].append(key)
-        
-        # check = False
-        # if "00555" in old_dict_data:
-        #     check = True
+
+        # 本次新建的词条记录，可直接修改
+        created = set()
+
+        def modified(key: str) -> JsonEntry:
+            if not in_place and key not in created:
+                merged_data[key] = copy.copy(merged_data[key])
+                created.add(key)
+            return merged_data[key]
 
         for ori, keys in old_dict_map.items():
             new_idx_list = new_dict_map.get(ori)
-            # if check and "down against [npc2.her] [npc2.lips+]" in key:
-            #     with open("test.json", "w") as f:
-            #         json.dump(new_dict_map, f, indent=2)
-            #     for _k, _v in new_dict_map.items():
-            #         if "down against [npc2.her] [npc2.lips+]" in _k:
-            #             print(_k, _v)
-            #     print(key)
-            #     print(value, new_idx_list)
-            #     input()
             # outdated file merge
             if version != "":
                 for idx, old_key in enumerate(keys):
+                    old_entry = old_dict_data[old_key]
                     # 若旧字典的汉化与原文一致（即无需汉化）则无视
-                    if (
-                        old_dict_data[old_key]["original"]
-                        == old_dict_data[old_key]["translation"]
-                    ):
+                    if old_entry["original"] == old_entry["translation"]:
                         continue
                     if new_idx_list is None or len(new_idx_list) == 0 or idx >= len(new_idx_list):
-                        new_dict_data[f"{old_key}"] = old_dict_data[old_key]
-                        new_dict_data[f"{old_key}"]["key"] = f"{old_key}_{version}"
-                        new_dict_data[f"{old_key}"]["stage"] = 9 # locked
+                        merged_data[old_key] = copy.copy(old_entry)
+                        created.add(old_key)
+                        merged_data[old_key]["key"] = f"{old_key}_{version}"
+                        merged_data[old_key]["stage"] = 9 # locked
                         continue
-                    new_dict_data[new_idx_list[idx]]["translation"] = old_dict_data[
-                        old_key
-                    ]["translation"].strip()
-                    new_dict_data[new_idx_list[idx]]["stage"] = 9 # locked
-
-                    if "." in new_dict_data[new_idx_list[idx]]["key"].split("_")[-1]:
-                        new_dict_data[new_idx_list[idx]]["key"] = "_".join(
-                            new_dict_data[new_idx_list[idx]]["key"].split("_")[:-1]
-                            + [f"_{version}"]
+                    entry = modified(new_idx_list[idx])
+                    entry["translation"] = old_entry["translation"].strip()
+                    entry["stage"] = 9 # locked
+
+                    if "." in entry["key"].split("_")[-1]:
+                        entry["key"] = "_".join(
+                            entry["key"].split("_")[:-1] + [f"_{version}"]
                         )
                     else:
-                        new_dict_data[new_idx_list[idx]]["key"] += f"_{version}"
+                        entry["key"] += f"_{version}"
             else:
                 if new_idx_list is None:
                     continue
                 for idx, old_key in enumerate(
                     keys[: min(len(keys), len(new_idx_list))]
                 ):
+                    old_entry = old_dict_data[old_key]
                     # 保留汉化内容及当前阶段
-                    translation = old_dict_data[old_key]["translation"]
-
                     translation = translation_process(
-                        translation, old_dict_data[old_key]["key"]
+                        old_entry["translation"], old_entry["key"]
                     )
 
-                    new_dict_data[new_idx_list[idx]]["translation"] = translation
-                    new_dict_data[new_idx_list[idx]]["stage"] = old_dict_data[old_key][
-                        "stage"
-                    ]
+                    entry = modified(new_idx_list[idx])
+                    entry["translation"] = translation
+                    entry["stage"] = old_entry["stage"]
                     # 移除被迁移的旧词条
-                    old_dict_data[old_key] = None
-
-        to_delete = [key for key, value in old_dict_data.items() if value is None]
-        for key in to_delete:
-            old_dict_data.pop(key)
+                    remaining.discard(old_key)
 
-        return old_dict_data, new_dict_data
+        outdated_data: SingleDictionary = {
+            key: old_dict_data[key] for key in old_keys if key in remaining
+        }
+        return outdated_data, merged_data
 
 
 ZH_CHARACTER = r"[一-龟]"
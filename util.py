@@ -2,7 +2,7 @@ import re
 import copy
 import json
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 
 from lxml import etree
 
@@ -25,49 +25,72 @@ def count_entry(dict_dir):
     logger.info("There are %s entries in total.", total_num)
 
 
+TAG_REGEX = r"(?:div|p)"
+
+# (正则, 文本中必须包含的子串)，不包含该子串时跳过对应正则
+PARAGRAPH_REGEX = (re.compile(r"(<p[^>]*?>.*?</p>)", re.DOTALL), "</p>")
+TITLE_REGEX = (re.compile(r"(<h[1-9][^>]*?>.*?</h[1-9]>)", re.DOTALL), "</h")
+DIV_REGEX = (re.compile(r"(<div[^>]*?>.*?</div>)", re.DOTALL), "</div>")
+VAR_REGEX = (re.compile(r"(#VAR.*?#ENDVAR)", re.DOTALL), "#ENDVAR")
+HALF_BLOCK_F_REGEX = (
+    re.compile(rf"(<{TAG_REGEX}[^>]*?>[^<>]*?\Z)", re.DOTALL),
+    "<",
+)
+HALF_BLOCK_B_REGEX = (re.compile(rf"(\A[^<>]*?</{TAG_REGEX}>)", re.DOTALL), "</")
+CUT_END_TAG_REGEX = (
+    re.compile(rf"(#[A-Z]+[^<>]*?</{TAG_REGEX}>)", re.DOTALL),
+    "#",
+)
+BOTH_START_P_REGEX = (re.compile(r"<p>\n[^<>]*?\n\s*<p>", re.DOTALL), "<p>\n")
+BOTH_END_P_REGEX = (re.compile(r"</p>\n[^<>]*?\n\s*</p>", re.DOTALL), "</p>\n")
+# CUT_START_TAG_REGEX = rf"(<{TAG_REGEX}[^>]*?>[^<>]*?#[A-Z]+.*?\n)"
+
+# 直接作为文本块的匹配
+BLOCK_REGEXES = [
+    PARAGRAPH_REGEX,
+    TITLE_REGEX,
+    DIV_REGEX,
+    VAR_REGEX,
+    HALF_BLOCK_F_REGEX,
+    HALF_BLOCK_B_REGEX,
+]
+# 仅当不被已有文本块包含时才作为文本块的匹配
+FILTERED_BLOCK_REGEXES = [
+    CUT_END_TAG_REGEX,
+    BOTH_START_P_REGEX,
+    BOTH_END_P_REGEX,
+]
+
+# 拼接文本块时使用的分隔符，xml文本中不会出现
+BLOCK_SEPARATOR = "\0"
+
+
+def _findall(regex, text: str) -> List[str]:
+    pattern, required = regex
+    if required not in text:
+        return []
+    return pattern.findall(text)
+
+
 def split_htmlContent(text: str) -> List[str]:
     extracted_blocks = []
 
-    TAG_REGEX = r"(?:div|p)"
-
-    PARAGRAPH_REGEX = r"(<p[^>]*?>.*?</p>)"
-    TITLE_REGEX = r"(<h[1-9][^>]*?>.*?</h[1-9]>)"
-    BOTH_START_P_REGEX = r"<p>\n[^<>]*?\n\s*<p>"
-    BOTH_END_P_REGEX = r"</p>\n[^<>]*?\n\s*</p>"
-    DIV_REGEX = r"(<div[^>]*?>.*?</div>)"
-    HALF_BLOCK_F_REGEX = rf"(<{TAG_REGEX}[^>]*?>[^<>]*?\Z)"
-    HALF_BLOCK_B_REGEX = rf"(\A[^<>]*?</{TAG_REGEX}>)"
-    VAR_REGEX = r"(#VAR.*?#ENDVAR)"
-    CUT_END_TAG_REGEX = rf"(#[A-Z]+[^<>]*?</{TAG_REGEX}>)"
-    # CUT_START_TAG_REGEX = rf"(<{TAG_REGEX}[^>]*?>[^<>]*?#[A-Z]+.*?\n)"
-
-    paragraph_matches = re.findall(PARAGRAPH_REGEX, text, re.DOTALL)
-    title_regex = re.findall(TITLE_REGEX, text, re.DOTALL)
-    div_matches = re.findall(DIV_REGEX, text, re.DOTALL)
-    var_matches = re.findall(VAR_REGEX, text, re.DOTALL)
-    half_block_f_matches = re.findall(HALF_BLOCK_F_REGEX, text, re.DOTALL)
-    half_block_b_matches = re.findall(HALF_BLOCK_B_REGEX, text, re.DOTALL)
-    cut_end_tag_matches = re.findall(CUT_END_TAG_REGEX, text, re.DOTALL)
-    both_start_p_matches = re.findall(BOTH_START_P_REGEX, text, re.DOTALL)
-    both_end_p_matches = re.findall(BOTH_END_P_REGEX, text, re.DOTALL)
-    # cut_start_tag_matches = re.findall(CUT_START_TAG_REGEX, text, re.DOTALL)
-    # if "Letting go of the milker, the foul rat-boy delivers a wickedly-sharp slap to her rear end, " in text:
-    #     print(both_end_p_matches)
-    #     input()
-    
-    extracted_blocks += paragraph_matches
-    extracted_blocks += title_regex
-    extracted_blocks += div_matches
-    extracted_blocks += var_matches
-    extracted_blocks += half_block_f_matches
-    extracted_blocks += half_block_b_matches
-    filtered_cut_end_tag_matches = filter(lambda x: not any([x in block for block in extracted_blocks]), cut_end_tag_matches)
-    extracted_blocks += filtered_cut_end_tag_matches
-    filtered_both_start_p_matches = filter(lambda x: not any([x in block for block in extracted_blocks]), both_start_p_matches)
-    extracted_blocks += filtered_both_start_p_matches
-    filtered_both_end_p_matches = filter(lambda x: not any([x in block for block in extracted_blocks]), both_end_p_matches)
-    extracted_blocks += filtered_both_end_p_matches
-    # extracted_blocks += cut_start_tag_matches
+    for regex in BLOCK_REGEXES:
+        extracted_blocks += _findall(regex, text)
+
+    # 所有已有文本块以分隔符拼接，判断是否被某一文本块包含只需一次子串查找
+    # 新加入的文本块同样参与之后的判断；文本中含有分隔符时逐个文本块判断
+    use_joined = BLOCK_SEPARATOR not in text
+    joined_blocks = BLOCK_SEPARATOR.join(extracted_blocks)
+    for regex in FILTERED_BLOCK_REGEXES:
+        for match in _findall(regex, text):
+            if use_joined:
+                if len(extracted_blocks) > 0 and match in joined_blocks:
+                    continue
+            elif any(match in block for block in extracted_blocks):
+                continue
+            extracted_blocks.append(match)
+            joined_blocks += BLOCK_SEPARATOR + match
 
     if len(extracted_blocks) == 0:
         extracted_blocks.extend(text.split("<br/><br/>"))
@@ -115,24 +138,110 @@ def dict_update_splited_htmlContent(old_dict_dir: Path):
             json.dump(data, f, ensure_ascii=False, indent=4)
 
 
-def xml_node_replace_translation(node: etree._Element, entry: XmlEntry) -> str:
+def _node_text(node: etree._Element) -> str:
+    text = ""
+    for child in node.itertext():
+        if child.strip() == "":
+            continue
+        text += child
+    return text
+
+
+def xml_node_replace_translation(
+    node: etree._Element, entry: XmlEntry, text: Optional[str] = None
+) -> str:
+    """
+    text为已知的节点文本(与get_element_CDATA结果相同)时不再重新拼接
+    """
     if entry.stage == 0 or entry.translation == entry.original:  # 无需修改
         return
     # htmlContent的属性用于存储文本的对应id，并不需要替换属性文本
     if entry.attribute is not None and entry.node_tag != "htmlContent":
         node.set(entry.attribute, entry.translation)
     else:
-        text = ""
-        for child in node.itertext():
-            if child.strip() == "":
-                continue
-            text += child
+        if text is None:
+            text = _node_text(node)
         node.text = text.replace(
             entry.original,
             entry.translation.replace("\\n", "\n"),
         )
     node.text = etree.CDATA(node.text)
 
+
+def xml_node_replace_translations(
+    node: etree._Element, entries: List[XmlEntry], text: Optional[str] = None
+) -> List[XmlEntry]:
+    """
+    一次替换同一节点(htmlContent)的所有词条：只拼接一次节点文本，一次生成替换结果，最后只设置一次CDATA
+    结果与所有原文按长者优先合并为一个正则后调用一次sub相同：同一位置取最长的原文，替换后的文本不会再被替换
+    原文相同的词条以首个为准；返回因与其他原文重叠而未能全部替换的词条
+    """
+    entries = [
+        entry
+        for entry in entries
+        if not (entry.stage == 0 or entry.translation == entry.original)
+    ]
+    if len(entries) == 0:
+        return []
+    # 有子节点时逐条替换会重复拼接子节点文本，按原方式处理
+    if len(node) > 0:
+        for entry in entries:
+            xml_node_replace_translation(node, entry)
+        return []
+
+    if text is None:
+        text = _node_text(node)
+    if text.strip() == "":
+        text = ""
+
+    # 原文 -> 首个词条
+    firsts: Dict[str, XmlEntry] = {}
+    for entry in entries:
+        if entry.original != "" and entry.original not in firsts:
+            firsts[entry.original] = entry
+    translations = {
+        original: entry.translation.replace("\\n", "\n")
+        for original, entry in firsts.items()
+    }
+    if len(firsts) == 0:
+        node.text = etree.CDATA(text)
+        return []
+    # 只有一个原文时直接替换
+    if len(translations) == 1:
+        (original, translation), = translations.items()
+        node.text = etree.CDATA(text.replace(original, translation))
+        return []
+
+    # 各原文的所有出现位置(含自身重叠)，按起点排序，起点相同时长者优先
+    spans: List[Tuple[int, int, str]] = []
+    for original in translations:
+        pos = text.find(original)
+        while pos != -1:
+            spans.append((pos, -len(original), original))
+            pos = text.find(original, pos + 1)
+    spans.sort()
+
+    # 从左到右选取互不重叠的出现位置，与长者优先的原文正则逐个匹配的结果相同
+    parts: List[str] = []
+    # 出现位置被其他原文覆盖的原文
+    shadowed = set()
+    pos = 0
+    last = None
+    for start, length, original in spans:
+        if start < pos:
+            if original != last:
+                shadowed.add(original)
+            continue
+        parts.append(text[pos:start])
+        parts.append(translations[original])
+        pos = start - length
+        last = original
+    parts.append(text[pos:])
+    node.text = etree.CDATA("".join(parts))
+
+    return [entry for original, entry in firsts.items() if original in shadowed]
+
+
 def get_element_CDATA(element: etree._Element) -> str:
     if element.text is None:
         return None